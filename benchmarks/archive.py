@@ -0,0 +1,73 @@
+"""
+下载记录基准：向临时数据库写入 N 条记录，测量启动载入耗时，以及按链接/记录键查询的单次延迟
+
+用法:
+  python benchmarks/archive.py             # 默认 100000 条
+  python benchmarks/archive.py -n 500000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.download_archive import DownloadArchive, make_key  # noqa: E402
+
+
+def populate(path, count):
+    """直接批量写入数据库（逐条 add 会为每条记录提交一次事务）"""
+    DownloadArchive(path).close()
+    conn = sqlite3.connect(str(path))
+    with conn:
+        conn.executemany(
+            "INSERT INTO archive (key, kind, url, title, files, sha256, size, created) "
+            "VALUES (?, 'video', ?, ?, '[]', NULL, 0, ?)",
+            ((make_key("Youtube", f"vid{i:08d}"), f"https://www.youtube.com/watch?v=vid{i:08d}", f"video {i}",
+              time.time()) for i in range(count))
+        )
+    conn.close()
+
+
+def per_call(func, args_list):
+    start = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="下载记录基准")
+    parser.add_argument("-n", "--count", type=int, default=100000, help="记录条数")
+    parser.add_argument("--lookups", type=int, default=10000, help="每种查询的次数")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix="archive_bench_")
+    path = os.path.join(temp_dir, "archive.db")
+    try:
+        populate(path, args.count)
+
+        start = time.perf_counter()
+        archive = DownloadArchive(path)
+        print(f"{args.count} 条记录, 载入 {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        ids = [f"vid{random.randrange(args.count):08d}" for _ in range(args.lookups)]
+        print(f"contains (记录键)       {per_call(archive.contains, [(make_key('youtube', i),) for i in ids]):8.2f} µs")
+        print(f"match_url (已知链接)    "
+              f"{per_call(archive.match_url, [(f'https://www.youtube.com/watch?v={i}',) for i in ids]):8.2f} µs")
+        # 未记录过的链接需要用提取器规则从链接推断视频 ID
+        shares = [(f"https://youtu.be/{i}?si=share",) for i in ids[:min(1000, len(ids))]]
+        print(f"match_url (新分享链接)  {per_call(archive.match_url, shares):8.2f} µs")
+        print(f"lookup (读取详情)       {per_call(archive.lookup, [(make_key('youtube', i),) for i in ids]):8.2f} µs")
+        print(archive.stats())
+        archive.close()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
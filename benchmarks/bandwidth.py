@@ -0,0 +1,126 @@
+"""
+带宽控制测试：本地 HTTP 服务器（不限速）提供若干测试文件，多个 download_video 同时下载，
+检查全局限速下实测总吞吐是否在容差范围内、各任务是否平均分享带宽，以及运行中调整限速是否立即生效
+
+用法:
+  python benchmarks/bandwidth.py                       # 3 个任务，先限速 2 MB/s，3 秒后调整为 4 MB/s
+  python benchmarks/bandwidth.py -j 4 --rate 1 --tolerance 0.1
+
+退出码: 0 通过, 1 吞吐或公平性超出容差
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.bandwidth import governor  # noqa: E402
+from core.downloader import VideoDownloader  # noqa: E402
+
+
+def make_handler(size):
+    payload = os.urandom(size)
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_HEAD(self):
+            self.do_GET(body=False)
+
+        def do_GET(self, body=True):
+            self.send_response(200)
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            if body:
+                self.wfile.write(payload)
+
+    return Handler
+
+
+def total_bytes():
+    return sum(governor.stats()["bytes"].values())
+
+
+def measure(duration):
+    """测量 duration 秒内的实际吞吐（跳过开头 0.5 秒，排除突发额度的影响）"""
+    time.sleep(0.5)
+    start_bytes, start = total_bytes(), time.monotonic()
+    time.sleep(duration - 0.5)
+    return (total_bytes() - start_bytes) / (time.monotonic() - start)
+
+
+def check(label, measured, expected, tolerance):
+    ok = abs(measured - expected) <= expected * tolerance
+    print(f"{label}: 实测 {measured / 1024 ** 2:.2f} MB/s, 目标 {expected / 1024 ** 2:.2f} MB/s  "
+          f"{'通过' if ok else '超出容差'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="带宽控制测试")
+    parser.add_argument("-j", "--jobs", type=int, default=3, help="同时下载的任务数")
+    parser.add_argument("--rate", type=float, default=2.0, help="初始总限速 (MB/s)，第二阶段翻倍")
+    parser.add_argument("--phase", type=float, default=3.0, help="每个阶段的时长（秒）")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="允许的相对误差")
+    args = parser.parse_args()
+
+    rate = args.rate * 1024 ** 2
+    # 文件足够大，保证两个阶段结束前都不会下载完
+    size = int(rate * args.phase * 3 * 1.5 / args.jobs)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(size))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    output_dir = tempfile.mkdtemp(prefix="bandwidth_bench_")
+    cancel_event = threading.Event()
+    percents = {}
+
+    def run(index):
+        VideoDownloader.download_video(
+            f"{base_url}/file{index}.mp4",
+            output_dir,
+            on_progress=lambda percent, speed: percents.__setitem__(index, percent),
+            cancel_event=cancel_event
+        )
+
+    governor.configure(rate)
+    print(f"{args.jobs} 个任务, 每个 {size / 1024 ** 2:.1f} MB")
+    threads = [threading.Thread(target=run, args=(i,), daemon=True) for i in range(args.jobs)]
+    for thread in threads:
+        thread.start()
+
+    passed = True
+    try:
+        passed &= check("阶段 1", measure(args.phase), rate, args.tolerance)
+
+        # 公平性：各任务进度应接近
+        values = [percents.get(i, 0.0) for i in range(args.jobs)]
+        mean = sum(values) / len(values)
+        fair = mean > 0 and (max(values) - min(values)) <= mean * args.tolerance * 2
+        print(f"各任务进度: {', '.join(f'{v:.1f}%' for v in values)}  {'均衡' if fair else '不均衡'}")
+        passed &= fair
+
+        # 运行中调整限速
+        governor.configure(rate * 2)
+        passed &= check("阶段 2", measure(args.phase), rate * 2, args.tolerance)
+    finally:
+        cancel_event.set()
+        governor.configure(None)
+        for thread in threads:
+            thread.join(timeout=5)
+        server.shutdown()
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+分片并发下载基准：本地 HTTP 服务器提供一个 HLS 分片流，并对每个连接限速（模拟服务端按连接限流），
+比较不同分片并发数下 VideoDownloader.download_video 的整体吞吐
+
+用法:
+  python benchmarks/fragments.py                         # 并发数 1, 4, 8
+  python benchmarks/fragments.py -c 1 2 4 8 16 --segments 64 --rate 1
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.downloader import VideoDownloader  # noqa: E402
+
+
+def make_handler(segments, segment_bytes, rate):
+    """rate: 每个连接的速率上限（字节/秒）"""
+    payload = os.urandom(segment_bytes)
+    playlist = "\n".join(
+        ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:4", "#EXT-X-MEDIA-SEQUENCE:0"]
+        + [f"#EXTINF:4.0,\nseg{i}.ts" for i in range(segments)]
+        + ["#EXT-X-ENDLIST", ""]
+    ).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_HEAD(self):
+            self.do_GET(body=False)
+
+        def do_GET(self, body=True):
+            if self.path.endswith(".m3u8"):
+                data, content_type = playlist, "application/vnd.apple.mpegurl"
+            elif self.path.startswith("/seg"):
+                data, content_type = payload, "video/mp2t"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            if not body:
+                return
+            if content_type == "video/mp2t":
+                # 按连接限速：每 16KB 休眠一次
+                chunk = 16 * 1024
+                for offset in range(0, len(data), chunk):
+                    self.wfile.write(data[offset:offset + chunk])
+                    time.sleep(chunk / rate)
+            else:
+                self.wfile.write(data)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分片并发下载基准")
+    parser.add_argument("-c", "--connections", type=int, nargs="+", default=[1, 4, 8], help="要比较的分片并发数")
+    parser.add_argument("--segments", type=int, default=32, help="分片数量")
+    parser.add_argument("--segment-kb", type=int, default=256, help="每个分片的大小 (KB)")
+    parser.add_argument("--rate", type=float, default=2.0, help="服务端每个连接的限速 (MB/s)")
+    args = parser.parse_args()
+
+    handler = make_handler(args.segments, args.segment_kb * 1024, args.rate * 1024 ** 2)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/stream.m3u8"
+
+    total_mb = args.segments * args.segment_kb / 1024
+    print(f"测试流: {args.segments} 个分片, 共 {total_mb:.1f} MB, 每连接限速 {args.rate:.1f} MB/s")
+
+    baseline = None
+    failed = False
+    try:
+        for connections in args.connections:
+            output_dir = tempfile.mkdtemp(prefix="fragments_bench_")
+            try:
+                result = VideoDownloader.download_video(url, output_dir, concurrent_fragments=connections)
+            finally:
+                shutil.rmtree(output_dir, ignore_errors=True)
+            if not result["success"]:
+                print(f"并发 {connections:>2}: 下载失败 - {result['message']}")
+                failed = True
+                continue
+
+            throughput = result["throughput"] / 1024 ** 2
+            baseline = baseline or throughput
+            print(f"并发 {connections:>2}: {result['elapsed']:6.2f}s  {throughput:6.2f} MB/s  "
+                  f"(x{throughput / baseline:.1f})")
+    finally:
+        server.shutdown()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+启动耗时基准：在全新的解释器中测量界面 / 命令行入口的导入耗时（可选测量首帧渲染），
+并检查启动阶段没有导入 torch、whisper 等重量级模块
+
+用法:
+  python benchmarks/startup.py                 # 导入 ui.app 和 cli
+  python benchmarks/startup.py --window        # 另外创建主窗口并渲染首帧（需要图形环境）
+  python benchmarks/startup.py --budget 1.5    # 中位数超过 1.5 秒时以非零状态退出
+
+退出码: 0 通过, 1 启动时导入了重量级模块或超出耗时预算
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 启动阶段不应导入的模块
+HEAVY_MODULES = ["torch", "whisper", "numba", "tiktoken"]
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+_WINDOW_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from ui.app import App
+app = App()
+app.update()
+elapsed = time.perf_counter() - start
+app.destroy()
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def run_probe(code):
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(name, code, repeat):
+    samples = [run_probe(code) for _ in range(repeat)]
+    seconds = [sample["seconds"] for sample in samples]
+    loaded = sorted({module for sample in samples for module in sample["loaded"]})
+    return {
+        "name": name,
+        "median": statistics.median(seconds),
+        "min": min(seconds),
+        "max": max(seconds),
+        "heavy_modules": loaded,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动耗时基准")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="每项测量的次数")
+    parser.add_argument("--window", action="store_true", help="同时测量创建主窗口并渲染首帧的耗时")
+    parser.add_argument("--budget", type=float, default=None, help="中位数耗时上限（秒）")
+    args = parser.parse_args()
+
+    cases = [
+        ("import ui.app", _IMPORT_PROBE.format(module="ui.app", heavy=HEAVY_MODULES)),
+        ("import cli", _IMPORT_PROBE.format(module="cli", heavy=HEAVY_MODULES)),
+        ("import transcriber", _IMPORT_PROBE.format(module="core.transcriber", heavy=HEAVY_MODULES)),
+    ]
+    if args.window:
+        cases.append(("App() first frame", _WINDOW_PROBE.format(heavy=HEAVY_MODULES)))
+
+    failed = False
+    for name, code in cases:
+        try:
+            result = measure(name, code, args.repeat)
+        except subprocess.CalledProcessError as e:
+            print(f"{name:<20} 运行失败: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+            failed = True
+            continue
+
+        line = (f"{name:<20} median {result['median'] * 1000:8.1f} ms"
+                f"  (min {result['min'] * 1000:.1f}, max {result['max'] * 1000:.1f})")
+        if result["heavy_modules"]:
+            line += f"  启动时导入了: {', '.join(result['heavy_modules'])}"
+            failed = True
+        if args.budget is not None and result["median"] > args.budget:
+            line += f"  超出预算 {args.budget:.2f}s"
+            failed = True
+        print(line)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
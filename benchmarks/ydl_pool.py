@@ -0,0 +1,89 @@
+"""
+YoutubeDL 实例池基准：对本地 HTTP 服务器上的 N 个链接解析视频信息，
+比较每次新建 YoutubeDL 与从实例池复用（含 keep-alive 连接）时的单次调用延迟
+
+用法:
+  python benchmarks/ydl_pool.py           # 默认 50 个链接
+  python benchmarks/ydl_pool.py -n 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yt_dlp  # noqa: E402
+from core.downloader import VideoDownloader, get_ydl_pool, _INFO_OPTIONS  # noqa: E402
+
+_PAYLOAD = b"\0" * 1024
+
+
+class Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 才能保持连接
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.do_GET(body=False)
+
+    def do_GET(self, body=True):
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(_PAYLOAD)))
+        self.end_headers()
+        if body:
+            self.wfile.write(_PAYLOAD)
+
+
+def fresh_instance(url):
+    with yt_dlp.YoutubeDL(dict(_INFO_OPTIONS)) as ydl:
+        ydl.extract_info(url, download=False)
+
+
+def pooled(url):
+    result = VideoDownloader.fetch_video_info(url, use_cache=False)
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+
+
+def run(label, func, urls):
+    latencies = []
+    for url in urls:
+        start = time.perf_counter()
+        func(url)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+    print(f"{label:<10} median {statistics.median(latencies) * 1000:7.1f} ms  "
+          f"p95 {p95 * 1000:7.1f} ms  total {sum(latencies):6.2f}s")
+    return statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YoutubeDL 实例池基准")
+    parser.add_argument("-n", "--count", type=int, default=50, help="解析的链接数")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        # 两组使用不同的链接，避免服务器或系统层面的缓存影响对比
+        fresh = run("新建实例", fresh_instance, [f"{base_url}/a/video{i}.mp4" for i in range(args.count)])
+        reused = run("实例池", pooled, [f"{base_url}/b/video{i}.mp4" for i in range(args.count)])
+        print(f"单次调用延迟降低 {(1 - reused / fresh) * 100:.0f}%  (x{fresh / reused:.1f}); 池状态: {get_ydl_pool().stats()}")
+    finally:
+        server.shutdown()
+        get_ydl_pool().clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+"""
+命令行入口（无界面，不依赖 tkinter），适用于服务器、定时任务和容器环境
+
+用法:
+  python -m cli download  [URL ...] [-i 列表文件|-] [-o 目录] [-f 格式ID] [--cookies 文件] [-j 并发数] [--audio-only]
+  python -m cli info      [URL ...] [-i 列表文件|-] [--cookies 文件] [-j 并发数] [--per-host N] [--no-cache]
+  python -m cli convert   输入(文件/目录/通配符) ... [--format mp3] [--bitrate 192k] [-j 并发数]
+  python -m cli transcribe 输入文件 ... [--model base] [--output-format txt] [--cpu] [--chunked] [--vad]
+  python -m cli pipeline  [URL ...] [-i 列表文件|-] [-o 目录] [--video] [--audio-format mp3] [--model base] ...
+
+stdout 只输出 JSON Lines 事件，每行一个对象:
+  {"event": "progress", "stage": ..., "item": ..., "percent": ...}
+  {"event": "done", "stage": ..., "item": ..., "success": ..., "message": ...}
+  {"event": "summary", "stage": ..., "succeeded": ..., "failed": ...}
+日志和第三方库的输出写到 stderr。
+
+退出码: 0 全部成功, 1 存在失败的任务, 2 参数错误或没有输入, 130 被中断
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+# 同一任务两次进度事件的最小间隔（秒）
+_PROGRESS_INTERVAL = 0.5
+
+
+class EventWriter:
+    """线程安全的 JSON Lines 事件输出，对进度事件限流"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+        self._last_progress = {}
+
+    def emit(self, event, **fields):
+        line = json.dumps(dict(event=event, time=round(time.time(), 3), **fields), ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def progress(self, stage, item, percent, **fields):
+        key = (stage, item)
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_progress.get(key, 0)
+            if percent < 100 and now - last < _PROGRESS_INTERVAL:
+                return
+            self._last_progress[key] = now
+        self.emit("progress", stage=stage, item=item, percent=round(percent, 1), **fields)
+
+    def done(self, stage, item, result, **fields):
+        self.emit(
+            "done",
+            stage=stage,
+            item=item,
+            success=bool(result.get("success")),
+            message=result.get("message", ""),
+            **fields
+        )
+
+
+def read_urls(urls, input_file=None):
+    """合并命令行参数和列表文件（"-" 表示 stdin）中的 URL，忽略空行和 # 注释"""
+    result = list(urls or [])
+    lines = []
+    if input_file == "-" or (input_file is None and not result and not sys.stdin.isatty()):
+        lines = sys.stdin.read().splitlines()
+    elif input_file:
+        with open(input_file, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            result.append(line)
+    # 去重并保持顺序
+    return list(dict.fromkeys(result))
+
+
+def _exit_code(failed):
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+def _open_archive(args):
+    """下载记录（跳过已下载过的视频），--no-archive 时返回 None"""
+    if args.no_archive:
+        return None
+    from core.download_archive import DownloadArchive
+    from utils.config import PATHS
+    return DownloadArchive(PATHS["app_data"] / "download_archive.db")
+
+
+def _start_downloads(args, events, on_job_done=None):
+    """把所有 URL 提交到下载队列，返回 (queue, batch)"""
+    from core.download_queue import DownloadQueue
+
+    def job_progress(batch, job, percent, speed):
+        events.progress("download", job.url, percent, speed=speed)
+
+    def job_done(batch, job):
+        result = job.result or {"success": False, "message": job.status}
+        events.done("download", job.url, result, files=result.get("files", []), skipped=bool(result.get("skipped")),
+                    downloaded_bytes=result.get("downloaded_bytes"), throughput=result.get("throughput"))
+        if on_job_done:
+            on_job_done(job, result)
+
+    download_queue = DownloadQueue(max_workers=args.jobs, archive=_open_archive(args))
+    batch = download_queue.submit_batch(
+        args.urls,
+        args.output,
+        quality_id=args.format,
+        cookie_file=args.cookies,
+        on_progress=job_progress,
+        on_job_done=job_done,
+        audio_only=args.audio_only,
+        concurrent_fragments=args.concurrent_fragments,
+        format_policy=args.policy
+    )
+    return download_queue, batch
+
+
+def cmd_download(args, events):
+    download_queue, batch = _start_downloads(args, events)
+    try:
+        batch.wait()
+    finally:
+        download_queue.shutdown(wait=False, cancel=True)
+
+    failed = sum(1 for job in batch.jobs if not (job.result or {}).get("success"))
+    skipped = sum(1 for job in batch.jobs if (job.result or {}).get("skipped"))
+    events.emit("summary", stage="download", succeeded=len(batch.jobs) - failed, failed=failed, skipped=skipped)
+    return _exit_code(failed)
+
+
+def cmd_info(args, events):
+    """批量解析视频信息，每解析完一个链接输出一行 {"event": "info", ...}"""
+    from core.bulk_info import extract_many
+
+    succeeded = failed = 0
+    for record in extract_many(args.urls, args.cookies, args.jobs, args.per_host, not args.no_cache):
+        events.emit("info", **record)
+        if record["success"]:
+            succeeded += 1
+        else:
+            failed += 1
+    events.emit("summary", stage="info", succeeded=succeeded, failed=failed)
+    return _exit_code(failed)
+
+
+def cmd_convert(args, events):
+    from core.converter import MediaConverter
+
+    inputs = []
+    for source in args.inputs:
+        inputs.extend(MediaConverter.collect_inputs(source) if not os.path.isfile(source) else [source])
+    if not inputs:
+        events.emit("summary", stage="convert", succeeded=0, failed=0, message="没有找到可转换的文件")
+        return EXIT_USAGE
+
+    cancel_event = threading.Event()
+    try:
+        result = MediaConverter.convert_batch(
+            inputs,
+            args.audio_format,
+            args.bitrate,
+            on_progress=lambda path, percent, total: events.progress("convert", path, percent),
+            on_file_done=lambda path, res: events.done("convert", path, res, output_path=res.get("output_path")),
+            cancel_event=cancel_event,
+            max_workers=args.jobs
+        )
+    except KeyboardInterrupt:
+        cancel_event.set()
+        raise
+
+    events.emit("summary", stage="convert", succeeded=result["succeeded"], failed=result["failed"])
+    return _exit_code(result["failed"])
+
+
+def _transcribe_file(path, args, events):
+    from core.transcriber import VideoTranscriber
+
+    def on_segment(segment):
+        if args.segments:
+            events.emit("segment", stage="transcribe", item=path, **segment)
+
+    result = VideoTranscriber.transcribe(
+        path,
+        args.model,
+        args.output_format,
+        use_gpu=not args.cpu,
+        on_progress=lambda msg, percent: events.progress("transcribe", path, percent, msg=msg),
+        on_segment=on_segment,
+        chunked=args.chunked,
+        vad=args.vad,
+        language=args.language,
+        use_cache=not args.no_cache
+    )
+    events.done("transcribe", path, result, output_path=result.get("output_path"), cached=result.get("cached"))
+    return result
+
+
+def cmd_transcribe(args, events):
+    inputs = [path for path in args.inputs if os.path.isfile(path)]
+    missing = [path for path in args.inputs if not os.path.isfile(path)]
+    for path in missing:
+        events.done("transcribe", path, {"success": False, "message": "输入文件不存在"})
+    if not inputs:
+        events.emit("summary", stage="transcribe", succeeded=0, failed=len(missing), message="没有找到可转录的文件")
+        return EXIT_USAGE
+
+    succeeded = sum(1 for path in inputs if _transcribe_file(path, args, events)["success"])
+    failed = len(args.inputs) - succeeded
+    events.emit("summary", stage="transcribe", succeeded=succeeded, failed=failed)
+    return _exit_code(failed)
+
+
+def cmd_pipeline(args, events):
+    """下载 -> （可选）提取音频 -> 转录，各阶段在不同条目之间并行执行"""
+    from core.pipeline import Pipeline, STATUS_DONE
+
+    transcribe_options = {
+        "chunked": args.chunked,
+        "vad": args.vad,
+        "language": args.language,
+        "use_cache": not args.no_cache,
+    }
+    if args.segments:
+        transcribe_options["on_segment"] = lambda segment: events.emit("segment", stage="transcribe", **segment)
+
+    def on_item_done(item):
+        events.emit(
+            "done",
+            stage="pipeline",
+            item=item.url,
+            success=item.status == STATUS_DONE,
+            status=item.status,
+            failed_stage=item.stage if item.status != STATUS_DONE else None,
+            message=item.message,
+            files=item.files,
+            outputs=item.outputs
+        )
+
+    pipeline = Pipeline(
+        args.output,
+        quality_id=args.format,
+        cookie_file=args.cookies,
+        audio_only=not args.video,
+        download_options={"concurrent_fragments": args.concurrent_fragments, "format_policy": args.policy},
+        audio_format=args.audio_format,
+        bitrate=args.bitrate,
+        model_name=args.model,
+        output_format=args.output_format,
+        use_gpu=not args.cpu,
+        transcribe_options=transcribe_options,
+        workers={"download": args.jobs},
+        on_progress=lambda item, stage, percent, info: events.progress(stage, item.url, percent),
+        on_item_done=on_item_done,
+        archive=_open_archive(args)
+    )
+    items = pipeline.submit_many(args.urls)
+    try:
+        pipeline.join()
+    except KeyboardInterrupt:
+        pipeline.cancel()
+        raise
+
+    succeeded = sum(1 for item in items if item.status == STATUS_DONE)
+    failed = len(items) - succeeded
+    events.emit("summary", stage="pipeline", succeeded=succeeded, failed=failed)
+    return _exit_code(failed)
+
+
+def _add_download_args(parser):
+    from utils.config import FORMAT_POLICIES
+    parser.add_argument("urls", nargs="*", help="视频链接")
+    parser.add_argument("-i", "--input", help="URL 列表文件，每行一个，\"-\" 表示从 stdin 读取")
+    parser.add_argument("-o", "--output", default=None, help="下载目录（默认为 ~/Downloads）")
+    parser.add_argument("-f", "--format", default=None, help="yt-dlp 格式 ID 或格式选择表达式")
+    parser.add_argument("-p", "--policy", default=None, choices=list(FORMAT_POLICIES),
+                        help="格式选择策略，按每个视频的格式列表选择（指定 -f 时以 -f 为准）")
+    parser.add_argument("--cookies", default=None, help="Netscape 格式的 Cookie 文件")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="同时下载的任务数")
+    parser.add_argument("--audio-only", action="store_true", help="只下载音频流")
+    parser.add_argument("-N", "--concurrent-fragments", type=int, default=None,
+                        help="HLS/DASH 分片并发连接数")
+    parser.add_argument("-r", "--limit-rate", default=None,
+                        help="所有下载共享的总限速，如 500K、2M（字节/秒）")
+    parser.add_argument("--no-archive", action="store_true", help="不跳过已下载过的视频，也不记录本次下载")
+
+
+def _add_transcribe_args(parser):
+    from utils.config import WHISPER_CONFIG
+
+    parser.add_argument("--model", default=WHISPER_CONFIG["default_model"], help="Whisper 模型")
+    parser.add_argument("--output-format", default=WHISPER_CONFIG["default_format"],
+                        choices=WHISPER_CONFIG["output_formats"], help="转录结果格式")
+    parser.add_argument("--language", default=None, help="语言代码（如 zh），默认自动检测")
+    parser.add_argument("--cpu", action="store_true", help="不使用 GPU")
+    parser.add_argument("--chunked", action="store_true", help="CPU 模式下分段并行识别长音频")
+    parser.add_argument("--vad", action="store_true", default=None, help="识别前跳过静音")
+    parser.add_argument("--no-cache", action="store_true", help="不使用识别结果缓存")
+    parser.add_argument("--segments", action="store_true", help="逐段输出识别结果事件")
+
+
+def build_parser():
+    from utils.config import APP_NAME, APP_VERSION, CONVERT_CONFIG
+
+    parser = argparse.ArgumentParser(prog="python -m cli", description=f"{APP_NAME} 命令行")
+    parser.add_argument("--version", action="version", version=APP_VERSION)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    download = subparsers.add_parser("download", help="下载视频")
+    _add_download_args(download)
+
+    info = subparsers.add_parser("info", help="批量解析视频信息（标题、时长、可用格式）")
+    info.add_argument("urls", nargs="*", help="视频链接")
+    info.add_argument("-i", "--input", help="URL 列表文件，每行一个，\"-\" 表示从 stdin 读取")
+    info.add_argument("--cookies", default=None, help="Netscape 格式的 Cookie 文件")
+    info.add_argument("-j", "--jobs", type=int, default=None, help="同时解析的链接数")
+    info.add_argument("--per-host", type=int, default=None, help="同一站点同时解析的链接数，0 表示不限制")
+    info.add_argument("--no-cache", action="store_true", help="不使用视频信息缓存")
+
+    convert = subparsers.add_parser("convert", help="提取音频")
+    convert.add_argument("inputs", nargs="+", help="输入文件、目录或通配符模式")
+    convert.add_argument("--format", dest="audio_format", default=CONVERT_CONFIG["default_format"],
+                         choices=CONVERT_CONFIG["supported_formats"], help="输出音频格式")
+    convert.add_argument("--bitrate", default=CONVERT_CONFIG["default_bitrate"], help="输出码率")
+    convert.add_argument("-j", "--jobs", type=int, default=None, help="同时运行的 ffmpeg 进程数")
+
+    transcribe = subparsers.add_parser("transcribe", help="语音转文字")
+    transcribe.add_argument("inputs", nargs="+", help="音频或视频文件")
+    _add_transcribe_args(transcribe)
+
+    pipeline = subparsers.add_parser("pipeline", help="下载后提取音频并转录")
+    _add_download_args(pipeline)
+    pipeline.add_argument("--video", action="store_true", help="下载完整视频（默认只下载音频）")
+    pipeline.add_argument("--audio-format", default=None, choices=CONVERT_CONFIG["supported_formats"],
+                          help="转录前先提取为该音频格式（默认直接转录下载的文件）")
+    pipeline.add_argument("--bitrate", default=CONVERT_CONFIG["default_bitrate"], help="提取音频的码率")
+    _add_transcribe_args(pipeline)
+
+    return parser
+
+
+def main(argv=None):
+    # 事件输出使用原始 stdout，之后所有 print/日志输出（包括 Whisper 的输出）都改写到 stderr
+    out = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+
+    events = EventWriter(out)
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command in ("download", "pipeline", "info"):
+        from utils.config import PATHS
+
+        try:
+            args.urls = read_urls(args.urls, args.input)
+        except OSError as e:
+            parser.error(f"无法读取 URL 列表: {e}")
+        if not args.urls:
+            parser.error("没有提供 URL")
+        if getattr(args, "limit_rate", None):
+            from core.bandwidth import governor, parse_rate
+
+            try:
+                governor.configure(parse_rate(args.limit_rate))
+            except ValueError as e:
+                parser.error(str(e))
+        if args.command != "info":
+            args.output = args.output or str(PATHS["downloads"])
+
+    commands = {
+        "download": cmd_download,
+        "info": cmd_info,
+        "convert": cmd_convert,
+        "transcribe": cmd_transcribe,
+        "pipeline": cmd_pipeline,
+    }
+    try:
+        return commands[args.command](args, events)
+    except KeyboardInterrupt:
+        events.emit("interrupted", stage=args.command)
+        return EXIT_INTERRUPTED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
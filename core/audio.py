@@ -0,0 +1,85 @@
+import subprocess
+import threading
+from collections import deque
+import numpy as np
+from core.probe import probe
+from utils.logger import logger
+
+# Whisper 使用的采样率
+SAMPLE_RATE = 16000
+
+# 每次从 ffmpeg 读取的数据量（秒）
+_BLOCK_SECONDS = 30
+
+
+def load_audio(path, sample_rate=SAMPLE_RATE, on_progress=None):
+    """
+    用 ffmpeg 把媒体文件解码为单声道 float32 数组（取值 -1~1）
+    解码结果按块流式写入预先分配的缓冲区，避免一次性读入全部 PCM 字节后再整体转换造成的内存峰值
+    on_progress: 回调函数，接收已解码的秒数
+    """
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-threads", "0",
+        "-i", path,
+        "-f", "s16le",
+        "-ac", "1",
+        "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate),
+        "-loglevel", "error",
+        "-"
+    ]
+
+    # 按探测到的时长预分配缓冲区，不足时再扩容
+    info = probe(path)
+    expected = int((info.duration if info and info.duration else 60) * sample_rate) + sample_rate
+    buffer = np.empty(expected, dtype=np.float32)
+    filled = 0
+
+    block_bytes = _BLOCK_SECONDS * sample_rate * 2
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # 后台读取错误输出，避免管道写满阻塞 ffmpeg
+    errors = deque(maxlen=20)
+    stderr_thread = threading.Thread(
+        target=lambda: errors.extend(line.decode("utf-8", errors="replace").rstrip() for line in process.stderr),
+        daemon=True
+    )
+    stderr_thread.start()
+    try:
+        pending = b""
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            data = pending + data
+            # 保证按完整的 16 位采样处理
+            usable = len(data) - len(data) % 2
+            pending = data[usable:]
+            samples = np.frombuffer(data[:usable], dtype=np.int16)
+
+            if filled + len(samples) > len(buffer):
+                grown = np.empty(max(len(buffer) * 2, filled + len(samples)), dtype=np.float32)
+                grown[:filled] = buffer[:filled]
+                buffer = grown
+
+            np.multiply(samples, 1 / 32768.0, out=buffer[filled:filled + len(samples)], casting="unsafe")
+            filled += len(samples)
+            if on_progress:
+                on_progress(filled / sample_rate)
+
+        process.wait()
+        stderr_thread.join(timeout=1)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+    if process.returncode != 0:
+        message = errors[-1] if errors else ""
+        logger.error(f"音频解码失败: {message}")
+        raise RuntimeError(f"音频解码失败: {message}")
+
+    # 释放多分配的空间
+    return buffer[:filled].copy() if filled < len(buffer) * 0.9 else buffer[:filled]
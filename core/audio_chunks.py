@@ -0,0 +1,83 @@
+"""
+长音频分段：在静音处切分为带重叠的窗口，并把各窗口的识别结果拼接回全局时间轴
+"""
+import numpy as np
+
+# 能量计算的帧长（秒）
+FRAME_SECONDS = 0.03
+
+
+def frame_energy(audio, sample_rate, frame_seconds=FRAME_SECONDS):
+    """
+    按帧计算 RMS 能量，返回 (能量数组, 每帧采样数)
+    float32 音频上 reshape 只是视图，einsum 逐帧求平方和，不会生成整段音频大小的临时数组
+    """
+    frame = max(1, int(sample_rate * frame_seconds))
+    count = len(audio) // frame
+    if count == 0:
+        return np.zeros(0, dtype=np.float32), frame
+    frames = np.asarray(audio, dtype=np.float32)[:count * frame].reshape(count, frame)
+    energy = np.einsum("ij,ij->i", frames, frames)
+    energy /= frame
+    return np.sqrt(energy, out=energy), frame
+
+
+def plan_chunks(audio, sample_rate, chunk_seconds=600, overlap_seconds=5, search_seconds=30):
+    """
+    规划分段
+    在每个目标切点前后 search_seconds 内寻找能量最低的位置切分，
+    每段再向两侧各扩展 overlap_seconds 作为重叠，避免切断语句。
+    返回 [{"start", "end", "keep_start", "keep_end"}]（单位：采样点），
+    keep_* 为该段负责输出的区间，相邻段的 keep 区间首尾相接。
+    """
+    total = len(audio)
+    chunk = int(chunk_seconds * sample_rate)
+    if total <= chunk:
+        return [{"start": 0, "end": total, "keep_start": 0, "keep_end": total}]
+
+    energy, frame = frame_energy(audio, sample_rate)
+    search = int(search_seconds * sample_rate)
+
+    cuts = [0]
+    while total - cuts[-1] > chunk:
+        target = cuts[-1] + chunk
+        lo = max(cuts[-1] + chunk // 2, target - search) // frame
+        hi = min(total, target + search) // frame
+        if hi > lo and hi <= len(energy):
+            cut = (lo + int(np.argmin(energy[lo:hi]))) * frame
+        else:
+            cut = target
+        cuts.append(cut)
+    cuts.append(total)
+
+    overlap = int(overlap_seconds * sample_rate)
+    return [
+        {
+            "start": max(0, begin - overlap),
+            "end": min(total, end + overlap),
+            "keep_start": begin,
+            "keep_end": end,
+        }
+        for begin, end in zip(cuts, cuts[1:])
+    ]
+
+
+def remap_segments(segments, chunk, sample_rate):
+    """
+    把分段内的相对时间换算为全局时间，并只保留起点落在 keep 区间内的句子
+    （重叠区域的句子由起点所在的分段负责，避免重复）
+    """
+    offset = chunk["start"] / sample_rate
+    keep_start = chunk["keep_start"] / sample_rate
+    keep_end = chunk["keep_end"] / sample_rate
+    result = []
+    for segment in segments:
+        start = segment["start"] + offset
+        if start < keep_start or start >= keep_end:
+            continue
+        result.append({
+            "start": start,
+            "end": segment["end"] + offset,
+            "text": segment["text"],
+        })
+    return result
@@ -0,0 +1,153 @@
+"""
+全局带宽控制：进程内所有下载共享的令牌桶限速，支持总限速、按站点限速和运行时调整
+
+下载线程每收到一块数据就调用 governor.throttle(host, n)，先从站点令牌桶、再从全局令牌桶取出 n 字节额度，
+额度不足时阻塞。令牌桶按请求到达顺序发放额度（先到先得），多个下载按数据块轮流前进，平均分享带宽。
+"""
+import re
+import threading
+import time
+from utils.config import DOWNLOAD_CONFIG
+
+# 等待额度时的最长单次休眠（秒），保证限速调整后等待中的线程能及时按新速率计算
+_MAX_WAIT = 0.1
+
+
+def parse_rate(text):
+    """
+    解析速率字符串（字节/秒）："500K"、"2M"、"1.5MB"、"1048576"；
+    空值、"0" 或 "none" 表示不限速，返回 None
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text) or None
+    text = text.strip().upper()
+    if text in ("", "0", "NONE"):
+        return None
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([KMG]?)I?B?(?:/S)?", text)
+    if not match:
+        raise ValueError(f"无法解析的速率: {text}")
+    value, unit = match.groups()
+    return float(value) * {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}[unit] or None
+
+
+class TokenBucket:
+    """
+    令牌桶：额度以 rate 字节/秒的速度累积，空闲时最多积累 burst 字节
+    按请求的累计位置排队，先请求的先获得额度；调整速率对正在等待的请求立即生效
+    rate: 速率（字节/秒），None 表示不限速
+    burst: 突发量（字节），默认等于 1 秒的额度
+    """
+
+    def __init__(self, rate=None, burst=None):
+        self._cond = threading.Condition()
+        self.rate = None
+        self.burst = None
+        # _reserved: 已发出的请求累计字节数；_allowed: 按速率累计可放行的字节数
+        self._reserved = 0.0
+        self._allowed = 0.0
+        self._last = time.monotonic()
+        self.set_rate(rate, burst)
+
+    def _advance(self):
+        """按流逝的时间累积额度（需持有锁）"""
+        now = time.monotonic()
+        if self.rate:
+            self._allowed = min(self._allowed + (now - self._last) * self.rate, self._reserved + self.burst)
+        self._last = now
+
+    def set_rate(self, rate, burst=None):
+        with self._cond:
+            self._advance()
+            was_limited = bool(self.rate)
+            self.rate = rate or None
+            self.burst = burst or self.rate or 0
+            if self.rate and not was_limited:
+                # 从不限速切换为限速：之前的请求不再补扣额度
+                self._allowed = self._reserved
+            self._cond.notify_all()
+
+    def consume(self, amount, cancel_event=None):
+        """取出 amount 字节的额度，不足时阻塞；cancel_event 被设置时提前返回"""
+        with self._cond:
+            if not self.rate:
+                return
+            self._advance()
+            self._reserved += amount
+            position = self._reserved
+            while True:
+                if not self.rate or (cancel_event is not None and cancel_event.is_set()):
+                    return
+                self._advance()
+                if self._allowed >= position:
+                    return
+                self._cond.wait(min((position - self._allowed) / self.rate, _MAX_WAIT))
+
+
+class BandwidthGovernor:
+    """
+    全局带宽控制器
+    rate: 所有下载的总速率上限（字节/秒），None 表示不限制
+    per_host: {站点: 速率上限}，未列出的站点只受总限速约束
+    """
+
+    def __init__(self, rate=None, per_host=None):
+        self._lock = threading.Lock()
+        self._global = TokenBucket()
+        self._hosts = {}
+        self._bytes = {}
+        self.configure(rate, per_host)
+
+    @property
+    def rate(self):
+        return self._global.rate
+
+    @property
+    def active(self):
+        """是否设置了任何限速"""
+        with self._lock:
+            return bool(self._global.rate) or any(bucket.rate for bucket in self._hosts.values())
+
+    def configure(self, rate=None, per_host=None):
+        """运行时调整限速，正在进行的下载立即按新速率执行；per_host 为 None 时保留原有站点设置"""
+        self._global.set_rate(rate)
+        if per_host is not None:
+            with self._lock:
+                for host in set(self._hosts) - set(per_host):
+                    self._hosts.pop(host).set_rate(None)
+            for host, host_rate in per_host.items():
+                self.set_host_rate(host, host_rate)
+
+    def set_host_rate(self, host, rate):
+        with self._lock:
+            bucket = self._hosts.get(host)
+            if bucket is None:
+                if not rate:
+                    return
+                bucket = self._hosts[host] = TokenBucket()
+        bucket.set_rate(rate)
+
+    def throttle(self, host, amount, cancel_event=None):
+        """记录 amount 字节的传输，超出站点或总限速时阻塞"""
+        if amount <= 0:
+            return
+        with self._lock:
+            self._bytes[host] = self._bytes.get(host, 0) + amount
+            bucket = self._hosts.get(host)
+        if bucket is not None:
+            bucket.consume(amount, cancel_event)
+        self._global.consume(amount, cancel_event)
+
+    def stats(self):
+        """当前限速设置与各站点累计传输字节数"""
+        with self._lock:
+            return {
+                "rate": self._global.rate,
+                "per_host": {host: bucket.rate for host, bucket in self._hosts.items() if bucket.rate},
+                "bytes": dict(self._bytes),
+            }
+
+
+# 进程内所有下载共享的带宽控制器
+governor = BandwidthGovernor(DOWNLOAD_CONFIG["rate_limit"], DOWNLOAD_CONFIG["rate_limit_per_host"])
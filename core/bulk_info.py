@@ -0,0 +1,100 @@
+"""
+批量解析视频信息：并发解析大量链接（限制总并发和同一站点并发），结果按完成顺序逐条产出，
+单个链接失败不影响其他链接
+"""
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
+from core.downloader import VideoDownloader
+from utils.config import DOWNLOAD_CONFIG
+from utils.logger import logger
+
+
+def _host_of(url):
+    try:
+        return urlsplit(url).hostname or ""
+    except ValueError:
+        return ""
+
+
+def _fetch(index, url, cookie_file, use_cache):
+    try:
+        result = VideoDownloader.fetch_video_info(url, cookie_file, use_cache)
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+    return dict(result, index=index, url=url)
+
+
+def extract_many(urls, cookie_file=None, max_workers=None, max_per_host=None, use_cache=True):
+    """
+    批量解析视频信息，返回生成器，每解析完一个链接产出一条结果（顺序与输入不同，index 为输入中的序号）
+    成功: {"index", "url", "success": True, "title", "duration", "qualities", ...}
+    失败: {"index", "url", "success": False, "error"}
+    urls: 任意可迭代对象，按需读取，不会一次性载入全部链接
+    max_workers: 总并发数，默认取 DOWNLOAD_CONFIG["info_workers"]
+    max_per_host: 同一站点的并发上限，默认取 DOWNLOAD_CONFIG["max_per_host"]，0 表示不限制
+    """
+    max_workers = max(1, max_workers or DOWNLOAD_CONFIG["info_workers"])
+    if max_per_host is None:
+        max_per_host = DOWNLOAD_CONFIG["max_per_host"]
+
+    source = enumerate(url.strip() for url in urls if url and url.strip())
+    # 等待调度的链接（受站点并发限制暂时不能开始的），最多预读 max_workers * 4 个
+    pending = deque()
+    window = max_workers * 4
+    running = {}
+    host_running = {}
+
+    def host_available(host):
+        return not max_per_host or host_running.get(host, 0) < max_per_host
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            # 补充预读窗口
+            while len(pending) < window:
+                item = next(source, None)
+                if item is None:
+                    break
+                pending.append(item)
+
+            # 启动站点未达上限的链接
+            for item in list(pending):
+                if len(running) >= max_workers:
+                    break
+                index, url = item
+                host = _host_of(url)
+                if not host_available(host):
+                    continue
+                pending.remove(item)
+                host_running[host] = host_running.get(host, 0) + 1
+                running[executor.submit(_fetch, index, url, cookie_file, use_cache)] = host
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                host = running.pop(future)
+                host_running[host] -= 1
+                yield future.result()
+
+
+def write_jsonl(results, stream):
+    """把结果逐条写为 JSON Lines，返回 (成功数, 失败数)"""
+    succeeded = failed = 0
+    for result in results:
+        stream.write(json.dumps(result, ensure_ascii=False) + "\n")
+        stream.flush()
+        if result["success"]:
+            succeeded += 1
+        else:
+            failed += 1
+            logger.warning(f"解析失败: {result['url']} - {result.get('error')}")
+    return succeeded, failed
+
+
+def extract_to_jsonl(urls, path, **kwargs):
+    """批量解析并把结果写入 JSONL 文件，返回 (成功数, 失败数)"""
+    with open(path, "w", encoding="utf-8") as f:
+        return write_jsonl(extract_many(urls, **kwargs), f)
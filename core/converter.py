@@ -1,89 +1,320 @@
 
 import subprocess
 import os
-import re
+import glob
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from core.probe import probe
+from utils.config import CONVERT_CONFIG
 from utils.logger import logger
 
 class MediaConverter:
     @staticmethod
     def get_duration(input_path):
         """获取媒体文件时长（秒）"""
+        info = probe(input_path)
+        return info.duration if info else 0
+
+    @staticmethod
+    def _iter_progress(stream):
+        """
+        解析 ffmpeg -progress 输出的 key=value 流
+        每遇到一个 progress=continue/end 行产出一个进度字典
+        """
+        block = {}
+        for line in stream:
+            key, sep, value = line.strip().partition("=")
+            if not sep:
+                continue
+            block[key] = value
+            if key == "progress":
+                yield block
+                block = {}
+
+    @staticmethod
+    def _progress_event(block, total_duration):
+        """将原始进度块转换为结构化的进度事件"""
+        def to_int(value):
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return 0
+
+        # 旧版本 ffmpeg 只有 out_time_ms（实际单位同样是微秒）
+        out_time_us = to_int(block.get("out_time_us") or block.get("out_time_ms"))
+        speed = block.get("speed", "").rstrip("x").strip()
         try:
-            cmd = [
-                "ffprobe", 
-                "-v", "error", 
-                "-show_entries", "format=duration", 
-                "-of", "default=noprint_wrappers=1:nokey=1", 
-                input_path
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            return float(result.stdout.strip())
-        except Exception as e:
-            logger.error(f"获取时长失败: {e}")
-            return 0
+            speed = float(speed)
+        except ValueError:
+            speed = None
+
+        percent = 0.0
+        if total_duration > 0:
+            percent = min(100.0, out_time_us / 1e6 / total_duration * 100)
+        if block.get("progress") == "end":
+            percent = 100.0
+
+        return {
+            "percent": percent,
+            "out_time_us": out_time_us,
+            "speed": speed,
+            "total_size": to_int(block.get("total_size")),
+            "bitrate": block.get("bitrate", "N/A").strip(),
+            "done": block.get("progress") == "end",
+        }
+
+    @staticmethod
+    def get_audio_codec(input_path):
+        """获取第一条音频流的编码名称（如 aac、mp3），没有音频流时返回 None"""
+        info = probe(input_path)
+        return info.audio_codec if info else None
 
     @staticmethod
-    def convert_to_audio(input_path, output_format="mp3", bitrate="192k", on_progress=None, cancel_event=None):
+    def can_stream_copy(codec, output_format):
+        """源音频编码能否直接封装进目标格式"""
+        return codec in CONVERT_CONFIG["copy_codecs"].get(output_format, ())
+
+    @staticmethod
+    def default_output_path(input_path, output_format):
+        """默认输出路径：与输入同目录、同名，扩展名换成目标格式"""
+        input_dir = os.path.dirname(input_path)
+        file_name = os.path.splitext(os.path.basename(input_path))[0]
+        return os.path.join(input_dir, f"{file_name}.{output_format}")
+
+    @staticmethod
+    def plan_outputs(inputs, output_format):
+        """
+        为批量转换分配输出路径，返回 {输入路径: 输出路径}
+        同名不同扩展名的输入（如 talk.mp4、talk.mkv）默认会写到同一个文件，
+        冲突时改为保留原扩展名（talk.mp4.mp3、talk.mkv.mp3）；仍然冲突的输入不分配输出路径（值为 None）
+        """
+        def key(path):
+            return os.path.normcase(os.path.abspath(path))
+
+        outputs = {path: MediaConverter.default_output_path(path, output_format) for path in inputs}
+        counts = {}
+        for output in outputs.values():
+            counts[key(output)] = counts.get(key(output), 0) + 1
+        for path, output in outputs.items():
+            if counts[key(output)] > 1:
+                outputs[path] = f"{path}.{output_format}"
+
+        owners = {}
+        for path, output in outputs.items():
+            owners.setdefault(key(output), []).append(path)
+        for paths in owners.values():
+            if len(paths) > 1:
+                for path in paths:
+                    outputs[path] = None
+        return outputs
+
+    @staticmethod
+    def convert_to_audio(input_path, output_format="mp3", bitrate="192k", on_progress=None, cancel_event=None,
+                         threads=None, allow_copy=True, output_path=None):
         """
         转换视频为音频
+        on_progress: 回调函数，接收 (percent, progress)，progress 为结构化进度字典
+                     (out_time_us, speed, total_size, bitrate)
+        threads: ffmpeg 使用的线程数，None 时由 ffmpeg 自行决定
+        allow_copy: 源音频编码与目标格式兼容时直接复制音频流（不重新编码，忽略 bitrate）
+        output_path: 输出路径，None 时取 default_output_path（已存在的文件会被覆盖）
+        返回结果中的 mode 为 "copy" 或 "transcode"
         """
         try:
             if not os.path.exists(input_path):
                 return {"success": False, "message": "输入文件不存在"}
 
-            input_dir = os.path.dirname(input_path)
-            file_name = os.path.splitext(os.path.basename(input_path))[0]
-            output_path = os.path.join(input_dir, f"{file_name}.{output_format}")
+            output_path = output_path or MediaConverter.default_output_path(input_path, output_format)
 
-            logger.info(f"开始转换: {input_path} -> {output_path}")
+            # 一次探测同时得到总时长（用于计算进度）和音频编码
+            info = probe(input_path)
+            total_duration = info.duration if info else 0
 
-            # 获取总时长用于计算进度
-            total_duration = MediaConverter.get_duration(input_path)
+            mode = "transcode"
+            if allow_copy and CONVERT_CONFIG["stream_copy"] and info:
+                if MediaConverter.can_stream_copy(info.audio_codec, output_format):
+                    mode = "copy"
 
-            cmd = [
-                "ffmpeg",
-                "-i", input_path,
-                "-vn", # 禁用视频流
-                "-y",  # 覆盖输出
-                "-b:a", bitrate,
-                output_path
-            ]
+            logger.info(f"开始转换 ({mode}): {input_path} -> {output_path}")
 
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                encoding='utf-8'
+            result = MediaConverter._run_ffmpeg(
+                input_path, output_path, mode, bitrate, threads, total_duration, on_progress, cancel_event
             )
+            if not result["success"] and mode == "copy" and not (cancel_event and cancel_event.is_set()):
+                # 复制失败（如容器不支持）时回退到重新编码
+                logger.warning(f"音频流复制失败，改为重新编码: {result['message']}")
+                mode = "transcode"
+                result = MediaConverter._run_ffmpeg(
+                    input_path, output_path, mode, bitrate, threads, total_duration, on_progress, cancel_event
+                )
 
-            # 解析 FFmpeg 进度
-            # size=     512kB time=00:00:26.56 bitrate= 157.9kbits/s speed=53.1x
-            time_pattern = re.compile(r'time=(\d{2}):(\d{2}):(\d{2}\.\d{2})')
-
-            for line in process.stdout:
-                if cancel_event and cancel_event.is_set():
-                    process.terminate()
-                    return {"success": False, "message": "已取消"}
-
-                line = line.strip()
-                match = time_pattern.search(line)
-                if match and total_duration > 0:
-
-                    h, m, s = map(float, match.groups())
-                    current_time = h * 3600 + m * 60 + s
-                    percent = min(100, (current_time / total_duration) * 100)
-                    
-                    if on_progress:
-                        on_progress(percent)
-                
-            process.wait()
-
-            if process.returncode == 0:
-                return {"success": True, "message": "转换完成", "output_path": output_path}
-            else:
-                return {"success": False, "message": "转换失败"}
+            result["mode"] = mode
+            return result
 
         except Exception as e:
             logger.error(f"转换异常: {e}")
             return {"success": False, "message": str(e)}
+
+    @staticmethod
+    def _run_ffmpeg(input_path, output_path, mode, bitrate, threads, total_duration, on_progress, cancel_event):
+        """运行一次 ffmpeg 音频提取并回报进度"""
+        cmd = [
+            "ffmpeg",
+            "-hide_banner",
+            "-nostats",
+            "-loglevel", "error",
+            "-progress", "pipe:1", # 机器可读的进度输出到 stdout
+            "-i", input_path,
+            "-vn", # 禁用视频流
+            "-y",  # 覆盖输出
+        ]
+        if mode == "copy":
+            cmd += ["-c:a", "copy"]
+        else:
+            cmd += ["-b:a", bitrate]
+            if threads:
+                cmd += ["-threads", str(threads)]
+        cmd.append(output_path)
+
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            encoding='utf-8',
+            errors='replace'
+        )
+
+        # 后台读取错误输出，避免管道写满阻塞 ffmpeg
+        errors = deque(maxlen=20)
+        stderr_thread = threading.Thread(
+            target=lambda: errors.extend(line.rstrip() for line in process.stderr),
+            daemon=True
+        )
+        stderr_thread.start()
+
+        for block in MediaConverter._iter_progress(process.stdout):
+            if cancel_event and cancel_event.is_set():
+                process.terminate()
+                process.wait()
+                # 删除未写完的输出文件
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                return {"success": False, "message": "已取消"}
+
+            if on_progress:
+                event = MediaConverter._progress_event(block, total_duration)
+                on_progress(event["percent"], event)
+
+        process.wait()
+        stderr_thread.join(timeout=1)
+
+        if process.returncode == 0:
+            return {"success": True, "message": "转换完成", "output_path": output_path}
+        else:
+            detail = errors[-1] if errors else ""
+            logger.error(f"ffmpeg 错误: {detail}")
+            return {"success": False, "message": f"转换失败 {detail}".strip()}
+
+    @staticmethod
+    def collect_inputs(source):
+        """
+        收集批量转换的输入文件
+        source: 目录（取其中的视频文件）、通配符模式或文件路径列表
+        """
+        if isinstance(source, (list, tuple)):
+            paths = list(source)
+        elif os.path.isdir(source):
+            extensions = tuple(CONVERT_CONFIG["video_extensions"])
+            paths = [
+                os.path.join(source, name) for name in os.listdir(source)
+                if name.lower().endswith(extensions)
+            ]
+        else:
+            paths = glob.glob(source, recursive=True)
+        return sorted(p for p in paths if os.path.isfile(p))
+
+    @staticmethod
+    def default_workers(threads_per_job=None):
+        """并发 ffmpeg 进程数：CPU 核数 / 每个任务的线程数"""
+        threads_per_job = threads_per_job or CONVERT_CONFIG["threads_per_job"]
+        return max(1, (os.cpu_count() or 1) // max(1, threads_per_job))
+
+    @staticmethod
+    def convert_batch(source, output_format="mp3", bitrate="192k", on_progress=None, on_file_done=None,
+                      cancel_event=None, max_workers=None, threads_per_job=None):
+        """
+        批量转换音频，同时运行多个 ffmpeg 进程
+        source: 目录、通配符模式或文件路径列表
+        on_progress: 回调函数，接收 (input_path, percent, total_percent)
+        on_file_done: 回调函数，接收 (input_path, result)
+        cancel_event: threading.Event，设置后所有 ffmpeg 进程都会被终止
+        """
+        inputs = MediaConverter.collect_inputs(source)
+        if not inputs:
+            return {"success": False, "message": "没有找到可转换的文件", "results": {}}
+
+        threads_per_job = threads_per_job or CONVERT_CONFIG["threads_per_job"]
+        workers = min(len(inputs), max_workers or MediaConverter.default_workers(threads_per_job))
+        logger.info(f"开始批量转换: {len(inputs)} 个文件, {workers} 个并发进程")
+
+        # 同名不同扩展名的输入会写到同一个输出文件，提前分配互不冲突的输出路径
+        outputs = MediaConverter.plan_outputs(inputs, output_format)
+        renamed = [path for path in inputs if outputs[path] and
+                   outputs[path] != MediaConverter.default_output_path(path, output_format)]
+        if renamed:
+            logger.warning(f"{len(renamed)} 个文件的输出文件名冲突，改为保留原扩展名: "
+                           f"{', '.join(os.path.basename(outputs[path]) for path in renamed)}")
+
+        percents = {path: 0.0 for path in inputs}
+        lock = threading.Lock()
+
+        def report(path, percent):
+            with lock:
+                percents[path] = percent
+                total = sum(percents.values()) / len(percents)
+            if on_progress:
+                on_progress(path, percent, total)
+
+        def convert_one(path):
+            if cancel_event and cancel_event.is_set():
+                return {"success": False, "message": "已取消"}
+            if outputs[path] is None:
+                return {"success": False, "message": "输出文件名与其他输入冲突"}
+            return MediaConverter.convert_to_audio(
+                path,
+                output_format,
+                bitrate,
+                lambda percent, progress: report(path, percent),
+                cancel_event,
+                threads=threads_per_job,
+                output_path=outputs[path]
+            )
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(convert_one, path): path for path in inputs}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"success": False, "message": str(e)}
+                results[path] = result
+                report(path, 100.0)
+                if on_file_done:
+                    on_file_done(path, result)
+
+        succeeded = sum(1 for r in results.values() if r["success"])
+        if cancel_event and cancel_event.is_set():
+            message = "已取消"
+        else:
+            message = f"批量转换完成: 成功 {succeeded}/{len(inputs)}"
+        return {
+            "success": succeeded == len(inputs),
+            "message": message,
+            "results": results,
+            "succeeded": succeeded,
+            "failed": len(inputs) - succeeded,
+        }
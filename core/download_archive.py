@@ -0,0 +1,313 @@
+"""
+下载记录（去重索引）：记录已下载过的视频（提取器 + 视频 ID），重新运行同一批链接时跳过已有的视频
+
+记录持久化在 SQLite 中，键的格式与 yt-dlp 的 --download-archive 相同（如 "youtube dQw4w9WgXcQ"）；
+启动时把全部键和链接载入内存，查询只需一次集合/字典查找，不访问数据库和网络。
+链接未见过时，用 yt-dlp 提取器的 URL 规则直接从链接中取出视频 ID（不发起请求），
+同一视频换了分享链接也能识别。链接推断出的 ID 与 yt-dlp 实际记录的 ID 不同时（如 B 站），
+记录时把推断出的键作为别名一并保存。
+"""
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+from yt_dlp.extractor import gen_extractor_classes
+from core.downloader import VideoDownloader
+from utils.config import DOWNLOAD_CONFIG
+from utils.logger import logger
+
+# 下载内容类型：同一视频的完整视频和仅音频分别记录
+KIND_VIDEO = "video"
+KIND_AUDIO = "audio"
+
+
+def make_key(extractor, video_id):
+    """记录键：小写提取器名 + 空格 + 视频 ID（与 yt-dlp 的下载记录文件格式一致）"""
+    return f"{extractor.lower()} {video_id}"
+
+
+# 常用站点的提取器优先匹配，多数链接不必逐个尝试上千个提取器的 URL 规则
+_COMMON_EXTRACTORS = ("Youtube", "BiliBili", "Vimeo", "Twitter", "TikTok", "Douyin", "Instagram", "Twitch:vod")
+
+
+@functools.lru_cache(maxsize=None)
+def _extractor_classes():
+    # 通用提取器能匹配任意链接，无法从链接得到视频 ID
+    classes = [ie for ie in gen_extractor_classes() if ie.ie_key() != "Generic"]
+    common = {name: i for i, name in enumerate(_COMMON_EXTRACTORS)}
+    # 稳定排序：常用提取器按上面的顺序排在最前，其余保持 yt-dlp 的原有顺序
+    return sorted(classes, key=lambda ie: common.get(ie.ie_key(), len(common)))
+
+
+def _bilibili_ids(ie, url, video_id):
+    """
+    B 站的 URL 规则只取出前缀之后的部分，而 yt-dlp 记录的 ID 带 BV/av 前缀；
+    带 ?p=N 时记录为 "BV…_pN"，不带时单 P 视频为 "BV…"、多 P 视频为 "BV…_p1"
+    """
+    prefix = ie._match_valid_url(url).groupdict().get("prefix") or ""
+    base = (prefix.upper() if prefix.lower() == "bv" else prefix.lower()) + video_id
+    part = parse_qs(urlsplit(url).query).get("p", [""])[-1]
+    if part.isdigit():
+        return [f"{base}_p{int(part)}"] + ([base] if int(part) == 1 else [])
+    return [base, f"{base}_p1"]
+
+
+# 链接中的 ID 与 yt-dlp 记录的 ID 不同的提取器：提取器名 -> 函数(提取器, 链接, 临时 ID) -> 候选 ID 列表
+_ID_ADJUSTERS = {
+    "BiliBili": _bilibili_ids,
+}
+
+# 站点 -> 上次识别该站点链接的提取器，同一批链接大多来自同一站点，先试它可省去逐个匹配
+_host_extractors = {}
+
+
+def _match_extractor(url):
+    host = urlsplit(url).hostname
+    cached = _host_extractors.get(host)
+    candidates = [cached] if cached is not None else []
+    for ie in candidates + _extractor_classes():
+        try:
+            if ie.suitable(url):
+                _host_extractors[host] = ie
+                return ie
+        except Exception:
+            continue
+    return None
+
+
+@functools.lru_cache(maxsize=65536)
+def keys_from_url(url):
+    """
+    只根据链接（不联网）推断可能的记录键，按可能性排序；没有提取器能识别时返回空元组。结果按链接缓存
+    """
+    ie = _match_extractor(url)
+    if ie is None:
+        return ()
+    try:
+        video_id = ie.get_temp_id(url)
+        if not video_id:
+            return ()
+        adjust = _ID_ADJUSTERS.get(ie.ie_key())
+        ids = adjust(ie, url, video_id) if adjust else [video_id]
+    except Exception:
+        return ()
+    return tuple(make_key(ie.ie_key(), video_id) for video_id in ids)
+
+
+def hash_files(paths, chunk_size=1024 * 1024):
+    """文件内容的 SHA-256（多个文件按路径排序后连续计算），文件不存在时返回 None"""
+    digest = hashlib.sha256()
+    try:
+        for path in sorted(paths):
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(chunk_size), b""):
+                    digest.update(chunk)
+    except OSError as e:
+        logger.warning(f"计算文件哈希失败: {e}")
+        return None
+    return digest.hexdigest()
+
+
+class DownloadArchive:
+    """
+    持久化的下载记录
+    hash_content: 记录时是否计算下载文件的 SHA-256，用于发现不同链接下载到的相同内容；
+                  默认取 DOWNLOAD_CONFIG["archive_hash"]
+    """
+
+    def __init__(self, path, hash_content=None):
+        self.path = Path(path)
+        self.hash_content = DOWNLOAD_CONFIG["archive_hash"] if hash_content is None else hash_content
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS archive ("
+                "key TEXT NOT NULL, kind TEXT NOT NULL, url TEXT, title TEXT, files TEXT, "
+                "sha256 TEXT, size INTEGER, created REAL NOT NULL, PRIMARY KEY (key, kind))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_archive_sha256 ON archive(sha256)")
+            # 从链接推断出的键 -> 实际记录键（两者不同时才保存）
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS aliases ("
+                "alias TEXT NOT NULL, kind TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (alias, kind))"
+            )
+
+        # 内存索引：(键, 类型) 集合，(规范化链接, 类型) -> 键，以及 (别名, 类型) -> 键
+        self._keys = set()
+        self._urls = {}
+        for key, kind, url in self._conn.execute("SELECT key, kind, url FROM archive"):
+            self._keys.add((key, kind))
+            if url:
+                self._urls[(url, kind)] = key
+        self._aliases = {
+            (alias, kind): key for alias, kind, key in self._conn.execute("SELECT alias, kind, key FROM aliases")
+        }
+
+    def __len__(self):
+        return len(self._keys)
+
+    def contains(self, key, kind=KIND_VIDEO):
+        return (key, kind) in self._keys
+
+    def match_url(self, url, kind=KIND_VIDEO):
+        """链接对应的视频已在记录中时返回记录键，否则返回 None（不联网）"""
+        url = VideoDownloader.normalize_url(url)
+        key = self._urls.get((url, kind))
+        if key is None:
+            for candidate in keys_from_url(url):
+                if (candidate, kind) in self._keys:
+                    key = candidate
+                else:
+                    key = self._aliases.get((candidate, kind))
+                if key is not None:
+                    break
+        if key is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return key
+
+    def _row_to_dict(self, row):
+        key, kind, url, title, files, sha256, size, created = row
+        return {
+            "key": key,
+            "kind": kind,
+            "url": url,
+            "title": title,
+            "files": json.loads(files) if files else [],
+            "sha256": sha256,
+            "size": size,
+            "created": created,
+        }
+
+    def lookup(self, key, kind=KIND_VIDEO):
+        """读取记录详情，不存在时返回 None"""
+        if (key, kind) not in self._keys:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM archive WHERE key = ? AND kind = ?", (key, kind)
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def find_by_hash(self, sha256):
+        """内容哈希相同的全部记录"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM archive WHERE sha256 = ?", (sha256,)).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def add(self, extractor, video_id, kind=KIND_VIDEO, url=None, title=None, files=None):
+        """记录一个已下载的视频，返回记录键；写入失败时记录警告并返回 None（不影响已完成的下载）"""
+        key = make_key(extractor, video_id)
+        files = list(files or [])
+        size = 0
+        for path in files:
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        sha256 = hash_files(files) if self.hash_content and files else None
+        aliases = []
+        if url:
+            url = VideoDownloader.normalize_url(url)
+            aliases = [alias for alias in keys_from_url(url) if alias != key]
+
+        try:
+            if sha256:
+                duplicates = [record["key"] for record in self.find_by_hash(sha256) if record["key"] != key]
+                if duplicates:
+                    logger.info(f"{key} 与已下载的 {', '.join(duplicates)} 内容相同")
+
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO archive (key, kind, url, title, files, sha256, size, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, kind, url, title, json.dumps(files), sha256, size, time.time())
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO aliases (alias, kind, key) VALUES (?, ?, ?)",
+                    [(alias, kind, key) for alias in aliases]
+                )
+                self._keys.add((key, kind))
+                if url:
+                    self._urls[(url, kind)] = key
+                for alias in aliases:
+                    self._aliases[(alias, kind)] = key
+        except sqlite3.Error as e:
+            logger.warning(f"写入下载记录失败: {e}")
+            return None
+        return key
+
+    def remove(self, key, kind=KIND_VIDEO):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM archive WHERE key = ? AND kind = ?", (key, kind))
+            self._conn.execute("DELETE FROM aliases WHERE key = ? AND kind = ?", (key, kind))
+            self._keys.discard((key, kind))
+            for url_kind in [k for k, v in self._urls.items() if v == key and k[1] == kind]:
+                del self._urls[url_kind]
+            for alias_kind in [k for k, v in self._aliases.items() if v == key and k[1] == kind]:
+                del self._aliases[alias_kind]
+
+    def cached_result(self, url, audio_only=False):
+        """
+        链接已下载过且文件仍在时，返回与 VideoDownloader.download_video 格式相同的结果（skipped 为 True）；
+        未下载过、文件已被删除或记录中没有文件时返回 None，需要重新下载
+        """
+        kind = KIND_AUDIO if audio_only else KIND_VIDEO
+        key = self.match_url(url, kind)
+        if key is None:
+            return None
+        try:
+            record = self.lookup(key, kind)
+        except sqlite3.Error as e:
+            logger.warning(f"读取下载记录失败: {e}")
+            return None
+        files = [path for path in record["files"] if os.path.exists(path)] if record else []
+        # 没有保存文件列表的记录（如整个合集中的单个视频）无法交给后续步骤，同样重新下载
+        if not files:
+            logger.info(f"{key} 的文件已不存在或未记录，重新下载")
+            return None
+        logger.info(f"已下载过，跳过: {url} ({key})")
+        return {
+            "success": True,
+            "message": "已下载过，跳过",
+            "skipped": True,
+            "files": files,
+            "downloaded_bytes": 0,
+            "elapsed": 0.0,
+            "throughput": 0.0,
+        }
+
+    def record(self, url, result, audio_only=False):
+        """根据 download_video 的成功结果记录下载的视频"""
+        media = result.get("media") or []
+        kind = KIND_AUDIO if audio_only else KIND_VIDEO
+        for item in media:
+            if not item.get("extractor") or not item.get("id"):
+                continue
+            # 一个链接对应多个视频时（如整个合集）不把链接映射到单个视频
+            self.add(item["extractor"], item["id"], kind, url if len(media) == 1 else None,
+                     item.get("title"), result.get("files") if len(media) == 1 else None)
+
+    def stats(self):
+        return {
+            "entries": len(self._keys),
+            "urls": len(self._urls),
+            "aliases": len(self._aliases),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
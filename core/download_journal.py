@@ -0,0 +1,130 @@
+"""
+下载任务日志：把每个下载任务的链接、格式、输出位置和状态持久化到 SQLite，
+程序意外退出后，下次启动时可找回未完成的任务并从临时目录中的分片/.part 文件续传
+"""
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from utils.config import DOWNLOAD_CONFIG
+from utils.logger import logger
+
+# 需要在启动时恢复的状态
+UNFINISHED_STATUSES = ("pending", "running")
+
+
+class DownloadJournal:
+    """
+    持久化的下载任务记录
+    每个任务有独立的临时目录 temp_dir/job-<id>，yt-dlp 的 .part 文件和分片写在其中，
+    下载完成后再移动到输出目录；任务 id 不变，重启后同一任务会写回同一临时目录，从而断点续传
+    """
+
+    def __init__(self, path, temp_dir=None):
+        self.path = Path(path)
+        self.temp_dir = Path(temp_dir or DOWNLOAD_CONFIG["temp_dir"])
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, output_dir TEXT NOT NULL, "
+                "quality_id TEXT, cookie_file TEXT, options TEXT NOT NULL, status TEXT NOT NULL, "
+                "message TEXT, files TEXT, created REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+
+    def add(self, url, output_dir, quality_id=None, cookie_file=None, options=None):
+        """记录新任务，返回任务 id"""
+        now = time.time()
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO jobs (url, output_dir, quality_id, cookie_file, options, status, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, 'pending', ?, ?)",
+                (url, str(output_dir), quality_id, cookie_file, json.dumps(options or {}), now, now)
+            )
+            return cur.lastrowid
+
+    def update(self, job_id, status, message=None, files=None):
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, message = COALESCE(?, message), "
+                    "files = COALESCE(?, files), updated = ? WHERE id = ?",
+                    (status, message, json.dumps(files) if files is not None else None, time.time(), job_id)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"更新下载任务记录失败: {e}")
+
+    def _row_to_dict(self, row):
+        job_id, url, output_dir, quality_id, cookie_file, options, status, message, files, created, updated = row
+        return {
+            "id": job_id,
+            "url": url,
+            "output_dir": output_dir,
+            "quality_id": quality_id,
+            "cookie_file": cookie_file,
+            "options": json.loads(options),
+            "status": status,
+            "message": message,
+            "files": json.loads(files) if files else [],
+            "created": created,
+            "updated": updated,
+        }
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def unfinished(self, include_failed=False):
+        """未完成（排队中或下载中被中断）的任务，按提交顺序返回；include_failed 时包括下载失败的任务"""
+        statuses = UNFINISHED_STATUSES + (("failed",) if include_failed else ())
+        placeholders = ", ".join("?" * len(statuses))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM jobs WHERE status IN ({placeholders}) ORDER BY id", statuses
+            ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def job_temp_dir(self, job_id):
+        """任务的临时目录（.part 文件和分片所在位置）"""
+        return self.temp_dir / f"job-{job_id}"
+
+    def partial_bytes(self, job_id):
+        """临时目录中已下载但未完成的数据量（字节）"""
+        suffix = DOWNLOAD_CONFIG["partial_suffix"]
+        total = 0
+        for root, _, names in os.walk(self.job_temp_dir(job_id)):
+            for name in names:
+                # 整文件下载为 xxx.part，分片下载为 xxx.part-Frag<N>
+                if suffix in name:
+                    try:
+                        total += os.path.getsize(os.path.join(root, name))
+                    except OSError:
+                        pass
+        return total
+
+    def discard_temp(self, job_id):
+        """删除任务的临时目录（任务完成或被取消后不再需要续传）"""
+        shutil.rmtree(self.job_temp_dir(job_id), ignore_errors=True)
+
+    def prune(self, max_age):
+        """删除结束超过 max_age 秒的任务记录及其临时目录（失败任务保留的部分下载数据）"""
+        placeholders = ", ".join("?" * len(UNFINISHED_STATUSES))
+        condition = f"status NOT IN ({placeholders}) AND updated < ?"
+        params = (*UNFINISHED_STATUSES, time.time() - max_age)
+        with self._lock, self._conn:
+            stale = [row[0] for row in self._conn.execute(f"SELECT id FROM jobs WHERE {condition}", params)]
+            self._conn.execute(f"DELETE FROM jobs WHERE {condition}", params)
+        for job_id in stale:
+            self.discard_temp(job_id)
+        return len(stale)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,429 @@
+import itertools
+import threading
+from collections import deque
+from urllib.parse import urlparse
+from core.downloader import VideoDownloader
+from utils.config import DOWNLOAD_CONFIG
+from utils.logger import logger
+
+# 任务状态
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+_job_ids = itertools.count(1)
+
+
+class DownloadJob:
+    """单个下载任务，拥有独立的取消令牌、进度和结果"""
+
+    def __init__(self, url, output_dir, quality_id=None, cookie_file=None,
+                 on_progress=None, on_done=None, options=None):
+        self.id = next(_job_ids)
+        self.url = url
+        self.output_dir = output_dir
+        self.quality_id = quality_id
+        self.cookie_file = cookie_file
+        # 透传给 VideoDownloader.download_video 的额外参数
+        self.options = dict(options or {})
+
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.host = _host_of(url)
+        self.batch = None
+        # 在下载任务记录 (DownloadJournal) 中的 id，未记录时为 None
+        self.journal_id = None
+        # 所在的下载队列，取消排队中的任务时由队列立即结束它
+        self.queue = None
+
+        self.cancel_event = threading.Event()
+        self.status = STATUS_PENDING
+        self.percent = 0.0
+        self.speed = ""
+        self.result = None
+        self._finished = threading.Event()
+
+    @property
+    def done(self):
+        return self._finished.is_set()
+
+    def cancel(self):
+        """取消任务（排队中的任务立即结束，运行中的任务在下一次进度回调时中止）"""
+        self.cancel_event.set()
+        if self.queue is not None:
+            self.queue._cancel_pending(self)
+
+    def wait(self, timeout=None):
+        """阻塞等待任务结束，返回结果字典（超时返回 None）"""
+        self._finished.wait(timeout)
+        return self.result
+
+    def _report_progress(self, percent, speed):
+        self.percent = percent
+        self.speed = speed
+        if self.on_progress:
+            self.on_progress(self, percent, speed)
+        if self.batch:
+            self.batch._report_progress(self, percent, speed)
+
+    def _finish(self, status, result):
+        self.status = status
+        self.result = result
+        self._finished.set()
+        if self.on_done:
+            try:
+                self.on_done(self)
+            except Exception as e:
+                logger.error(f"下载任务回调异常: {e}")
+        if self.batch:
+            self.batch._job_finished(self)
+
+
+class DownloadBatch:
+    """一组相关任务（如合集拆分出的每个视频），汇总整体进度"""
+
+    def __init__(self, title=None, on_progress=None, on_done=None, on_job_done=None):
+        self.title = title
+        self.jobs = []
+        # on_progress: 接收 (batch, job, percent, speed)
+        self.on_progress = on_progress
+        # on_done: 接收 (batch)，全部任务结束后调用
+        self.on_done = on_done
+        # on_job_done: 接收 (batch, job)，每个任务结束后调用
+        self.on_job_done = on_job_done
+        self._lock = threading.Lock()
+        self._remaining = 0
+
+    def _add(self, job):
+        job.batch = self
+        with self._lock:
+            self.jobs.append(job)
+            self._remaining += 1
+
+    @property
+    def done(self):
+        return all(job.done for job in self.jobs)
+
+    @property
+    def percent(self):
+        """整体进度：已结束的任务按 100% 计"""
+        if not self.jobs:
+            return 100.0
+        total = sum(100.0 if job.done else job.percent for job in self.jobs)
+        return total / len(self.jobs)
+
+    def counts(self):
+        counts = {}
+        for job in self.jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def cancel(self):
+        for job in self.jobs:
+            job.cancel()
+
+    def wait(self, timeout=None):
+        for job in self.jobs:
+            if not job._finished.wait(timeout):
+                return False
+        return True
+
+    def _report_progress(self, job, percent, speed):
+        if self.on_progress:
+            self.on_progress(self, job, percent, speed)
+
+    def _job_finished(self, job):
+        if self.on_job_done:
+            try:
+                self.on_job_done(self, job)
+            except Exception as e:
+                logger.error(f"下载批次回调异常: {e}")
+        with self._lock:
+            self._remaining -= 1
+            finished = self._remaining == 0
+        if finished and self.on_done:
+            try:
+                self.on_done(self)
+            except Exception as e:
+                logger.error(f"下载批次回调异常: {e}")
+
+
+def _host_of(url):
+    try:
+        return urlparse(url).hostname or ""
+    except ValueError:
+        return ""
+
+
+class DownloadQueue:
+    """
+    下载队列：接收任意数量的任务，由 N 个工作线程并发执行
+    max_workers: 并发下载数，默认取 DOWNLOAD_CONFIG["max_workers"]
+    max_per_host: 同一站点的并发上限，默认取 DOWNLOAD_CONFIG["max_per_host"]，0 表示不限制
+    journal: DownloadJournal，提供时持久化记录每个任务的状态，未完成的任务可在重启后续传
+    archive: DownloadArchive，提供时跳过已下载过的视频（在解析之前判断），并记录新下载的视频
+    """
+
+    def __init__(self, max_workers=None, max_per_host=None, journal=None, archive=None):
+        self.max_workers = max(1, max_workers or DOWNLOAD_CONFIG["max_workers"])
+        if max_per_host is None:
+            max_per_host = DOWNLOAD_CONFIG["max_per_host"]
+        self.max_per_host = max_per_host
+        self.journal = journal
+        self.archive = archive
+        self._pending = deque()
+        self._host_running = {}
+        self._jobs = []
+        self._workers = []
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._shutdown = False
+
+    def submit(self, url, output_dir, quality_id=None, cookie_file=None,
+               on_progress=None, on_done=None, **options):
+        """
+        提交下载任务，立即返回 DownloadJob
+        on_progress: 回调函数，接收 (job, percent, speed)
+        on_done: 回调函数，接收 (job)，任务结束（成功/失败/取消）后调用
+        """
+        job = DownloadJob(url, output_dir, quality_id, cookie_file,
+                          on_progress, on_done, options)
+        self.submit_job(job)
+        return job
+
+    def submit_job(self, job):
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("下载队列已关闭")
+            if self.journal is not None and job.journal_id is None:
+                job.journal_id = self.journal.add(job.url, job.output_dir, job.quality_id,
+                                                  job.cookie_file, job.options)
+            if job.journal_id is not None:
+                # 每个任务使用固定的临时目录，重启后从其中的 .part 文件续传
+                job.options["temp_dir"] = str(self.journal.job_temp_dir(job.journal_id))
+            job.queue = self
+            self._jobs.append(job)
+            self._pending.append(job)
+            self._ensure_workers()
+            self._cond.notify()
+        return job
+
+    def submit_batch(self, urls, output_dir, quality_id=None, cookie_file=None,
+                     on_progress=None, on_done=None, title=None, on_job_done=None, **options):
+        """
+        批量提交任务，返回 DownloadBatch
+        on_progress: 接收 (batch, job, percent, speed)
+        on_done: 接收 (batch)
+        on_job_done: 接收 (batch, job)
+        """
+        batch = DownloadBatch(title, on_progress, on_done, on_job_done)
+        jobs = [DownloadJob(url, output_dir, quality_id, cookie_file, options=options) for url in urls]
+        for job in jobs:
+            batch._add(job)
+        for job in jobs:
+            self.submit_job(job)
+        if not jobs and on_done:
+            on_done(batch)
+        return batch
+
+    def submit_playlist(self, url, output_dir, quality_id=None, cookie_file=None,
+                        on_progress=None, on_done=None, on_job_done=None, **options):
+        """
+        展开合集并把每个视频作为独立任务提交，返回 DownloadBatch
+        展开失败时返回 None
+        """
+        expanded = VideoDownloader.expand_playlist(url, cookie_file)
+        if not expanded["success"]:
+            logger.error(f"合集展开失败: {expanded['error']}")
+            return None
+        urls = [entry["url"] for entry in expanded["entries"]]
+        logger.info(f"合集 {expanded['title']} 展开为 {len(urls)} 个任务")
+        return self.submit_batch(urls, output_dir, quality_id, cookie_file,
+                                 on_progress, on_done, expanded["title"], on_job_done, **options)
+
+    def retry(self, job):
+        """重新提交结束的任务（通常是失败的任务），返回新的 DownloadJob；沿用原任务的临时目录，从断点续传"""
+        retried = DownloadJob(job.url, job.output_dir, job.quality_id, job.cookie_file,
+                              job.on_progress, job.on_done, job.options)
+        retried.journal_id = job.journal_id
+        return self.submit_job(retried)
+
+    def resume_unfinished(self, on_progress=None, on_done=None, include_failed=False):
+        """
+        重新提交任务记录中未完成的任务（上次退出时仍在排队或下载中），返回 DownloadJob 列表
+        include_failed: 同时重试下载失败的任务
+        已下载的部分保留在任务的临时目录中，会从断点继续下载
+        """
+        if self.journal is None:
+            return []
+        jobs = []
+        for record in self.journal.unfinished(include_failed):
+            job = DownloadJob(record["url"], record["output_dir"], record["quality_id"], record["cookie_file"],
+                              on_progress, on_done, record["options"])
+            job.journal_id = record["id"]
+            partial = self.journal.partial_bytes(record["id"])
+            logger.info(f"恢复下载任务: {job.url}（已下载 {partial / 1024 ** 2:.1f} MB）")
+            jobs.append(self.submit_job(job))
+        return jobs
+
+    def _ensure_workers(self):
+        # 按需启动工作线程，不超过 max_workers
+        self._workers = [w for w in self._workers if w.is_alive()]
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._worker_loop, daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def set_max_workers(self, n):
+        """调整并发数（缩小时多余的线程会在完成当前任务后退出）"""
+        with self._cond:
+            self.max_workers = max(1, int(n))
+            self._ensure_workers()
+            self._cond.notify_all()
+
+    def set_max_per_host(self, n):
+        with self._cond:
+            self.max_per_host = max(0, int(n))
+            self._cond.notify_all()
+
+    def _host_available(self, host):
+        return not self.max_per_host or self._host_running.get(host, 0) < self.max_per_host
+
+    def _cancel_pending(self, job):
+        """把已取消的任务移出等待队列并立即结束，不必等所在站点空出并发名额"""
+        with self._cond:
+            if job not in self._pending:
+                return
+            self._pending.remove(job)
+        self._finish_job(job, STATUS_CANCELLED, {"success": False, "message": "下载已取消"})
+
+    def _next_job(self):
+        """取出第一个所在站点未达并发上限的任务（需持有锁）；已取消的任务不受站点限制，直接取出结束"""
+        for job in self._pending:
+            if job.cancel_event.is_set() or self._host_available(job.host):
+                self._pending.remove(job)
+                return job
+        return None
+
+    def _worker_loop(self):
+        me = threading.current_thread()
+        while True:
+            with self._cond:
+                while True:
+                    # 并发数被调小时，多出来的线程主动退出
+                    if self._shutdown or len(self._workers) > self.max_workers:
+                        if me in self._workers:
+                            self._workers.remove(me)
+                        return
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    self._cond.wait()
+                self._host_running[job.host] = self._host_running.get(job.host, 0) + 1
+
+            try:
+                self._run_job(job)
+            finally:
+                with self._cond:
+                    self._host_running[job.host] -= 1
+                    self._cond.notify_all()
+
+    def _run_job(self, job):
+        if job.cancel_event.is_set():
+            self._finish_job(job, STATUS_CANCELLED, {"success": False, "message": "下载已取消"})
+            return
+
+        audio_only = job.options.get("audio_only", False)
+        if self.archive is not None:
+            try:
+                result = self.archive.cached_result(job.url, audio_only)
+            except Exception as e:
+                # 下载记录不可用时照常下载
+                logger.warning(f"查询下载记录失败: {e}")
+                result = None
+            if result is not None:
+                self._finish_job(job, STATUS_DONE, result)
+                return
+
+        job.status = STATUS_RUNNING
+        if job.journal_id is not None:
+            self.journal.update(job.journal_id, STATUS_RUNNING)
+        try:
+            result = VideoDownloader.download_video(
+                job.url,
+                job.output_dir,
+                job.quality_id,
+                job.cookie_file,
+                job._report_progress,
+                job.cancel_event,
+                **job.options
+            )
+        except Exception as e:
+            logger.error(f"下载任务异常: {e}")
+            result = {"success": False, "message": str(e)}
+
+        if self.archive is not None and result.get("success"):
+            try:
+                self.archive.record(job.url, result, audio_only)
+            except Exception as e:
+                logger.warning(f"写入下载记录失败: {e}")
+
+        if job.cancel_event.is_set() and not result.get("success"):
+            status = STATUS_CANCELLED
+        else:
+            status = STATUS_DONE if result.get("success") else STATUS_FAILED
+        self._finish_job(job, status, result)
+
+    def _finish_job(self, job, status, result):
+        if job.journal_id is not None:
+            self.journal.update(job.journal_id, status, result.get("message"), result.get("files"))
+            # 完成或被取消的任务不会再续传；失败的任务保留已下载的部分，重试时从断点继续，由 prune 清理
+            if status in (STATUS_DONE, STATUS_CANCELLED):
+                self.journal.discard_temp(job.journal_id)
+        job._finish(status, result)
+
+    @property
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs)
+
+    def active_jobs(self):
+        return [job for job in self.jobs if not job.done]
+
+    def stats(self):
+        """各状态任务计数"""
+        counts = {s: 0 for s in (STATUS_PENDING, STATUS_RUNNING, STATUS_DONE,
+                                 STATUS_FAILED, STATUS_CANCELLED)}
+        for job in self.jobs:
+            counts[job.status] += 1
+        return counts
+
+    def clear_finished(self):
+        """从任务列表中移除已结束的任务"""
+        with self._lock:
+            self._jobs = [job for job in self._jobs if not job.done]
+
+    def cancel_all(self):
+        for job in self.jobs:
+            job.cancel()
+
+    def join(self, timeout=None):
+        """等待当前所有任务结束，全部结束返回 True"""
+        for job in self.jobs:
+            if not job._finished.wait(timeout):
+                return False
+        return True
+
+    def shutdown(self, wait=True, cancel=False):
+        """关闭队列；未开始的任务保持 pending 状态，不再执行"""
+        if cancel:
+            self.cancel_all()
+        with self._cond:
+            self._shutdown = True
+            workers = list(self._workers)
+            self._cond.notify_all()
+        if wait:
+            for worker in workers:
+                worker.join()
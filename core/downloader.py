@@ -1,26 +1,107 @@
 
 import yt_dlp
+import atexit
+import functools
 import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from core.bandwidth import governor
+from core.formats import FormatIndex, is_storyboard
+from core.ydl_pool import YoutubeDLPool
+from utils.cache import DiskCache
+from utils.config import PATHS, DOWNLOAD_CONFIG, FORMAT_POLICIES
 from utils.logger import logger
 
+
+@functools.lru_cache(maxsize=None)
+def get_info_cache():
+    """视频信息缓存：键为规范化 URL + Cookie 标识；首次使用时才打开数据库"""
+    return DiskCache(
+        PATHS["app_data"] / "info_cache.db",
+        ttl=DOWNLOAD_CONFIG["info_cache_ttl"],
+        max_bytes=DOWNLOAD_CONFIG["info_cache_max_bytes"],
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_ydl_pool():
+    """解析视频信息用的 YoutubeDL 实例池，按 Cookie 区分，避免每次解析都重新初始化"""
+    pool = YoutubeDLPool(max_idle=DOWNLOAD_CONFIG["ydl_pool_size"])
+    # 进程退出时关闭空闲实例，Cookie 的更新写回文件
+    atexit.register(pool.close)
+    return pool
+
+
+_INFO_OPTIONS = {
+    'quiet': True,
+    'no_warnings': True,
+    'extract_flat': 'in_playlist', # 遇到列表时只提取基本信息，不深入解析每个视频，提高速度
+}
+
+# 不影响内容的分享/统计参数，规范化时去掉
+_TRACKING_PARAMS = {
+    "spm_id_from", "vd_source", "share_source", "share_medium", "share_plat",
+    "share_session_id", "share_tag", "share_from", "from_spmid", "unique_k",
+    "timestamp", "bbid", "ts", "si", "feature", "pp",
+}
+
 class VideoDownloader:
     @staticmethod
-    def fetch_video_info(url, cookie_file=None):
+    def normalize_url(url):
+        """规范化 URL：统一大小写、去掉锚点和统计参数、参数排序"""
+        try:
+            parts = urlsplit(url.strip())
+        except ValueError:
+            return url.strip()
+        query = [
+            (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if k not in _TRACKING_PARAMS and not k.startswith("utm_")
+        ]
+        query.sort()
+        path = parts.path.rstrip("/") or "/"
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+    @staticmethod
+    def _cookie_identity(cookie_file):
+        """
+        Cookie 文件标识（绝对路径）
+        不使用修改时间/大小：yt-dlp 每次下载结束都会把 Cookie 写回文件，
+        以文件元数据为键会让每次下载后信息缓存和实例池全部失效
+        """
+        if not cookie_file or not os.path.exists(cookie_file):
+            return ""
+        return os.path.abspath(cookie_file)
+
+    @staticmethod
+    def _info_cache_key(url, cookie_file=None):
+        return f"{VideoDownloader.normalize_url(url)}|{VideoDownloader._cookie_identity(cookie_file)}"
+
+    @staticmethod
+    def _info_ydl(cookie_file=None):
+        """从实例池借出解析信息用的 YoutubeDL（with 语句结束后归还）"""
+        options = dict(_INFO_OPTIONS)
+        if cookie_file and os.path.exists(cookie_file):
+            options['cookiefile'] = cookie_file
+        return get_ydl_pool().acquire(("info", VideoDownloader._cookie_identity(cookie_file)), options)
+
+    @staticmethod
+    def fetch_video_info(url, cookie_file=None, use_cache=True):
         """获取视频信息（异步任务中调用）"""
         try:
+            cache_key = VideoDownloader._info_cache_key(url, cookie_file)
+            if use_cache:
+                info = get_info_cache().get(cache_key)
+                if info is not None:
+                    logger.info(f"使用缓存的视频信息: {url}")
+                    return VideoDownloader._parse_info(info)
+
             logger.info(f"正在获取视频信息: {url}")
-            
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': 'in_playlist', # 遇到列表时只提取基本信息，不深入解析每个视频，提高速度
-            }
-            if cookie_file and os.path.exists(cookie_file):
-                ydl_opts['cookiefile'] = cookie_file
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                return VideoDownloader._parse_info(info)
+            with VideoDownloader._info_ydl(cookie_file) as ydl:
+                info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+            get_info_cache().set(cache_key, info)
+            return VideoDownloader._parse_info(info)
 
         except Exception as e:
             logger.error(f"获取信息异常: {e}")
@@ -32,10 +113,10 @@ class VideoDownloader:
         # 处理播放列表/合集
         if info.get('_type') == 'playlist' or ('entries' in info and not info.get('formats')):
             title = info.get("title", "未知列表")
-            entry_count = len(list(info.get("entries", [])))
+            entries = VideoDownloader._parse_entries(info)
             return {
                 "success": True,
-                "title": f"[合集] {title} (共 {entry_count} 个视频)",
+                "title": f"[合集] {title} (共 {len(entries)} 个视频)",
                 "qualities": [
                     {
                         "id": "bestvideo+bestaudio/best",
@@ -49,9 +130,11 @@ class VideoDownloader:
                         "size": 0,
                         "size_str": "Unknown",
                     }
-                ],
+                ] + [VideoDownloader._policy_quality(name) for name in FORMAT_POLICIES],
                 "thumbnail": None,
-                "duration": None
+                "duration": None,
+                # 合集中每个视频的链接，用于拆分成独立任务并行下载
+                "entries": entries,
             }
 
         title = info.get("title", "未知标题")
@@ -64,7 +147,8 @@ class VideoDownloader:
 
         for f in formats:
             format_id = f.get('format_id')
-            if not format_id:
+            # 预览缩略图（storyboard）不能作为视频下载
+            if not format_id or is_storyboard(f):
                 continue
                 
             ext = f.get('ext', '')
@@ -112,6 +196,7 @@ class VideoDownloader:
 
             qualities.append({
                 "id": actual_id,
+                "format_id": format_id,
                 "container": ext,
                 "quality": resolution or note or "Unknown",
                 "size": filesize,
@@ -121,33 +206,137 @@ class VideoDownloader:
                 "acodec": acodec
             })
             
-        # 排序：文件越大一般质量越好
-        qualities.sort(key=lambda x: x["size"] or 0, reverse=True)
-        
+        # 按格式索引的质量排名排序（有视频的在前，其次分辨率、帧率、码率），不再依赖文件大小
+        index = FormatIndex(formats, info.get("duration"))
+        rank = {entry.format_id: i for i, entry in enumerate(index.ranked())}
+        qualities.sort(key=lambda x: rank.get(x["format_id"], len(rank)))
+
+        # 按策略推荐的格式放在最前面
+        policies = index.resolve_all()
+        presets = [VideoDownloader._policy_quality(name, format_id)
+                   for name, format_id in policies.items() if format_id]
+        unresolved = [name for name, format_id in policies.items() if not format_id]
+        if unresolved:
+            logger.info(f"{title}: 以下格式策略没有符合条件的格式: {', '.join(unresolved)}")
+
         return {
             "success": True,
             "title": title,
-            "qualities": qualities,
+            "qualities": presets + qualities,
+            # {策略名: 格式 ID}，批量任务可直接按策略取格式
+            "policies": policies,
             "thumbnail": info.get("thumbnail"),
             "duration": info.get("duration")
         }
 
     @staticmethod
-    def download_video(url, output_dir, quality_id=None, cookie_file=None, on_progress=None, cancel_event=None):
+    def _policy_quality(name, format_id=None):
+        """策略推荐选项；format_id 为 None 时（合集）由每个视频下载时各自按策略选择"""
+        label = FORMAT_POLICIES[name]["label"]
+        return {
+            "id": format_id,
+            "policy": name,
+            "display": f"[推荐] {label}" + (f" ({format_id})" if format_id else ""),
+            "size": 0,
+            "size_str": "Unknown",
+        }
+
+    @staticmethod
+    def _parse_entries(info):
+        """提取合集条目（extract_flat='in_playlist' 时条目只包含基本信息）"""
+        entries = []
+        for entry in info.get("entries") or []:
+            if not entry:
+                continue
+            # 嵌套合集递归展开
+            if entry.get('_type') == 'playlist':
+                entries.extend(VideoDownloader._parse_entries(entry))
+                continue
+            # 部分提取器的 flat 条目 url 只是视频 id，优先使用完整页面链接
+            url = entry.get('webpage_url') or entry.get('url') or entry.get('original_url')
+            if not url:
+                continue
+            entries.append({
+                "url": url,
+                "title": entry.get("title") or url,
+                "duration": entry.get("duration"),
+            })
+        return entries
+
+    @staticmethod
+    def expand_playlist(url, cookie_file=None):
+        """
+        展开合集为单个视频列表
+        返回 {"success", "title", "entries": [{"url", "title", "duration"}]}；
+        非合集链接返回只包含自身的列表
+        """
+        try:
+            cache_key = VideoDownloader._info_cache_key(url, cookie_file)
+            info = get_info_cache().get(cache_key)
+            if info is None:
+                with VideoDownloader._info_ydl(cookie_file) as ydl:
+                    info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+                get_info_cache().set(cache_key, info)
+
+            if info.get('_type') == 'playlist' or ('entries' in info and not info.get('formats')):
+                entries = VideoDownloader._parse_entries(info)
+            else:
+                entries = [{"url": url, "title": info.get("title") or url, "duration": info.get("duration")}]
+            return {"success": True, "title": info.get("title", "未知列表"), "entries": entries}
+
+        except Exception as e:
+            logger.error(f"展开合集异常: {e}")
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def download_video(url, output_dir, quality_id=None, cookie_file=None, on_progress=None, cancel_event=None,
+                       audio_only=False, temp_dir=None, concurrent_fragments=None, format_policy=None):
         """
         下载视频
         on_progress: 回调函数，接收 (percent, speed)
         cancel_event: threading.Event，用于取消下载
+        audio_only: 只下载音频流（格式取 DOWNLOAD_CONFIG["audio_only_format"]，忽略 quality_id），
+                    不下载视频、不合并，得到的文件可直接用于转换或转录
+        temp_dir: 未完成的文件（.part、分片）存放目录，完成后才移动到 output_dir；
+                  使用同一目录重新下载时会从已有的 .part 文件续传
+        concurrent_fragments: HLS/DASH 分片并发下载的连接数，None 时取 DOWNLOAD_CONFIG["concurrent_fragments"]
+        format_policy: 格式选择策略名（见 FORMAT_POLICIES），按该视频的格式索引选出格式；
+                       指定了 quality_id 时以 quality_id 为准，没有符合策略的格式时使用默认格式
+        返回结果中的 files 为最终生成的文件路径（合并、后处理之后），media 为下载的视频 [{"extractor", "id", "title"}]，
+        downloaded_bytes / elapsed / throughput 为本次传输的总字节数、耗时（秒）和整体平均速度（字节/秒）
         """
         try:
             logger.info(f"开始下载: {url} -> {output_dir}")
             if not os.path.exists(output_dir):
                 os.makedirs(output_dir)
 
+            # 每个文件（视频流、音频流分别计）的 [起始字节数, 当前字节数]，
+            # 起始值为续传前已有的数据，本次传输量 = 当前 - 起始
+            transferred = {}
+            transferred_lock = threading.Lock()
+            host = urlsplit(url).hostname or ""
+            started = time.monotonic()
+
+            # 下载到的视频 (提取器, 视频 ID) -> 标题，供下载记录 (DownloadArchive) 使用
+            media = {}
+
             def progress_hook(d):
                 if cancel_event and cancel_event.is_set():
                     raise Exception("下载已取消")
 
+                info = d.get('info_dict') or {}
+                if info.get('id') and info.get('extractor_key'):
+                    media[(info['extractor_key'], info['id'])] = info.get('title')
+
+                if d['status'] in ('downloading', 'finished'):
+                    current = d.get('downloaded_bytes') or d.get('total_bytes') or 0
+                    with transferred_lock:
+                        counter = transferred.setdefault(d.get('filename'), [current, current])
+                        delta = current - counter[1]
+                        counter[1] = max(counter[1], current)
+                    # 从全局带宽控制器取额度，超出限速时在此阻塞下载线程
+                    governor.throttle(host, delta, cancel_event)
+
                 if d['status'] == 'downloading':
                     if on_progress:
                         try:
@@ -162,25 +351,85 @@ class VideoDownloader:
                     if on_progress:
                         on_progress(100.0, "完成")
 
+            files = []
+
+            paths = {'home': os.path.abspath(output_dir)}
+            if temp_dir:
+                os.makedirs(temp_dir, exist_ok=True)
+                paths['temp'] = os.path.abspath(temp_dir)
+
             ydl_opts = {
-                'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),
+                'outtmpl': '%(title)s.%(ext)s',
+                'paths': paths,
+                # 已有 .part 文件时续传而不是重新下载
+                'continuedl': True,
+                # 分片格式（HLS/DASH）同时用多个连接下载分片
+                'concurrent_fragment_downloads': max(1, concurrent_fragments or DOWNLOAD_CONFIG["concurrent_fragments"]),
+                # 限速时使用固定的小缓冲区，让每次回调的数据量较小，限速更平滑、各任务轮流更均匀
+                **({'buffersize': 64 * 1024, 'noresizebuffer': True} if governor.active else {}),
                 'progress_hooks': [progress_hook],
+                # 所有后处理完成后回调最终文件路径
+                'post_hooks': [files.append],
                 'quiet': True,
                 'no_warnings': True,
-                # 确保合并后的格式为 mp4 (如果发生了合并)
-                'merge_output_format': 'mp4',
             }
 
-            if quality_id:
-                ydl_opts['format'] = quality_id
+            if audio_only:
+                ydl_opts['format'] = DOWNLOAD_CONFIG["audio_only_format"]
+            else:
+                # 确保合并后的格式为 mp4 (如果发生了合并)
+                ydl_opts['merge_output_format'] = 'mp4'
+                if quality_id:
+                    ydl_opts['format'] = quality_id
             
             if cookie_file and os.path.exists(cookie_file):
                 ydl_opts['cookiefile'] = cookie_file
 
+            cache_key = VideoDownloader._info_cache_key(url, cookie_file)
+            cached_info = get_info_cache().get(cache_key)
+
+            if format_policy and not audio_only and not quality_id:
+                # 策略需要格式列表：先解析信息（写入缓存，下载时直接复用），再从格式索引中选
+                if cached_info is None:
+                    with VideoDownloader._info_ydl(cookie_file) as info_ydl:
+                        cached_info = info_ydl.sanitize_info(info_ydl.extract_info(url, download=False))
+                    get_info_cache().set(cache_key, cached_info)
+                format_id = FormatIndex.from_info(cached_info).resolve(format_policy)
+                if format_id:
+                    logger.info(f"按策略 {format_policy} 选择格式: {format_id}")
+                    ydl_opts['format'] = format_id
+                else:
+                    logger.warning(f"没有符合策略 {format_policy} 的格式，使用默认格式")
+
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+                if cached_info is not None:
+                    # 复用已获取的信息，跳过重新解析
+                    try:
+                        ydl.process_ie_result(cached_info, download=True)
+                    except yt_dlp.utils.DownloadError as e:
+                        if cancel_event and cancel_event.is_set():
+                            raise
+                        # 缓存的直链可能已失效，重新解析一次
+                        logger.warning(f"使用缓存信息下载失败，重新获取: {e}")
+                        get_info_cache().delete(cache_key)
+                        ydl.download([url])
+                else:
+                    ydl.download([url])
             
-            return {"success": True, "message": "下载完成"}
+            elapsed = time.monotonic() - started
+            downloaded = sum(current - start for start, current in transferred.values())
+            throughput = downloaded / elapsed if elapsed > 0 else 0.0
+            logger.info(f"下载完成: {downloaded / 1024 ** 2:.1f} MB, 平均 {throughput / 1024 ** 2:.2f} MB/s")
+            return {
+                "success": True,
+                "message": "下载完成",
+                "files": files,
+                "media": [{"extractor": extractor, "id": video_id, "title": title}
+                          for (extractor, video_id), title in media.items()],
+                "downloaded_bytes": downloaded,
+                "elapsed": elapsed,
+                "throughput": throughput,
+            }
 
         except Exception as e:
             logger.error(f"下载异常: {e}")
@@ -0,0 +1,217 @@
+"""
+格式索引与策略选择
+
+FormatIndex 从一次解析得到的 info dict 构建，按编码族、容器、分辨率建立索引，
+可按条件查询格式，并按策略（如 "不超过 1080p 的最佳 H.264"、"适合语音识别的最小音频"）排序选出格式 ID。
+同一索引上的策略结果会被缓存，批量任务重复解析同一策略时直接查表。
+"""
+from utils.config import FORMAT_POLICIES
+
+# 编码名前缀 -> 编码族
+_CODEC_FAMILIES = [
+    ("avc", "h264"), ("h264", "h264"),
+    ("hev", "h265"), ("hvc", "h265"), ("h265", "h265"),
+    ("vp09", "vp9"), ("vp9", "vp9"), ("vp8", "vp8"),
+    ("av01", "av1"), ("av1", "av1"),
+    ("mp4a", "aac"), ("aac", "aac"),
+    ("opus", "opus"), ("vorbis", "vorbis"), ("mp3", "mp3"), ("flac", "flac"), ("ac-3", "ac3"), ("ec-3", "eac3"),
+]
+
+
+# 编码未知（yt-dlp 给出 None 而不是 "none"）时，按容器推断是否含视频/音频
+_VIDEO_EXTS = {"mp4", "webm", "mkv", "flv", "mov", "avi", "3gp", "ts"}
+_AUDIO_EXTS = {"m4a", "mp3", "opus", "ogg", "oga", "aac", "flac", "wav", "weba"}
+
+
+def is_storyboard(fmt):
+    """预览缩略图（storyboard，mhtml 格式）不是可下载的音视频"""
+    return (fmt.get("ext") == "mhtml" or fmt.get("protocol") == "mhtml"
+            or "storyboard" in (fmt.get("format_note") or "").lower())
+
+
+def codec_family(codec):
+    """把具体编码名（如 avc1.640028、mp4a.40.2）归为编码族（h264、aac），无编码返回 None"""
+    if not codec or codec == "none":
+        return None
+    codec = codec.lower()
+    for prefix, family in _CODEC_FAMILIES:
+        if codec.startswith(prefix):
+            return family
+    return codec.split(".")[0]
+
+
+class FormatEntry:
+    """单个格式的归一化字段"""
+    __slots__ = ("format_id", "ext", "vcodec", "acodec", "width", "height", "fps", "tbr", "abr", "asr", "size",
+                 "has_video", "has_audio")
+
+    def __init__(self, fmt, duration=None):
+        self.format_id = str(fmt["format_id"])
+        self.ext = fmt.get("ext") or ""
+        self.vcodec = codec_family(fmt.get("vcodec"))
+        self.acodec = codec_family(fmt.get("acodec"))
+        self.width = fmt.get("width") or 0
+        self.height = fmt.get("height") or 0
+        self.fps = fmt.get("fps") or 0
+        self.tbr = fmt.get("tbr") or 0
+        self.abr = fmt.get("abr") or 0
+        self.asr = fmt.get("asr") or 0
+        # 文件大小：精确值 > 近似值 > 码率 * 时长估算
+        size = fmt.get("filesize") or fmt.get("filesize_approx") or 0
+        bitrate = self.tbr or self.abr
+        if not size and bitrate and duration:
+            size = bitrate * 1000 / 8 * duration
+        self.size = int(size)
+
+        # 编码为 "none" 表示没有该流；字段缺失表示未知，按分辨率、码率和容器推断
+        raw_vcodec = fmt.get("vcodec")
+        raw_acodec = fmt.get("acodec")
+        if raw_vcodec is None:
+            self.has_video = bool(self.height or self.width) or (self.ext in _VIDEO_EXTS and not self.abr)
+        else:
+            self.has_video = self.vcodec is not None
+        if raw_acodec is None:
+            # 编码都未知的视频格式多为音视频合一
+            self.has_audio = (self.ext in _AUDIO_EXTS or bool(self.abr)
+                              or (raw_vcodec is None and self.has_video))
+        else:
+            self.has_audio = self.acodec is not None
+
+
+class FormatIndex:
+    """
+    格式索引，构建一次后可多次查询
+    policies: 策略表 {名称: 策略}，默认取 FORMAT_POLICIES；策略字段见 utils/config.py
+    """
+
+    def __init__(self, formats, duration=None, policies=None):
+        self.policies = policies or FORMAT_POLICIES
+        self.entries = [FormatEntry(fmt, duration) for fmt in formats
+                        if fmt.get("format_id") and not is_storyboard(fmt)]
+        self.by_id = {entry.format_id: entry for entry in self.entries}
+        self.by_vcodec = {}
+        self.by_acodec = {}
+        self.by_ext = {}
+        for entry in self.entries:
+            if entry.vcodec:
+                self.by_vcodec.setdefault(entry.vcodec, []).append(entry)
+            if entry.acodec:
+                self.by_acodec.setdefault(entry.acodec, []).append(entry)
+            self.by_ext.setdefault(entry.ext, []).append(entry)
+        self._resolved = {}
+
+    @classmethod
+    def from_info(cls, info, policies=None):
+        formats = info.get("formats") or ([info] if info.get("format_id") else [])
+        return cls(formats, info.get("duration"), policies)
+
+    def query(self, kind=None, vcodec=None, acodec=None, ext=None, min_height=None, max_height=None,
+              min_abr=None, max_abr=None, min_asr=None):
+        """
+        按条件筛选格式
+        kind: "video" 纯视频流, "audio" 纯音频流, "muxed" 音视频合一, None 不限
+        """
+        if vcodec:
+            candidates = self.by_vcodec.get(vcodec, [])
+        elif acodec:
+            candidates = self.by_acodec.get(acodec, [])
+        elif ext:
+            candidates = self.by_ext.get(ext, [])
+        else:
+            candidates = self.entries
+
+        result = []
+        for entry in candidates:
+            if kind == "video" and not (entry.has_video and not entry.has_audio):
+                continue
+            if kind == "audio" and not (entry.has_audio and not entry.has_video):
+                continue
+            if kind == "muxed" and not (entry.has_video and entry.has_audio):
+                continue
+            if vcodec and entry.vcodec != vcodec:
+                continue
+            if acodec and entry.acodec != acodec:
+                continue
+            if ext and entry.ext != ext:
+                continue
+            if min_height and entry.height < min_height:
+                continue
+            if max_height and entry.height > max_height:
+                continue
+            # 码率/采样率未知的格式不因下限被排除
+            if min_abr and entry.abr and entry.abr < min_abr:
+                continue
+            if max_abr and entry.abr > max_abr:
+                continue
+            if min_asr and entry.asr and entry.asr < min_asr:
+                continue
+            result.append(entry)
+        return result
+
+    @staticmethod
+    def _rank_key(entry, rank):
+        if rank == "smallest":
+            # 大小未知的排在最后
+            return (entry.size or float("inf"), entry.tbr or entry.abr or float("inf"))
+        return (entry.height, entry.fps, entry.tbr or entry.abr, entry.size)
+
+    def best(self, rank="best", prefer=None, **criteria):
+        """按 rank（"best" 最高质量 / "smallest" 最小体积）选出一个格式；prefer 中的编码族优先"""
+        candidates = self.query(**criteria)
+        if not candidates:
+            return None
+        choose = max if rank != "smallest" else min
+        if prefer:
+            preferred = [entry for entry in candidates if entry.vcodec in prefer or entry.acodec in prefer]
+            candidates = preferred or candidates
+        return choose(candidates, key=lambda entry: self._rank_key(entry, rank))
+
+    def _resolve_policy(self, policy):
+        kind = policy.get("kind", "video")
+        rank = policy.get("rank", "best")
+        criteria = {key: policy[key] for key in ("vcodec", "acodec", "ext", "min_height", "max_height",
+                                                  "min_abr", "max_abr", "min_asr") if key in policy}
+
+        if kind == "audio":
+            entry = self.best(rank, policy.get("prefer"), kind="audio", **criteria)
+            if entry is None and policy.get("fallback_muxed", True):
+                entry = self.best("smallest", kind="muxed", **criteria)
+            return entry.format_id if entry else None
+
+        video = self.best(rank, policy.get("prefer"), kind="video", **criteria)
+        muxed = self.best(rank, policy.get("prefer"), kind="muxed", **criteria)
+        if video is None:
+            return muxed.format_id if muxed else None
+
+        # 纯视频流需要搭配音频：mp4 容器优先 aac，其余优先 opus
+        audio_prefer = ["aac"] if video.ext == "mp4" else ["opus", "vorbis"]
+        audio = self.best(policy.get("audio_rank", rank), audio_prefer, kind="audio")
+        if muxed is not None:
+            if rank == "smallest":
+                merged_size = video.size + audio.size if audio and video.size and audio.size else 0
+                if (muxed.size or float("inf")) <= (merged_size or float("inf")):
+                    return muxed.format_id
+            # 画质相同时优先音视频合一的格式，省去合并
+            elif (muxed.height, muxed.fps) >= (video.height, video.fps):
+                return muxed.format_id
+        return f"{video.format_id}+{audio.format_id}" if audio else video.format_id
+
+    def resolve(self, policy):
+        """
+        按策略（名称或策略字典）解析出格式 ID（可直接作为 yt-dlp 的 format），没有符合条件的格式时返回 None
+        按名称解析的结果会被缓存
+        """
+        if isinstance(policy, dict):
+            return self._resolve_policy(policy)
+        if policy not in self._resolved:
+            self._resolved[policy] = self._resolve_policy(self.policies[policy])
+        return self._resolved[policy]
+
+    def resolve_all(self):
+        """解析全部已配置的策略，返回 {策略名: 格式 ID}"""
+        return {name: self.resolve(name) for name in self.policies}
+
+    def ranked(self):
+        """按质量从高到低排列全部格式（有视频的在前，其次按分辨率、帧率、码率）"""
+        return sorted(self.entries, key=lambda entry: (entry.has_video,) + self._rank_key(entry, "best"),
+                      reverse=True)
@@ -0,0 +1,139 @@
+import gc
+import threading
+import time
+from collections import OrderedDict
+from utils.logger import logger
+
+# 各 Whisper 模型的参数量（用于加载前估算内存占用）
+_PARAM_COUNTS = {
+    "tiny": 39_000_000,
+    "base": 74_000_000,
+    "small": 244_000_000,
+    "medium": 769_000_000,
+    "large": 1_550_000_000,
+    "turbo": 809_000_000,
+}
+
+
+def model_memory(model):
+    """模型参数和缓冲区占用的字节数"""
+    total = 0
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def estimate_memory(model_name):
+    """加载前估算模型内存（按 fp32 计算），未知模型返回 0"""
+    base_name = model_name.split(".")[0].split("-")[0]
+    return _PARAM_COUNTS.get(base_name, 0) * 4
+
+
+class ModelManager:
+    """
+    模型生命周期管理：按 (model_name, device) 缓存已加载的模型，
+    总占用超过内存预算时按最近最少使用 (LRU) 顺序卸载
+    loader: 加载函数，接收 (model_name, device) 返回模型
+    budget: 内存预算（字节），None 表示不限制
+    """
+
+    def __init__(self, loader, budget=None):
+        self.loader = loader
+        self.budget = budget
+        self._models = OrderedDict()  # key -> (model, bytes)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_times = {}
+
+    def get(self, model_name, device):
+        """获取模型，未加载时加载（必要时先卸载旧模型腾出预算）"""
+        key = (model_name, device)
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+            self._evict_for(estimate_memory(model_name))
+
+            start = time.perf_counter()
+            model = self.loader(model_name, device)
+            elapsed = time.perf_counter() - start
+            size = model_memory(model)
+
+            self.load_times[key] = elapsed
+            self._models[key] = (model, size)
+            logger.info(f"模型加载完成: {model_name} ({device}), {size / 1024 ** 2:.0f} MB, 耗时 {elapsed:.1f}s")
+
+            # 实际占用可能与估算不同，加载后再检查一次（不卸载刚加载的模型）
+            self._evict_for(0, keep=key)
+            return model
+
+    def _evict_for(self, incoming, keep=None):
+        """卸载最久未使用的模型，直到能容纳 incoming 字节（需持有锁）"""
+        if self.budget is None:
+            return
+        evicted = False
+        while self._models and self.used_bytes() + incoming > self.budget:
+            key = next(iter(self._models))
+            if key == keep:
+                if len(self._models) == 1:
+                    break
+                self._models.move_to_end(key)
+                continue
+            self._unload(key)
+            evicted = True
+        if evicted:
+            self._release_memory()
+
+    def _unload(self, key):
+        model, size = self._models.pop(key)
+        self.evictions += 1
+        logger.info(f"卸载模型: {key[0]} ({key[1]}), 释放 {size / 1024 ** 2:.0f} MB")
+        del model
+
+    def _release_memory(self):
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def used_bytes(self):
+        return sum(size for _, size in self._models.values())
+
+    def unload(self, model_name=None, device=None):
+        """卸载指定模型（不指定时卸载全部）"""
+        with self._lock:
+            for key in list(self._models):
+                if (model_name is None or key[0] == model_name) and (device is None or key[1] == device):
+                    self._unload(key)
+            self._release_memory()
+
+    def __contains__(self, key):
+        return key in self._models
+
+    def stats(self):
+        """命中/未命中次数、加载耗时与当前常驻模型"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "used_bytes": self.used_bytes(),
+                "budget": self.budget,
+                "resident": [
+                    {"model": key[0], "device": key[1], "bytes": size}
+                    for key, (_, size) in self._models.items()
+                ],
+                "load_times": {f"{name}@{device}": t for (name, device), t in self.load_times.items()},
+            }
@@ -0,0 +1,327 @@
+"""
+下载 -> 提取音频 -> 转录 流水线
+
+每个阶段有独立的工作线程和有界输入队列：
+  - 不同条目的不同阶段并行执行（第 2 个视频下载时，第 1 个视频可以在转录）
+  - 下游队列满时上游工作线程阻塞在入队操作上，不再领取新任务（背压），
+    避免下载速度远快于转录时在磁盘上堆积大量待处理文件
+"""
+import itertools
+import queue
+import threading
+from core.converter import MediaConverter
+from core.downloader import VideoDownloader
+from utils.config import PIPELINE_CONFIG
+from utils.logger import logger
+
+# 阶段名称
+STAGE_DOWNLOAD = "download"
+STAGE_CONVERT = "convert"
+STAGE_TRANSCRIBE = "transcribe"
+
+# 条目状态
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+_item_ids = itertools.count(1)
+
+# 阶段队列的结束标记
+_STOP = object()
+
+
+class PipelineItem:
+    """流水线中的一个条目（一个链接），记录所处阶段、进度和各阶段结果"""
+
+    def __init__(self, url):
+        self.id = next(_item_ids)
+        self.url = url
+        self.status = STATUS_PENDING
+        self.stage = None
+        self.percent = 0.0
+        # 下载得到的文件、提取出的音频、转录结果文件
+        self.files = []
+        self.audio_files = []
+        self.outputs = []
+        self.results = {}
+        self.message = ""
+        self._finished = threading.Event()
+
+    @property
+    def done(self):
+        return self._finished.is_set()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+
+class _Stage:
+    """流水线的一个阶段：workers 个线程从有界队列中取条目执行 func"""
+
+    def __init__(self, pipeline, name, func, workers, queue_size):
+        self.pipeline = pipeline
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.next = None
+        self.busy = 0
+        self._threads = []
+        self._exited = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def put(self, item):
+        """入队；队列已满时阻塞（取消后放弃等待）"""
+        while True:
+            try:
+                self.queue.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                if item is not _STOP and self.pipeline.cancel_event.is_set():
+                    return False
+
+    def _worker_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+
+            if self.pipeline.cancel_event.is_set():
+                self.pipeline._finish(item, STATUS_CANCELLED, "已取消")
+                continue
+
+            item.stage = self.name
+            item.status = STATUS_RUNNING
+            item.percent = 0.0
+            with self._lock:
+                self.busy += 1
+            try:
+                ok = self.func(item)
+            except Exception as e:
+                logger.error(f"流水线 {self.name} 阶段异常: {e}")
+                item.message = str(e)
+                ok = False
+            finally:
+                with self._lock:
+                    self.busy -= 1
+
+            if not ok:
+                cancelled = self.pipeline.cancel_event.is_set()
+                self.pipeline._finish(item, STATUS_CANCELLED if cancelled else STATUS_FAILED, item.message)
+            elif self.next is None:
+                self.pipeline._finish(item, STATUS_DONE, "完成")
+            elif not self.next.put(item):
+                self.pipeline._finish(item, STATUS_CANCELLED, "已取消")
+
+        # 本阶段最后一个线程退出时，通知下一阶段结束
+        with self._lock:
+            self._exited += 1
+            last = self._exited == self.workers
+        if last and self.next is not None:
+            for _ in range(self.next.workers):
+                self.next.put(_STOP)
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+
+class Pipeline:
+    """
+    流水线编排：对每个链接依次执行 下载 -> 提取音频（可选）-> 转录
+    audio_only: 只下载音频流，不下载和合并视频（转录场景推荐）
+    audio_format: 提取音频的格式，None 时直接转录下载得到的文件
+    transcribe: 转录函数，参数与 VideoTranscriber.transcribe 相同；默认在当前进程中转录，
+                界面中可传入 TranscribeWorker.transcribe（参数一致）在常驻子进程中执行
+    transcribe_options: 传给转录函数的其余关键字参数，如 {"chunked", "vad", "language", "use_cache", "on_segment"}
+    workers: 各阶段并发数 {"download": n, "convert": n, "transcribe": n}，缺省取 PIPELINE_CONFIG
+    queue_size: 阶段之间最多排队的条目数，缺省取 PIPELINE_CONFIG["queue_size"]
+    on_progress: 回调函数，接收 (item, stage, percent, info)
+    on_item_done: 回调函数，接收 (item)，条目结束（完成/失败/取消）后调用
+    archive: DownloadArchive，提供时已下载过（且文件仍在）的链接直接使用已有文件进入后续阶段
+    """
+
+    def __init__(self, output_dir, quality_id=None, cookie_file=None, audio_only=False, audio_format=None,
+                 bitrate="192k", model_name="base", output_format="txt", use_gpu=True, transcribe=None,
+                 transcribe_options=None, workers=None, queue_size=None, on_progress=None, on_item_done=None,
+                 download_options=None, archive=None):
+        self.output_dir = output_dir
+        self.quality_id = quality_id
+        self.cookie_file = cookie_file
+        self.download_options = dict(download_options or {})
+        if audio_only:
+            self.download_options["audio_only"] = True
+        self.archive = archive
+        self.audio_format = audio_format
+        self.bitrate = bitrate
+        self.model_name = model_name
+        self.output_format = output_format
+        self.use_gpu = use_gpu
+        self.transcribe = transcribe
+        self.transcribe_options = dict(transcribe_options or {})
+        self.on_progress = on_progress
+        self.on_item_done = on_item_done
+        self.cancel_event = threading.Event()
+
+        workers = dict(workers or {})
+        if queue_size is None:
+            queue_size = PIPELINE_CONFIG["queue_size"]
+
+        # 下载阶段的输入队列不限长度，submit 不会阻塞调用方
+        self.stages = [_Stage(self, STAGE_DOWNLOAD, self._download,
+                              workers.get(STAGE_DOWNLOAD) or PIPELINE_CONFIG["download_workers"], 0)]
+        if audio_format:
+            self.stages.append(_Stage(self, STAGE_CONVERT, self._convert,
+                                      workers.get(STAGE_CONVERT) or PIPELINE_CONFIG["convert_workers"], queue_size))
+        self.stages.append(_Stage(self, STAGE_TRANSCRIBE, self._transcribe,
+                                  workers.get(STAGE_TRANSCRIBE) or PIPELINE_CONFIG["transcribe_workers"], queue_size))
+        for stage, next_stage in zip(self.stages, self.stages[1:]):
+            stage.next = next_stage
+
+        self._items = []
+        self._lock = threading.Lock()
+        self._closed = False
+        for stage in self.stages:
+            stage.start()
+
+    def submit(self, url):
+        """提交一个链接，立即返回 PipelineItem"""
+        item = PipelineItem(url)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("流水线已关闭")
+            self._items.append(item)
+        self.stages[0].put(item)
+        return item
+
+    def submit_many(self, urls):
+        return [self.submit(url) for url in urls]
+
+    def close(self):
+        """不再接收新条目；已提交的条目处理完后各阶段线程依次退出"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        first = self.stages[0]
+        for _ in range(first.workers):
+            first.put(_STOP)
+
+    def cancel(self):
+        """取消所有未完成的条目（正在下载/转换的任务会被中止，正在转录的任务执行完当前文件后停止）"""
+        self.cancel_event.set()
+
+    def join(self, timeout=None):
+        """关闭流水线并等待所有阶段结束"""
+        self.close()
+        for stage in self.stages:
+            stage.join(timeout)
+
+    @property
+    def items(self):
+        with self._lock:
+            return list(self._items)
+
+    def stats(self):
+        """各阶段正在执行和排队的条目数，以及各状态的条目计数"""
+        counts = {s: 0 for s in (STATUS_PENDING, STATUS_RUNNING, STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED)}
+        for item in self.items:
+            counts[item.status] += 1
+        return {
+            "stages": {
+                stage.name: {"workers": stage.workers, "busy": stage.busy, "queued": stage.queue.qsize()}
+                for stage in self.stages
+            },
+            "items": counts,
+        }
+
+    def _report(self, item, stage, percent, info=None):
+        item.percent = percent
+        if self.on_progress:
+            self.on_progress(item, stage, percent, info)
+
+    def _finish(self, item, status, message):
+        item.status = status
+        item.message = message
+        item._finished.set()
+        if self.on_item_done:
+            try:
+                self.on_item_done(item)
+            except Exception as e:
+                logger.error(f"流水线回调异常: {e}")
+
+    def _download(self, item):
+        audio_only = self.download_options.get("audio_only", False)
+        result = self.archive.cached_result(item.url, audio_only) if self.archive is not None else None
+        if result is None:
+            result = VideoDownloader.download_video(
+                item.url,
+                self.output_dir,
+                self.quality_id,
+                self.cookie_file,
+                lambda percent, speed: self._report(item, STAGE_DOWNLOAD, percent, speed),
+                self.cancel_event,
+                **self.download_options
+            )
+            if self.archive is not None and result["success"]:
+                self.archive.record(item.url, result, audio_only)
+        item.results[STAGE_DOWNLOAD] = result
+        item.files = list(result.get("files", []))
+        if result["success"] and not item.files:
+            item.message = "没有找到下载的文件"
+            return False
+        item.message = result["message"]
+        return result["success"]
+
+    def _convert(self, item):
+        for index, path in enumerate(item.files):
+            def on_progress(percent, progress, index=index):
+                self._report(item, STAGE_CONVERT, (index * 100 + percent) / len(item.files), progress)
+
+            result = MediaConverter.convert_to_audio(
+                path, self.audio_format, self.bitrate, on_progress, self.cancel_event
+            )
+            item.results.setdefault(STAGE_CONVERT, []).append(result)
+            if not result["success"]:
+                item.message = result["message"]
+                return False
+            item.audio_files.append(result["output_path"])
+        return True
+
+    def _transcribe(self, item):
+        transcribe = self.transcribe
+        if transcribe is None:
+            from core.transcriber import VideoTranscriber
+            transcribe = VideoTranscriber.transcribe
+
+        inputs = item.audio_files if self.audio_format else item.files
+        for index, path in enumerate(inputs):
+            if self.cancel_event.is_set():
+                item.message = "已取消"
+                return False
+
+            def on_progress(msg, percent, index=index):
+                self._report(item, STAGE_TRANSCRIBE, (index * 100 + percent) / len(inputs), msg)
+
+            result = transcribe(
+                path,
+                model_name=self.model_name,
+                output_format=self.output_format,
+                use_gpu=self.use_gpu,
+                on_progress=on_progress,
+                **self.transcribe_options
+            )
+            item.results.setdefault(STAGE_TRANSCRIBE, []).append(result)
+            if not result["success"]:
+                item.message = result["message"]
+                return False
+            item.outputs.append(result["output_path"])
+        return True
@@ -0,0 +1,160 @@
+import json
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from utils.logger import logger
+
+# 探测结果缓存上限（按文件）
+_CACHE_SIZE = 256
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class StreamInfo:
+    """单条媒体流的信息"""
+    __slots__ = ("index", "codec_type", "codec_name", "sample_rate", "channels",
+                 "bit_rate", "width", "height", "duration")
+
+    def __init__(self, data):
+        self.index = data.get("index")
+        self.codec_type = data.get("codec_type")
+        self.codec_name = data.get("codec_name")
+        self.sample_rate = _to_int(data.get("sample_rate"))
+        self.channels = _to_int(data.get("channels"))
+        self.bit_rate = _to_int(data.get("bit_rate"))
+        self.width = _to_int(data.get("width"))
+        self.height = _to_int(data.get("height"))
+        self.duration = _to_float(data.get("duration"))
+
+    def __repr__(self):
+        return f"StreamInfo({self.index}, {self.codec_type}, {self.codec_name})"
+
+
+class MediaInfo:
+    """ffprobe 探测结果（时长、容器、码率及各条流信息）"""
+    __slots__ = ("path", "duration", "format_name", "bit_rate", "size", "streams")
+
+    def __init__(self, path, data):
+        fmt = data.get("format", {})
+        self.path = path
+        self.format_name = fmt.get("format_name")
+        self.bit_rate = _to_int(fmt.get("bit_rate"))
+        self.size = _to_int(fmt.get("size"))
+        self.streams = tuple(StreamInfo(s) for s in data.get("streams", []))
+
+        duration = _to_float(fmt.get("duration"))
+        if duration is None:
+            # 部分容器只在流上记录时长
+            durations = [s.duration for s in self.streams if s.duration]
+            duration = max(durations) if durations else 0.0
+        self.duration = duration
+
+    @property
+    def audio_streams(self):
+        return [s for s in self.streams if s.codec_type == "audio"]
+
+    @property
+    def video_streams(self):
+        return [s for s in self.streams if s.codec_type == "video"]
+
+    @property
+    def has_audio(self):
+        return bool(self.audio_streams)
+
+    @property
+    def has_video(self):
+        return bool(self.video_streams)
+
+    @property
+    def audio_codec(self):
+        """第一条音频流的编码，没有音频流时为 None"""
+        streams = self.audio_streams
+        return streams[0].codec_name if streams else None
+
+    @property
+    def sample_rate(self):
+        streams = self.audio_streams
+        return streams[0].sample_rate if streams else None
+
+    def summary(self):
+        """一行摘要：时长、音频编码和采样率"""
+        audio = self.audio_codec or "无"
+        if self.sample_rate:
+            audio += f" {self.sample_rate}Hz"
+        return f"时长 {self.duration:.1f}s, 音频 {audio}"
+
+    def __repr__(self):
+        return f"MediaInfo({self.path!r}, duration={self.duration}, streams={self.streams})"
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def probe(path):
+    """
+    用一次 ffprobe 获取媒体信息，返回 MediaInfo（失败返回 None）
+    结果按 (路径, 修改时间（纳秒）, 大小) 缓存，文件变化后自动重新探测
+    """
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        logger.error(f"探测媒体信息失败: {e}")
+        return None
+
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        info = _cache.get(key)
+        if info is not None:
+            _cache.move_to_end(key)
+            return info
+
+    try:
+        cmd = [
+            "ffprobe",
+            "-v", "error",
+            "-print_format", "json",
+            "-show_streams",
+            "-show_format",
+            path
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="replace")
+        if result.returncode != 0:
+            logger.error(f"探测媒体信息失败: {result.stderr.strip()}")
+            return None
+        info = MediaInfo(path, json.loads(result.stdout or "{}"))
+    except Exception as e:
+        logger.error(f"探测媒体信息失败: {e}")
+        return None
+
+    with _cache_lock:
+        _cache[key] = info
+        _cache.move_to_end(key)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return info
+
+
+def report_media_info(path, log):
+    """探测文件并把媒体信息摘要交给 log 回调（界面选好文件后在后台线程中调用），探测失败时不回调"""
+    info = probe(path)
+    if info:
+        log(f"媒体信息: {info.summary()}")
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,279 @@
+"""
+常驻语音识别进程
+
+父进程通过 TranscribeWorker 启动一个长期运行的子进程 (python -m core.transcribe_worker)，
+模型加载后常驻内存，后续任务无需重新导入 torch/whisper 和加载模型。
+
+双向通信使用长度前缀的 JSON 帧（4 字节大端长度 + UTF-8 JSON）：
+  父 -> 子: {"cmd": "transcribe" | "preload" | "devices" | "shutdown", ...}
+  子 -> 父: {"type": "progress" | "segment" | "result" | "loaded" | "devices" | "error", ...}
+子进程的 stdout 专用于协议帧，日志和第三方库的输出都被重定向到 stderr。
+"""
+import json
+import os
+import struct
+import subprocess
+import sys
+import threading
+from collections import deque
+from utils.logger import logger
+
+# 项目根目录（子进程以此为工作目录运行 -m core.transcribe_worker）
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_HEADER = struct.Struct(">I")
+
+# 等待任务结果时检查子进程是否存活的间隔（秒）
+_POLL_INTERVAL = 1.0
+
+
+def write_frame(stream, message):
+    """写入一帧消息"""
+    payload = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    stream.write(_HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+
+def read_frames(stream):
+    """逐帧读取消息，流结束时停止"""
+    while True:
+        header = stream.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return
+        (length,) = _HEADER.unpack(header)
+        payload = stream.read(length)
+        if len(payload) < length:
+            return
+        yield json.loads(payload.decode("utf-8"))
+
+
+class _Job:
+    """父进程中正在执行的一次转录任务，负责处理子进程发来的消息"""
+
+    def __init__(self, on_progress=None, on_segment=None):
+        self.on_progress = on_progress
+        self.on_segment = on_segment
+        self.result = {"success": False, "message": "任务被终止或发生错误"}
+        self.done = threading.Event()
+
+    def handle(self, message):
+        kind = message.get("type")
+        if kind == "progress":
+            if self.on_progress:
+                self.on_progress(message["msg"], message["percent"])
+        elif kind == "segment":
+            if self.on_segment:
+                self.on_segment(message["segment"])
+        elif kind == "result":
+            self.result = message["result"]
+            self.done.set()
+
+    def fail(self, message):
+        """子进程退出或通信中断时结束任务（已有结果时不覆盖）"""
+        if not self.done.is_set():
+            self.result = {"success": False, "message": message}
+            self.done.set()
+
+
+class TranscribeWorker:
+    """常驻转录子进程的客户端，同一时间只执行一个任务"""
+
+    def __init__(self):
+        self.process = None
+        self._job = None
+        self._job_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._on_devices = None
+        self.stderr_tail = deque(maxlen=20)
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """启动子进程（已运行时直接返回）"""
+        with self._start_lock:
+            if self.is_alive():
+                return
+
+            startupinfo = None
+            if os.name == 'nt':
+                startupinfo = subprocess.STARTUPINFO()
+                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+
+            process = subprocess.Popen(
+                [sys.executable, "-m", "core.transcribe_worker"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=_ROOT_DIR,
+                startupinfo=startupinfo
+            )
+            self.process = process
+            self.stderr_tail = deque(maxlen=20)
+            threading.Thread(target=self._read_loop, args=(process,), daemon=True).start()
+            threading.Thread(target=self._drain_stderr, args=(process,), daemon=True).start()
+
+    def _read_loop(self, process):
+        try:
+            for message in read_frames(process.stdout):
+                job = self._job
+                if message.get("type") == "error":
+                    logger.error(f"转录进程错误: {message.get('message')}")
+                elif message.get("type") == "devices":
+                    if self._on_devices:
+                        self._on_devices(message)
+                elif job is not None and process is self.process:
+                    try:
+                        job.handle(message)
+                    except Exception as e:
+                        # 回调出错不能中断读取，否则后续的结果帧无人接收
+                        logger.error(f"处理转录进程消息失败: {e}")
+        except (OSError, ValueError) as e:
+            logger.error(f"读取转录进程消息失败: {e}")
+        # 输出流结束（子进程退出或崩溃）：结束当前任务
+        job = self._job
+        if job is not None and process is self.process and not job.done.is_set():
+            job.fail(self._exit_message())
+
+    def _exit_message(self):
+        if self.stderr_tail:
+            logger.error(f"转录进程已退出: {self.stderr_tail[-1]}")
+            return f"转录进程已退出: {self.stderr_tail[-1]}"
+        return "转录进程已退出"
+
+    def _drain_stderr(self, process):
+        # 子进程的日志、警告等非协议输出，保留最后几行用于排错
+        for line in process.stderr:
+            self.stderr_tail.append(line.decode("utf-8", errors="replace").rstrip())
+
+    def _send(self, message):
+        write_frame(self.process.stdin, message)
+
+    def preload(self, model_name, use_gpu=True):
+        """预加载模型（异步，不等待加载完成）"""
+        try:
+            self.start()
+            self._send({"cmd": "preload", "model": model_name, "use_gpu": use_gpu})
+        except OSError:
+            pass
+
+    def query_devices(self, callback):
+        """
+        查询子进程中可用的计算设备（异步），结果通过 callback 返回 {"cuda": bool}
+        CUDA 检测需要导入 torch，放在子进程中进行，界面进程无需导入
+        """
+        self._on_devices = callback
+        try:
+            self.start()
+            self._send({"cmd": "devices"})
+        except OSError:
+            callback({"cuda": False})
+
+    def transcribe(self, input_path, model_name="base", output_format="txt", use_gpu=True, on_progress=None,
+                   on_segment=None, chunked=False, workers=None, vad=None, language=None, use_cache=True):
+        """
+        提交转录任务并阻塞等待结果，参数与 VideoTranscriber.transcribe 相同
+        on_progress: 回调函数，接收 (msg, percent)
+        on_segment: 回调函数，接收 {"start", "end", "text"}，识别出一段即回调一次
+        chunked: CPU 模式下分段并行识别长音频
+        workers: 分段识别的进程数，None 时自动计算
+        vad: 识别前跳过静音，None 时使用配置默认值
+        language: 语言代码，None 时自动检测
+        use_cache: 是否复用缓存的识别结果
+        """
+        with self._job_lock:
+            job = _Job(on_progress, on_segment)
+            try:
+                self.start()
+                self._job = job
+                self._send({
+                    "cmd": "transcribe",
+                    "input_path": input_path,
+                    "model": model_name,
+                    "output_format": output_format,
+                    "use_gpu": use_gpu,
+                    "chunked": chunked,
+                    "workers": workers,
+                    "vad": vad,
+                    "language": language,
+                    "use_cache": use_cache,
+                })
+                # 定时检查子进程是否存活：进程退出而读取线程未能结束任务时也不会永久阻塞
+                process = self.process
+                while not job.done.wait(_POLL_INTERVAL):
+                    if process.poll() is not None:
+                        # 读取线程可能还在处理最后几帧，稍等后仍无结果才判定失败
+                        if not job.done.wait(_POLL_INTERVAL):
+                            job.fail(self._exit_message())
+                        break
+            except OSError as e:
+                job.result = {"success": False, "message": str(e)}
+            finally:
+                self._job = None
+            return job.result
+
+    def terminate(self):
+        """强制结束子进程（用于取消正在进行的任务，常驻模型会随之释放）"""
+        process = self.process
+        if process is not None and process.poll() is None:
+            try:
+                process.terminate()
+            except OSError:
+                pass
+
+    def shutdown(self):
+        """通知子进程退出"""
+        if self.is_alive():
+            try:
+                self._send({"cmd": "shutdown"})
+            except OSError:
+                self.terminate()
+
+
+def main():
+    # 协议帧使用原始 stdout，之后所有 print/日志输出都改写到 stderr
+    out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+
+    from core.transcriber import VideoTranscriber, cuda_available
+
+    def send(message):
+        write_frame(out, message)
+
+    for message in read_frames(sys.stdin.buffer):
+        cmd = message.get("cmd")
+        if cmd == "shutdown":
+            break
+        elif cmd == "preload":
+            try:
+                VideoTranscriber.preload(message["model"], message.get("use_gpu", True))
+                send({"type": "loaded", "model": message["model"]})
+            except Exception as e:
+                send({"type": "error", "message": f"预加载模型失败: {e}"})
+        elif cmd == "devices":
+            try:
+                cuda = cuda_available()
+            except Exception as e:
+                logger.error(f"检测 CUDA 失败: {e}")
+                cuda = False
+            send({"type": "devices", "cuda": cuda})
+        elif cmd == "transcribe":
+            result = VideoTranscriber.transcribe(
+                message["input_path"],
+                message.get("model", "base"),
+                message.get("output_format", "txt"),
+                message.get("use_gpu", True),
+                on_progress=lambda msg, percent: send({"type": "progress", "msg": msg, "percent": percent}),
+                on_segment=lambda segment: send({"type": "segment", "segment": segment}),
+                chunked=message.get("chunked", False),
+                workers=message.get("workers"),
+                vad=message.get("vad"),
+                language=message.get("language"),
+                use_cache=message.get("use_cache", True)
+            )
+            send({"type": "result", "result": result})
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,362 @@
 
 import os
-import whisper
-import torch
+import re
+import sys
+import threading
+import hashlib
+import functools
+import importlib
+import multiprocessing
 import warnings
+import weakref
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from core.audio import load_audio, SAMPLE_RATE
+from core.audio_chunks import plan_chunks, remap_segments
+from core.model_manager import ModelManager
+from core.vad import detect_speech, SpeechMap
+from utils.cache import DiskCache
+from utils.config import PATHS, WHISPER_CONFIG
 from utils.logger import logger
 from datetime import timedelta
 
 # 忽略 FP16 警告 (如果 CPU 运行)
 warnings.filterwarnings("ignore")
 
+
+@functools.lru_cache(maxsize=None)
+def get_transcript_cache():
+    """
+    识别结果缓存：键为文件内容哈希 + 模型 + 语言 + 识别参数，值为完整分段列表
+    首次使用时才打开数据库，分段识别的 spawn 子进程导入本模块时不会打开
+    """
+    return DiskCache(
+        PATHS["app_data"] / "transcript_cache.db",
+        max_bytes=WHISPER_CONFIG["cache_max_bytes"],
+    )
+
+
+# Whisper 在 verbose=True 时用 print 逐段输出识别结果。把 whisper.transcribe 模块中的 print 换成按线程分发的版本，
+# 正在识别的线程的输出交给各自的 _SegmentWriter，其余输出照常打印，不替换整个进程的 sys.stdout
+_stream_local = threading.local()
+
+# Whisper 解码时会在模型上挂 kv-cache 钩子，同一个模型对象同一时间只能执行一个识别；不同模型可以并发
+_model_locks = weakref.WeakKeyDictionary()
+_model_locks_guard = threading.Lock()
+
+
+def _routed_print(*args, sep=" ", end="\n", file=None, flush=False):
+    writer = getattr(_stream_local, "writer", None)
+    if writer is None or file is not None:
+        print(*args, sep=sep, end=end, file=file, flush=flush)
+        return
+    writer.write((" " if sep is None else sep).join(str(arg) for arg in args) + ("\n" if end is None else end))
+
+
+@functools.lru_cache(maxsize=None)
+def _install_print_hook():
+    # whisper 包把同名函数导出为 whisper.transcribe，需从 sys.modules 取得模块本身
+    module = importlib.import_module("whisper.transcribe")
+    module.print = _routed_print
+
+
+def _model_lock(model):
+    with _model_locks_guard:
+        lock = _model_locks.get(model)
+        if lock is None:
+            lock = _model_locks[model] = threading.Lock()
+        return lock
+
+
+class _SegmentWriter:
+    """
+    接收当前线程中 Whisper 的 verbose 输出，把每行 "[00:01.000 --> 00:04.000] text" 转为分段字典，
+    其他输出原样转发给 passthrough
+    这些分段只用于实时显示，最终结果以 model.transcribe 返回的 segments 为准
+    """
+    line_pattern = re.compile(
+        r"^\[(?:(\d+):)?(\d+):(\d+\.\d+) --> (?:(\d+):)?(\d+):(\d+\.\d+)\]\s?(.*)$"
+    )
+
+    def __init__(self, on_segment, passthrough=None):
+        self.on_segment = on_segment
+        self.passthrough = passthrough
+        self._buffer = ""
+
+    def write(self, text):
+        self._buffer += text
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            match = self.line_pattern.match(line.strip())
+            if not match:
+                if self.passthrough is not None:
+                    self.passthrough.write(line + "\n")
+                continue
+            h1, m1, s1, h2, m2, s2, content = match.groups()
+            self.on_segment({
+                "start": int(h1 or 0) * 3600 + int(m1) * 60 + float(s1),
+                "end": int(h2 or 0) * 3600 + int(m2) * 60 + float(s2),
+                "text": content,
+            })
+        return len(text)
+
+    def flush(self):
+        if self.passthrough is not None:
+            self.passthrough.flush()
+
+
+@functools.lru_cache(maxsize=None)
+def cuda_available():
+    """CUDA 是否可用；torch 导入较慢，首次调用时才导入并缓存结果"""
+    import torch
+    return torch.cuda.is_available()
+
+
+def _load_whisper_model(model_name, device):
+    import whisper
+    return whisper.load_model(model_name, device=device)
+
+
+_chunk_model_name = None
+
+
+def _init_chunk_worker(model_name, threads):
+    """分段识别子进程初始化：限制线程数并加载模型"""
+    global _chunk_model_name
+    import torch
+    torch.set_num_threads(threads)
+    _chunk_model_name = model_name
+    VideoTranscriber._get_model(model_name, "cpu")
+
+
+def _transcribe_chunk(audio, language=None):
+    model = VideoTranscriber._get_model(_chunk_model_name, "cpu")
+    result = model.transcribe(audio, verbose=None, fp16=False, language=language)
+    return [
+        {"start": segment["start"], "end": segment["end"], "text": segment["text"]}
+        for segment in result["segments"]
+    ]
+
+
 class VideoTranscriber:
-    _model_cache = {}
+    # 已加载的模型，总占用超过 WHISPER_CONFIG["model_memory_budget"] 时按 LRU 卸载
+    models = ModelManager(_load_whisper_model, WHISPER_CONFIG["model_memory_budget"])
 
     @staticmethod
     def _get_model(model_name, device=None):
         """获取或加载模型"""
         # 确定设备
         if device is None:
-            device = "cuda" if torch.cuda.is_available() else "cpu"
+            device = "cuda" if cuda_available() else "cpu"
+
+        if (model_name, device) not in VideoTranscriber.models:
+            logger.info(f"正在加载 Whisper 模型: {model_name} (Device: {device})...")
+        try:
+            return VideoTranscriber.models.get(model_name, device)
+        except Exception as e:
+            # 如果加载失败（例如显存不足或CUDA错误），尝试回退到CPU
+            if device == "cuda":
+                logger.warning(f"GPU加载失败，尝试使用CPU: {e}")
+                return VideoTranscriber.models.get(model_name, "cpu")
+            raise e
+
+    @staticmethod
+    def preload(model_name, use_gpu=True):
+        """预先加载模型到缓存，后续转录直接复用"""
+        device = "cuda" if use_gpu and cuda_available() else "cpu"
+        VideoTranscriber._get_model(model_name, device)
+        logger.info(f"模型已就绪: {model_name} (Device: {device})")
+
+    @staticmethod
+    def _transcribe_single(audio, model_name, device, language=None, on_progress=None, on_segment=None):
+        """在当前进程中用一个模型识别整段音频"""
+        # 加载模型
+        if on_progress:
+            on_progress("正在加载模型...", 0)
         
-        cache_key = (model_name, device)
+        model = VideoTranscriber._get_model(model_name, device)
+        duration = len(audio) / SAMPLE_RATE
+
+        if on_progress:
+            on_progress("正在转录中 (这可能需要一些时间)...", 10)
         
-        if cache_key not in VideoTranscriber._model_cache:
-            logger.info(f"正在加载 Whisper 模型: {model_name} (Device: {device})...")
+        if not (on_progress or on_segment):
+            with _model_lock(model):
+                return model.transcribe(audio, verbose=None, language=language)
+
+        streamed = []
+
+        def handle_segment(segment):
+            streamed.append(segment)
+            if on_segment:
+                on_segment(segment)
+            if on_progress and duration > 0:
+                percent = min(99, segment["end"] / duration * 100)
+                on_progress(f"转录中: {percent:.1f}%", percent)
+
+        # Whisper 只在 verbose=True 时逐段打印结果，截获当前线程的这些输出转为分段回调
+        _install_print_hook()
+        with _model_lock(model):
+            _stream_local.writer = _SegmentWriter(handle_segment, sys.stdout)
             try:
-                VideoTranscriber._model_cache[cache_key] = whisper.load_model(model_name, device=device)
-            except Exception as e:
-                # 如果加载失败（例如显存不足或CUDA错误），尝试回退到CPU
-                if device == "cuda":
-                    logger.warning(f"GPU加载失败，尝试使用CPU: {e}")
-                    device = "cpu"
-                    cache_key = (model_name, device)
-                    if cache_key not in VideoTranscriber._model_cache:
-                        VideoTranscriber._model_cache[cache_key] = whisper.load_model(model_name, device=device)
-                else:
-                    raise e
-                    
-        return VideoTranscriber._model_cache[cache_key]
+                result = model.transcribe(audio, verbose=True, language=language)
+            finally:
+                _stream_local.writer = None
+        # 未能截获逐段输出时（Whisper 改变了输出方式），识别结束后按返回的分段补发回调
+        if on_segment and not streamed:
+            for segment in result["segments"]:
+                on_segment({"start": segment["start"], "end": segment["end"], "text": segment["text"]})
+        return result
 
     @staticmethod
-    def transcribe(input_path, model_name="base", output_format="txt", use_gpu=True, on_progress=None):
+    def _transcribe_chunked(audio, model_name, language=None, on_progress=None, on_segment=None, workers=None):
+        """
+        分段并行识别：在静音处把音频切成带重叠的窗口，每个子进程持有自己的模型
+        音频不足一段时返回 None，由调用方按普通方式识别
+        """
+        sample_rate = SAMPLE_RATE
+        chunks = plan_chunks(
+            audio,
+            sample_rate,
+            WHISPER_CONFIG["chunk_seconds"],
+            WHISPER_CONFIG["chunk_overlap"]
+        )
+        if len(chunks) < 2:
+            return None
+
+        threads = WHISPER_CONFIG["chunk_threads"]
+        workers = min(len(chunks), workers or max(1, (os.cpu_count() or 1) // threads))
+        logger.info(f"开始分段转录: {len(chunks)} 段, {workers} 个进程")
+        if on_progress:
+            on_progress(f"正在分段转录 ({len(chunks)} 段, {workers} 个进程)...", 1)
+
+        results = [None] * len(chunks)
+        done_samples = 0
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_chunk_worker,
+            initargs=(model_name, threads)
+        ) as pool:
+            futures = {
+                pool.submit(_transcribe_chunk, audio[chunk["start"]:chunk["end"]], language): i
+                for i, chunk in enumerate(chunks)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                chunk = chunks[i]
+                results[i] = remap_segments(future.result(), chunk, sample_rate)
+                if on_segment:
+                    for segment in results[i]:
+                        on_segment(segment)
+                done_samples += chunk["keep_end"] - chunk["keep_start"]
+                if on_progress:
+                    percent = min(99, done_samples / len(audio) * 100)
+                    on_progress(f"转录中: {percent:.1f}%", percent)
+
+        segments = [segment for chunk_segments in results for segment in chunk_segments]
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+        }
+
+    @staticmethod
+    def file_hash(path):
+        """文件内容哈希，用作识别结果缓存的键（与文件名、路径无关）"""
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _cache_key(input_path, model_name, language, chunked, vad):
+        options = f"chunked={int(bool(chunked))},vad={int(bool(vad))}"
+        return f"{VideoTranscriber.file_hash(input_path)}|{model_name}|{language or 'auto'}|{options}"
+
+    @staticmethod
+    def write_output(output_path, output_format, text, segments):
+        """把识别结果按 txt/srt/vtt 格式写入文件"""
+        with open(output_path, "w", encoding="utf-8") as f:
+            if output_format == "txt":
+                f.write(text)
+            elif output_format == "srt":
+                for i, segment in enumerate(segments, start=1):
+                    start = str(timedelta(seconds=int(segment["start"]))) + ",000"
+                    end = str(timedelta(seconds=int(segment["end"]))) + ",000"
+                    f.write(f"{i}\n{start} --> {end}\n{segment['text'].strip()}\n\n")
+            elif output_format == "vtt":
+                f.write("WEBVTT\n\n")
+                for i, segment in enumerate(segments, start=1):
+                    start = str(timedelta(seconds=int(segment["start"]))) + ".000"
+                    end = str(timedelta(seconds=int(segment["end"]))) + ".000"
+                    f.write(f"{start} --> {end}\n{segment['text'].strip()}\n\n")
+
+    @staticmethod
+    def _run(input_path, model_name, device, language, chunked, workers, vad, on_progress, on_segment):
+        """解码并识别，返回 {"text", "segments", "vad_skipped"}"""
+        # 只解码一次，得到的 16kHz float32 音频同时用于计算时长和模型推理
+        if on_progress:
+            on_progress("正在解码音频...", 0)
+        audio = load_audio(input_path)
+        logger.info(f"开始转录: {input_path} ({len(audio) / SAMPLE_RATE:.1f}s)")
+
+        # 静音检测：只把有声区间拼接后送入模型，结果再换算回原始时间轴
+        speech_map = None
+        if vad:
+            speech_map = SpeechMap(detect_speech(audio, SAMPLE_RATE), SAMPLE_RATE, len(audio))
+            if speech_map.speech_samples < len(audio) * WHISPER_CONFIG["vad_min_speech_ratio"]:
+                # 保留的音频过少时多半是检测失误，宁可完整识别也不输出空结果
+                logger.warning(f"静音检测只保留了 {1 - speech_map.skipped_ratio:.1%} 的音频，改为完整识别")
+                speech_map = None
+        if speech_map:
+            audio = speech_map.compact(audio)
+            logger.info(f"静音检测: 跳过 {speech_map.skipped_ratio:.1%} 的音频")
+            if on_segment:
+                user_on_segment = on_segment
+                on_segment = lambda segment: user_on_segment(speech_map.remap_segment(segment))
+
+        if len(audio) == 0:
+            result = {"text": "", "segments": []}
+        else:
+            result = None
+            if chunked and device == "cpu":
+                result = VideoTranscriber._transcribe_chunked(
+                    audio, model_name, language, on_progress, on_segment, workers
+                )
+
+            if result is None:
+                result = VideoTranscriber._transcribe_single(
+                    audio, model_name, device, language, on_progress, on_segment
+                )
+
+        segments = [
+            {"start": float(segment["start"]), "end": float(segment["end"]), "text": segment["text"]}
+            for segment in result["segments"]
+        ]
+        if speech_map:
+            segments = [speech_map.remap_segment(segment) for segment in segments]
+        return {
+            "text": result["text"],
+            "segments": segments,
+            "vad_skipped": speech_map.skipped_ratio if speech_map else 0.0,
+        }
+
+    @staticmethod
+    def transcribe(input_path, model_name="base", output_format="txt", use_gpu=True, on_progress=None,
+                   on_segment=None, chunked=False, workers=None, vad=None, language=None, use_cache=True):
         """
         提取视频/音频文字
+        on_progress: 回调函数，接收 (msg, percent)
+        on_segment: 回调函数，每识别出一段文字调用一次，接收 {"start", "end", "text"}；
+                    仅用于实时显示，返回结果和输出文件中的分段取自 Whisper 的返回值。
+                    同一进程内使用同一模型的非分段识别会串行执行
+        chunked: CPU 模式下把长音频切分为多段，由多个进程并行识别
+        workers: 并行识别的进程数，None 时按 CPU 核数自动计算
+        vad: 识别前检测并跳过静音，None 时取 WHISPER_CONFIG["vad"]
+        language: 语言代码（如 "zh"），None 时自动检测
+        use_cache: 相同内容、模型和参数的文件直接复用缓存的识别结果
+        返回结果中的 vad_skipped 为跳过的音频比例，cached 表示是否命中缓存
         """
         try:
             if not os.path.exists(input_path):
@@ -52,61 +367,45 @@ class VideoTranscriber:
             file_name = os.path.splitext(os.path.basename(input_path))[0]
             output_path = os.path.join(input_dir, f"{file_name}.{output_format}")
 
-            # 确定设备
-            device = "cuda" if use_gpu and torch.cuda.is_available() else "cpu"
-            logger.info(f"计划使用设备: {device}")
-
-            # 加载模型
-            if on_progress:
-                on_progress("正在加载模型...", 0)
-            
-            model = VideoTranscriber._get_model(model_name, device)
+            if vad is None:
+                vad = WHISPER_CONFIG["vad"]
 
-            # 获取音频时长用于进度计算
-            try:
-                audio = whisper.load_audio(input_path)
-                duration = len(audio) / whisper.audio.SAMPLE_RATE
-                print(f"DURATION: {duration}", flush=True)
-            except Exception as e:
-                logger.warning(f"无法获取音频时长: {e}")
+            result = None
+            cache_key = None
+            if use_cache:
+                cache_key = VideoTranscriber._cache_key(input_path, model_name, language, chunked, vad)
+                result = get_transcript_cache().get(cache_key)
 
-            if on_progress:
-                on_progress("正在转录中 (这可能需要一些时间)...", 10)
+            cached = result is not None
+            if cached:
+                logger.info(f"使用缓存的识别结果: {input_path}")
+                if on_segment:
+                    for segment in result["segments"]:
+                        on_segment(segment)
+            else:
+                # 确定设备（检测 CUDA 需要导入 torch，命中缓存时不必检测）
+                device = "cuda" if use_gpu and cuda_available() else "cpu"
+                logger.info(f"计划使用设备: {device}")
+                result = VideoTranscriber._run(
+                    input_path, model_name, device, language, chunked, workers, vad, on_progress, on_segment
+                )
+                if cache_key:
+                    get_transcript_cache().set(cache_key, result)
 
-            # 开始转录
-            logger.info(f"开始转录: {input_path}")
-            
-            # 使用 verbose=True 输出进度到 stdout，以便外部进程捕获
-            result = model.transcribe(input_path, verbose=True)
-            
             # 保存结果
-            text = result["text"]
-            segments = result["segments"]
-
-            with open(output_path, "w", encoding="utf-8") as f:
-                if output_format == "txt":
-                    f.write(text)
-                elif output_format == "srt":
-                    for i, segment in enumerate(segments, start=1):
-                        start = str(timedelta(seconds=int(segment["start"]))) + ",000"
-                        end = str(timedelta(seconds=int(segment["end"]))) + ",000"
-                        f.write(f"{i}\n{start} --> {end}\n{segment['text'].strip()}\n\n")
-                elif output_format == "vtt":
-                    f.write("WEBVTT\n\n")
-                    for i, segment in enumerate(segments, start=1):
-                        start = str(timedelta(seconds=int(segment["start"]))) + ".000"
-                        end = str(timedelta(seconds=int(segment["end"]))) + ".000"
-                        f.write(f"{start} --> {end}\n{segment['text'].strip()}\n\n")
+            VideoTranscriber.write_output(output_path, output_format, result["text"], result["segments"])
             
             if on_progress:
                 on_progress("完成!", 100)
 
-            result_data = {"success": True, "message": "转录完成", "output_path": output_path}
-            print(f"RESULT: {result_data}", flush=True)
-            return result_data
+            return {
+                "success": True,
+                "message": "转录完成",
+                "output_path": output_path,
+                "vad_skipped": result["vad_skipped"],
+                "cached": cached,
+            }
 
         except Exception as e:
             logger.error(f"转录异常: {e}")
-            result_data = {"success": False, "message": str(e)}
-            print(f"RESULT: {result_data}", flush=True)
-            return result_data
+            return {"success": False, "message": str(e)}
@@ -0,0 +1,100 @@
+"""
+基于能量的语音活动检测 (VAD)：在识别前跳过长时间的静音
+"""
+import bisect
+import numpy as np
+from core.audio_chunks import frame_energy
+
+
+def detect_speech(audio, sample_rate, min_silence=1.0, min_speech=0.25, padding=0.3, threshold_ratio=3.0,
+                  gap_ratio=0.2):
+    """
+    检测有声区间，返回 [(start, end)]（单位：采样点）
+    以能量的 10% / 90% 分位数分别作为噪声底和语音电平：
+    两者相差不到 threshold_ratio 倍时无法区分静音（连续讲话、背景音乐、稳定底噪），整段视为有声；
+    否则阈值取 噪声底 * threshold_ratio 与 噪声底 + (语音电平 - 噪声底) * gap_ratio 中较小者。
+    短于 min_silence 的静音并入相邻语音，短于 min_speech 的语音视为噪声，
+    每段语音前后保留 padding 秒余量
+    """
+    energy, frame = frame_energy(audio, sample_rate)
+    if len(energy) == 0:
+        return []
+
+    noise_floor, speech_level = (float(v) for v in np.percentile(energy, [10, 90]))
+    if speech_level < max(noise_floor * threshold_ratio, 1e-3):
+        return [(0, len(audio))]
+    threshold = max(min(noise_floor * threshold_ratio, noise_floor + (speech_level - noise_floor) * gap_ratio), 1e-3)
+    voiced = energy > threshold
+
+    # 找出连续的有声帧区间
+    edges = np.diff(voiced.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    frames_per_second = sample_rate / frame
+    regions = []
+    for start, end in zip(starts, ends):
+        if regions and (start - regions[-1][1]) < min_silence * frames_per_second:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+
+    pad = int(padding * sample_rate)
+    total = len(audio)
+    result = []
+    for start, end in regions:
+        if (end - start) < min_speech * frames_per_second:
+            continue
+        begin = max(0, int(start) * frame - pad)
+        finish = min(total, int(end) * frame + pad)
+        if result and begin <= result[-1][1]:
+            result[-1] = (result[-1][0], finish)
+        else:
+            result.append((begin, finish))
+    return result
+
+
+class SpeechMap:
+    """把有声区间拼接成紧凑音频，并把紧凑时间轴上的时间换算回原始时间轴"""
+
+    def __init__(self, regions, sample_rate, total_samples):
+        self.regions = list(regions)
+        self.sample_rate = sample_rate
+        self.total_samples = total_samples
+        # 每个区间在紧凑音频中的起点（秒）
+        self._compact_starts = []
+        offset = 0
+        for start, end in self.regions:
+            self._compact_starts.append(offset / sample_rate)
+            offset += end - start
+        self.speech_samples = offset
+
+    @property
+    def skipped_ratio(self):
+        """被跳过的音频比例"""
+        if not self.total_samples:
+            return 0.0
+        return 1 - self.speech_samples / self.total_samples
+
+    def compact(self, audio):
+        if not self.regions:
+            return audio[:0]
+        return np.concatenate([audio[start:end] for start, end in self.regions])
+
+    def to_original(self, seconds, is_end=False):
+        """
+        紧凑时间轴 -> 原始时间轴（秒）
+        is_end: 恰好落在两个区间交界处的结束时间归属前一个区间
+        """
+        if not self.regions:
+            return seconds
+        find = bisect.bisect_left if is_end else bisect.bisect_right
+        i = max(0, find(self._compact_starts, seconds) - 1)
+        return self.regions[i][0] / self.sample_rate + (seconds - self._compact_starts[i])
+
+    def remap_segment(self, segment):
+        return dict(
+            segment,
+            start=self.to_original(segment["start"]),
+            end=self.to_original(segment["end"], is_end=True),
+        )
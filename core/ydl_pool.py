@@ -0,0 +1,104 @@
+"""
+YoutubeDL 实例池
+
+创建 YoutubeDL 需要初始化全部提取器、解析 Cookie 文件并建立新的 HTTP 连接，
+批量解析大量链接时这部分开销往往超过解析本身。实例池按 (选项配置, Cookie 标识) 保留空闲实例，
+后续调用直接复用，同时复用实例内已建立的 keep-alive 连接。
+YoutubeDL 不是线程安全的，同一实例同一时间只借给一个调用方，并发调用时按需创建新实例。
+淘汰或关闭实例时先把 Cookie 写回文件（save_cookies），再关闭其网络连接。
+"""
+import contextlib
+import threading
+from collections import OrderedDict
+import yt_dlp
+from utils.logger import logger
+
+
+class YoutubeDLPool:
+    """
+    max_idle: 每种配置最多保留的空闲实例数
+    max_profiles: 最多保留的配置数，超出时关闭最久未使用配置的实例
+    """
+
+    def __init__(self, max_idle=4, max_profiles=8, factory=yt_dlp.YoutubeDL):
+        self.max_idle = max_idle
+        self.max_profiles = max_profiles
+        self._factory = factory
+        self._idle = OrderedDict()  # key -> [YoutubeDL]
+        self._lock = threading.Lock()
+        self._closed = False
+        self.created = 0
+        self.reused = 0
+
+    @contextlib.contextmanager
+    def acquire(self, key, options):
+        """
+        借出一个实例，用完自动归还
+        key: 可哈希的配置标识，相同 key 的 options 必须相同（通常为 配置名 + Cookie 标识）
+        """
+        ydl = None
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                ydl = idle.pop()
+                self._idle.move_to_end(key)
+                self.reused += 1
+        if ydl is None:
+            ydl = self._factory(dict(options))
+            with self._lock:
+                self.created += 1
+
+        try:
+            yield ydl
+        finally:
+            self._release(key, ydl)
+
+    def _release(self, key, ydl):
+        closing = []
+        with self._lock:
+            if self._closed:
+                closing.append(ydl)
+            else:
+                idle = self._idle.setdefault(key, [])
+                self._idle.move_to_end(key)
+                if len(idle) < self.max_idle:
+                    idle.append(ydl)
+                else:
+                    closing.append(ydl)
+            while len(self._idle) > self.max_profiles:
+                _, stale = self._idle.popitem(last=False)
+                closing.extend(stale)
+        for instance in closing:
+            self._close(instance)
+
+    @staticmethod
+    def _close(ydl):
+        # 较新的 yt-dlp 在 close() 中也会保存 Cookie，重复保存无副作用；较旧的版本没有 close()
+        for method in ("save_cookies", "close"):
+            try:
+                getattr(ydl, method, lambda: None)()
+            except Exception as e:
+                logger.warning(f"关闭 YoutubeDL 实例失败 ({method}): {e}")
+
+    def clear(self):
+        """关闭所有空闲实例"""
+        with self._lock:
+            instances = [ydl for idle in self._idle.values() for ydl in idle]
+            self._idle.clear()
+        for ydl in instances:
+            self._close(ydl)
+
+    def close(self):
+        """关闭所有空闲实例，之后归还的实例直接关闭（用于进程退出）"""
+        with self._lock:
+            self._closed = True
+        self.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "idle": sum(len(idle) for idle in self._idle.values()),
+                "profiles": len(self._idle),
+            }
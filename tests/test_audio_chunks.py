@@ -0,0 +1,45 @@
+import numpy as np
+
+from core.audio_chunks import frame_energy, plan_chunks, remap_segments
+
+SR = 1000
+
+
+def test_frame_energy_rms():
+    audio = np.concatenate([np.zeros(30), np.full(30, 0.5), np.ones(10)]).astype(np.float32)
+    energy, frame = frame_energy(audio, SR, frame_seconds=0.03)
+    assert frame == 30
+    # 不足一帧的尾部不计算
+    assert np.allclose(energy, [0.0, 0.5])
+
+
+def test_short_audio_is_one_chunk():
+    audio = np.ones(SR * 5, dtype=np.float32)
+    assert plan_chunks(audio, SR, chunk_seconds=10) == [
+        {"start": 0, "end": len(audio), "keep_start": 0, "keep_end": len(audio)}
+    ]
+
+
+def test_chunks_cut_at_quietest_point_and_overlap():
+    audio = np.ones(SR * 25, dtype=np.float32)
+    audio[int(SR * 11.4):int(SR * 11.6)] = 0  # 目标切点 10s 附近的静音
+    chunks = plan_chunks(audio, SR, chunk_seconds=10, overlap_seconds=1, search_seconds=3)
+
+    assert abs(chunks[0]["keep_end"] / SR - 11.4) < 0.05
+    # keep 区间首尾相接并覆盖整段音频，每段向两侧扩展重叠
+    assert chunks[0]["keep_start"] == 0 and chunks[-1]["keep_end"] == len(audio)
+    for prev, cur in zip(chunks, chunks[1:]):
+        assert prev["keep_end"] == cur["keep_start"]
+        assert cur["start"] == cur["keep_start"] - SR
+        assert prev["end"] == min(len(audio), prev["keep_end"] + SR)
+    assert all(chunk["keep_end"] - chunk["keep_start"] <= SR * 13 for chunk in chunks)
+
+
+def test_remap_keeps_segments_starting_in_own_range():
+    chunk = {"start": 9000, "end": 21000, "keep_start": 10000, "keep_end": 20000}
+    segments = [
+        {"start": 0.5, "end": 1.5, "text": "overlap-before"},
+        {"start": 1.0, "end": 3.0, "text": "first"},
+        {"start": 11.2, "end": 11.8, "text": "overlap-after"},
+    ]
+    assert remap_segments(segments, chunk, SR) == [{"start": 10.0, "end": 12.0, "text": "first"}]
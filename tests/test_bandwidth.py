@@ -0,0 +1,58 @@
+import threading
+import time
+
+import pytest
+
+from core.bandwidth import BandwidthGovernor, TokenBucket, parse_rate
+
+
+def elapsed(func, *args):
+    start = time.monotonic()
+    func(*args)
+    return time.monotonic() - start
+
+
+def test_parse_rate():
+    assert parse_rate("500K") == 500 * 1024
+    assert parse_rate("1.5MB/s") == 1.5 * 1024 ** 2
+    assert parse_rate("2MiB") == 2 * 1024 ** 2
+    assert parse_rate("1048576") == 1048576
+    assert parse_rate("0") is None and parse_rate(None) is None and parse_rate("none") is None
+    with pytest.raises(ValueError):
+        parse_rate("fast")
+
+
+def test_unlimited_bucket_never_blocks():
+    assert elapsed(TokenBucket().consume, 10 ** 9) < 0.05
+
+
+def test_burst_then_rate():
+    bucket = TokenBucket(rate=100_000, burst=10_000)
+    time.sleep(0.15)  # 空闲时额度最多积累到 burst
+    assert elapsed(bucket.consume, 10_000) < 0.05
+    assert 0.25 < elapsed(bucket.consume, 30_000) < 0.5
+
+
+def test_cancel_releases_waiter():
+    bucket = TokenBucket(rate=1000, burst=1)
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+    assert elapsed(bucket.consume, 1_000_000, cancel) < 0.5
+
+
+def test_rate_change_applies_to_waiting_request():
+    bucket = TokenBucket(rate=1000, burst=1)
+    threading.Timer(0.1, bucket.set_rate, args=(None,)).start()
+    # 按原速率需要 100 秒，取消限速后立即返回
+    assert elapsed(bucket.consume, 100_000) < 0.5
+
+
+def test_governor_per_host_limit_and_stats():
+    governor = BandwidthGovernor(per_host={"slow.example": 100_000})
+    assert governor.active
+    assert elapsed(governor.throttle, "fast.example", 10 ** 7) < 0.05
+    # 新建的令牌桶没有积累的额度，从第一个字节开始按速率放行
+    assert 0.15 < elapsed(governor.throttle, "slow.example", 20_000) < 0.4
+    assert governor.stats()["bytes"] == {"fast.example": 10 ** 7, "slow.example": 20_000}
+    governor.configure(per_host={})
+    assert not governor.active
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from utils.cache import DiskCache
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(**options):
+        cache = DiskCache(tmp_path / f"cache{len(caches)}.db", **options)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def test_round_trip_and_stats(make_cache):
+    cache = make_cache()
+    assert cache.get("missing", "default") == "default"
+    cache.set("key", {"title": "视频", "formats": [1, 2]})
+    assert cache.get("key") == {"title": "视频", "formats": [1, 2]}
+    assert "key" in cache
+    cache.delete("key")
+    assert cache.get("key") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 0)
+
+
+def test_ttl_expires_entries(make_cache):
+    cache = make_cache(ttl=0.1)
+    cache.set("key", 1)
+    assert cache.get("key") == 1
+    time.sleep(0.15)
+    assert "key" not in cache
+    assert cache.get("key") is None
+
+
+def test_lru_eviction_by_count(make_cache):
+    cache = make_cache(max_entries=2)
+    cache.set("a", 1)
+    time.sleep(0.01)
+    cache.set("b", 2)
+    time.sleep(0.01)
+    cache.get("a")  # a 最近被访问，淘汰 b
+    time.sleep(0.01)
+    cache.set("c", 3)
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.get("b") is None
+    assert cache.evictions == 1
+
+
+def test_eviction_by_bytes(make_cache):
+    cache = make_cache(max_bytes=200)
+    for i in range(20):
+        cache.set(f"k{i}", "x" * 50 + str(i))
+        time.sleep(0.002)
+    assert cache.stats()["bytes"] <= 200
+    assert cache.get("k19") is not None and cache.get("k0") is None
+
+
+def test_persists_across_instances(tmp_path):
+    cache = DiskCache(tmp_path / "cache.db")
+    cache.set("key", [1, 2, 3])
+    cache.close()
+    cache = DiskCache(tmp_path / "cache.db")
+    assert cache.get("key") == [1, 2, 3]
+    cache.close()
+
+
+def test_unserializable_value_is_not_stored(make_cache):
+    cache = make_cache()
+    cache.set("key", object())
+    assert cache.get("key") is None
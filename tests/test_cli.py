@@ -0,0 +1,16 @@
+import argparse
+import io
+import json
+
+from cli import EXIT_USAGE, EventWriter, cmd_transcribe
+
+
+def test_transcribe_without_existing_inputs_still_emits_summary(tmp_path):
+    stream = io.StringIO()
+    missing = [str(tmp_path / "a.wav"), str(tmp_path / "b.wav")]
+    code = cmd_transcribe(argparse.Namespace(inputs=missing), EventWriter(stream))
+
+    events = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert code == EXIT_USAGE
+    assert [event["event"] for event in events] == ["done", "done", "summary"]
+    assert events[-1]["succeeded"] == 0 and events[-1]["failed"] == 2
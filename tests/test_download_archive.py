@@ -0,0 +1,55 @@
+import pytest
+
+pytest.importorskip("yt_dlp")
+
+from core.download_archive import DownloadArchive, keys_from_url  # noqa: E402
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = DownloadArchive(tmp_path / "archive.db", hash_content=False)
+    yield archive
+    archive.close()
+
+
+def test_bilibili_keys_keep_prefix_and_part():
+    assert keys_from_url("https://www.bilibili.com/video/BV1xx411c7mD")[0] == "bilibili BV1xx411c7mD"
+    assert keys_from_url("https://www.bilibili.com/video/BV1xx411c7mD?p=2") == ("bilibili BV1xx411c7mD_p2",)
+
+
+def test_bilibili_urls_match_recorded_ids(archive):
+    archive.add("BiliBili", "BV1xx411c7mD")
+    archive.add("BiliBili", "BV1yy411c7mE_p3")
+    assert archive.match_url("https://www.bilibili.com/video/BV1xx411c7mD") == "bilibili BV1xx411c7mD"
+    assert archive.match_url("https://www.bilibili.com/video/BV1xx411c7mD?p=1") == "bilibili BV1xx411c7mD"
+    assert archive.match_url("https://www.bilibili.com/video/BV1yy411c7mE?p=3") == "bilibili BV1yy411c7mE_p3"
+    assert archive.match_url("https://www.bilibili.com/video/BV1yy411c7mE?p=2") is None
+
+
+def test_url_derived_key_is_stored_as_alias(tmp_path):
+    path = tmp_path / "archive.db"
+    archive = DownloadArchive(path, hash_content=False)
+    # yt-dlp 记录的 ID 与链接规则取出的 ID 不同时，下次换一种链接写法也能命中
+    archive.add("Youtube", "recorded-id", url="https://youtu.be/dQw4w9WgXcQ")
+    archive.close()
+
+    archive = DownloadArchive(path, hash_content=False)
+    assert archive.match_url("https://www.youtube.com/watch?v=dQw4w9WgXcQ") == "youtube recorded-id"
+    archive.remove("youtube recorded-id")
+    assert archive.match_url("https://www.youtube.com/watch?v=dQw4w9WgXcQ") is None
+    archive.close()
+
+
+def test_cached_result_requires_existing_files(archive, tmp_path):
+    url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    archive.add("Youtube", "dQw4w9WgXcQ", url=url)
+    assert archive.cached_result(url) is None
+
+    media = tmp_path / "video.mp4"
+    media.write_bytes(b"data")
+    archive.add("Youtube", "dQw4w9WgXcQ", url=url, files=[str(media)])
+    result = archive.cached_result(url)
+    assert result["skipped"] and result["files"] == [str(media)]
+
+    media.unlink()
+    assert archive.cached_result(url) is None
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("yt_dlp")
+
+from core.download_queue import (  # noqa: E402
+    STATUS_CANCELLED, STATUS_DONE, DownloadQueue, VideoDownloader,
+)
+
+
+class FakeDownloads:
+    """代替 VideoDownloader.download_video，记录各站点的同时下载数"""
+
+    def __init__(self, duration=0.05):
+        self.duration = duration
+        self.running = {}
+        self.peak = {}
+        self.peak_total = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, url, output_dir, quality_id=None, cookie_file=None, progress_callback=None,
+                 cancel_event=None, **options):
+        host = url.split("/")[2]
+        with self._lock:
+            self.running[host] = self.running.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.running[host])
+            self.peak_total = max(self.peak_total, sum(self.running.values()))
+        try:
+            # duration 为 None 时一直下载，直到被取消
+            deadline = None if self.duration is None else time.monotonic() + self.duration
+            while deadline is None or time.monotonic() < deadline:
+                if cancel_event is not None and cancel_event.is_set():
+                    return {"success": False, "message": "下载已取消"}
+                time.sleep(0.005)
+            return {"success": True, "message": "下载成功", "files": []}
+        finally:
+            with self._lock:
+                self.running[host] -= 1
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    fake = FakeDownloads()
+    monkeypatch.setattr(VideoDownloader, "download_video", staticmethod(fake))
+    return fake
+
+
+def test_per_host_cap(downloads):
+    queue = DownloadQueue(max_workers=4, max_per_host=2)
+    jobs = [queue.submit(f"https://a.example/v{i}", "out") for i in range(6)]
+    jobs += [queue.submit(f"https://b.example/v{i}", "out") for i in range(2)]
+    assert queue.join(timeout=5)
+    queue.shutdown()
+
+    assert all(job.status == STATUS_DONE for job in jobs)
+    assert downloads.peak == {"a.example": 2, "b.example": 2}
+    # 站点 a 排满时，空闲的线程先执行其他站点的任务
+    assert downloads.peak_total > 2
+
+
+def test_cancel_pending_job_finishes_immediately(downloads):
+    downloads.duration = None
+    queue = DownloadQueue(max_workers=2, max_per_host=1)
+    running = queue.submit("https://a.example/v1", "out")
+    pending = queue.submit("https://a.example/v2", "out")
+    time.sleep(0.05)
+    assert pending.status == "pending"
+
+    # 排队中的任务不必等站点名额空出
+    start = time.monotonic()
+    pending.cancel()
+    assert pending.wait(timeout=1)["message"] == "下载已取消"
+    assert time.monotonic() - start < 0.5
+    assert pending.status == STATUS_CANCELLED and not running.done
+
+    running.cancel()
+    running.wait(timeout=1)
+    assert running.status == STATUS_CANCELLED
+    queue.shutdown()
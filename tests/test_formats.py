@@ -0,0 +1,78 @@
+from core.formats import FormatIndex, codec_family
+
+
+def fmt(format_id, **fields):
+    return dict(format_id=format_id, **fields)
+
+
+def test_storyboards_are_not_indexed():
+    index = FormatIndex([
+        fmt("sb0", ext="mhtml", protocol="mhtml", format_note="storyboard", vcodec="none", acodec="none",
+            width=320, height=180),
+        fmt("sb1", ext="jpg", format_note="Storyboard", width=160, height=90),
+        fmt("18", ext="mp4", vcodec="avc1.42001E", acodec="mp4a.40.2", height=360),
+    ])
+    assert [entry.format_id for entry in index.ranked()] == ["18"]
+    assert index.resolve("best") == "18"
+
+
+def test_unknown_codecs_fall_back_to_height_and_ext():
+    # 部分站点只给出分辨率和容器，不给编码
+    index = FormatIndex([
+        fmt("hd", ext="mp4", height=720, tbr=1500),
+        fmt("sd", ext="mp4", height=360, tbr=600),
+        fmt("audio", ext="m4a", abr=128),
+    ], duration=60)
+    assert index.resolve("best") == "hd"
+    assert index.resolve("smallest_video") == "sd"
+    assert index.resolve("asr_audio") == "audio"
+    assert index.by_id["hd"].has_audio and not index.by_id["audio"].has_video
+
+
+def test_explicit_none_codec_means_no_stream():
+    index = FormatIndex([fmt("v", ext="mp4", vcodec="avc1", acodec="none", height=1080)])
+    entry = index.by_id["v"]
+    assert entry.has_video and not entry.has_audio
+    assert codec_family("none") is None
+
+
+YOUTUBE_LIKE = [
+    fmt("140", ext="m4a", vcodec="none", acodec="mp4a.40.2", abr=129, asr=44100, filesize=4_000_000),
+    fmt("251", ext="webm", vcodec="none", acodec="opus", abr=135, asr=48000, filesize=3_800_000),
+    fmt("249", ext="webm", vcodec="none", acodec="opus", abr=50, asr=48000, filesize=1_500_000),
+    fmt("18", ext="mp4", vcodec="avc1.42001E", acodec="mp4a.40.2", height=360, fps=30, filesize=9_000_000),
+    fmt("137", ext="mp4", vcodec="avc1.640028", acodec="none", height=1080, fps=30, filesize=60_000_000),
+    fmt("248", ext="webm", vcodec="vp9", acodec="none", height=1080, fps=30, filesize=45_000_000),
+    fmt("313", ext="webm", vcodec="vp9", acodec="none", height=2160, fps=30, filesize=200_000_000),
+    fmt("136", ext="mp4", vcodec="avc1.4d401f", acodec="none", height=720, fps=30, filesize=30_000_000),
+]
+
+
+def test_codec_family():
+    assert codec_family("avc1.640028") == "h264"
+    assert codec_family("mp4a.40.2") == "aac"
+    assert codec_family("vp09.00.40.08") == "vp9"
+    assert codec_family("none") is None and codec_family(None) is None
+
+
+def test_query_by_kind_and_codec():
+    index = FormatIndex(YOUTUBE_LIKE)
+    assert {entry.format_id for entry in index.query(kind="audio")} == {"140", "251", "249"}
+    assert [entry.format_id for entry in index.query(kind="muxed")] == ["18"]
+    assert {entry.format_id for entry in index.query(kind="video", vcodec="vp9", max_height=1080)} == {"248"}
+
+
+def test_named_policies():
+    index = FormatIndex(YOUTUBE_LIKE)
+    assert index.resolve("best") == "313+251"
+    # 1080p 以内优先 H.264，mp4 视频搭配 aac 音频
+    assert index.resolve("best_1080p_h264") == "137+140"
+    assert index.resolve("best_720p") == "136+140"
+    assert index.resolve("smallest_video") == "18"
+    assert index.resolve("asr_audio") == "249"
+    assert index.resolve_all()["best_720p"] == "136+140"
+
+
+def test_policy_without_match_returns_none():
+    index = FormatIndex([fmt("18", ext="mp4", vcodec="avc1", acodec="mp4a", height=360)])
+    assert index.resolve({"kind": "video", "min_height": 720}) is None
@@ -0,0 +1,50 @@
+import inspect
+import sys
+
+from core import transcribe_worker
+from core.transcribe_worker import TranscribeWorker
+from core.transcriber import VideoTranscriber
+
+
+def test_worker_accepts_every_transcribe_option():
+    # Pipeline 把 transcribe_options 原样传给转录函数，两者的参数必须一致
+    expected = list(inspect.signature(VideoTranscriber.transcribe).parameters)
+    actual = list(inspect.signature(TranscribeWorker.transcribe).parameters)[1:]
+    assert actual == expected
+
+
+def _fake_child(monkeypatch, script):
+    """用一段脚本代替 python -m core.transcribe_worker 作为子进程"""
+    popen = transcribe_worker.subprocess.Popen
+    monkeypatch.setattr(transcribe_worker.subprocess, "Popen",
+                        lambda args, **kwargs: popen([sys.executable, "-c", script], **kwargs))
+
+
+def test_transcribe_fails_when_process_exits(monkeypatch):
+    _fake_child(monkeypatch, "import sys; sys.stdin.buffer.read(4); sys.stderr.write('boom\\n')")
+    worker = TranscribeWorker()
+    result = worker.transcribe("missing.wav")
+    assert not result["success"]
+    assert "退出" in result["message"]
+
+
+def test_callback_error_does_not_lose_result(monkeypatch):
+    script = (
+        "import sys\n"
+        "from core.transcribe_worker import write_frame\n"
+        "sys.stdin.buffer.read(4)\n"
+        "out = sys.stdout.buffer\n"
+        "write_frame(out, {'type': 'progress', 'msg': 'x', 'percent': 10})\n"
+        "write_frame(out, {'type': 'result', 'result': {'success': True, 'message': 'ok'}})\n"
+        "sys.stdin.buffer.read()\n"
+    )
+    _fake_child(monkeypatch, script)
+
+    def on_progress(msg, percent):
+        raise RuntimeError("callback failed")
+
+    worker = TranscribeWorker()
+    try:
+        assert worker.transcribe("missing.wav", on_progress=on_progress) == {"success": True, "message": "ok"}
+    finally:
+        worker.terminate()
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from core import transcriber
+from core.transcriber import VideoTranscriber
+from utils.cache import DiskCache
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = DiskCache(tmp_path / "transcript_cache.db")
+    monkeypatch.setattr(transcriber, "get_transcript_cache", lambda: cache)
+    yield cache
+    cache.close()
+
+
+def test_cache_hit_skips_device_detection(tmp_path, cache, monkeypatch):
+    media = tmp_path / "talk.wav"
+    media.write_bytes(b"audio")
+    segments = [{"start": 0.0, "end": 1.5, "text": "hello"}]
+    key = VideoTranscriber._cache_key(str(media), "base", None, False, False)
+    cache.set(key, {"text": "hello", "segments": segments, "vad_skipped": 0.0})
+
+    def cuda_available():
+        raise AssertionError("命中缓存时不应检测 CUDA")
+
+    monkeypatch.setattr(transcriber, "cuda_available", cuda_available)
+    received = []
+    result = VideoTranscriber.transcribe(str(media), output_format="srt", vad=False, on_segment=received.append)
+    assert result["success"] and result["cached"]
+    assert received == segments
+    assert "hello" in (tmp_path / "talk.srt").read_text(encoding="utf-8")
+
+
+def test_import_does_not_open_cache(tmp_path):
+    # 分段识别的 spawn 子进程会导入本模块，导入时不应打开数据库
+    env = dict(os.environ, HOME=str(tmp_path), USERPROFILE=str(tmp_path))
+    subprocess.run([sys.executable, "-c", "import core.transcriber"], cwd=ROOT_DIR, env=env, check=True)
+    assert not list(tmp_path.rglob("transcript_cache.db"))
+
+
+def test_segment_output_is_routed_per_thread():
+    received = {}
+    ready = threading.Barrier(2)
+
+    def run(name, start):
+        segments = received.setdefault(name, [])
+        transcriber._stream_local.writer = transcriber._SegmentWriter(segments.append)
+        try:
+            ready.wait()
+            for i in range(50):
+                transcriber._routed_print(f"[00:{start + i:02d}.000 --> 00:{start + i + 1:02d}.000] {name}")
+        finally:
+            transcriber._stream_local.writer = None
+
+    threads = [threading.Thread(target=run, args=(name, start)) for name, start in (("a", 0), ("b", 5))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for name in ("a", "b"):
+        assert len(received[name]) == 50
+        assert {segment["text"] for segment in received[name]} == {name}
+    assert received["b"][0] == {"start": 5.0, "end": 6.0, "text": "b"}
+
+
+def test_routed_print_passes_through_without_writer(capsys):
+    transcriber._routed_print("Detected language:", "Chinese")
+    assert capsys.readouterr().out == "Detected language: Chinese\n"
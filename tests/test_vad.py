@@ -0,0 +1,56 @@
+import numpy as np
+
+from core.vad import SpeechMap, detect_speech
+
+SR = 16000
+
+
+def tone(seconds, amplitude=0.5):
+    t = np.arange(int(seconds * SR)) / SR
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds, noise=0.001, seed=0):
+    return (np.random.default_rng(seed).standard_normal(int(seconds * SR)) * noise).astype(np.float32)
+
+
+def test_long_silence_is_skipped():
+    audio = np.concatenate([silence(5), tone(3), silence(5, seed=1), tone(2), silence(5, seed=2)])
+    regions = detect_speech(audio, SR, padding=0.3)
+    assert len(regions) == 2
+    (s1, e1), (s2, e2) = regions
+    assert abs(s1 / SR - 4.7) < 0.1 and abs(e1 / SR - 8.3) < 0.1
+    assert abs(s2 / SR - 12.7) < 0.1 and abs(e2 / SR - 15.3) < 0.1
+
+
+def test_continuous_speech_is_kept_whole():
+    # 没有明显静音（连续讲话、背景音乐）时整段保留
+    audio = tone(10) + silence(10, noise=0.05)
+    assert detect_speech(audio, SR) == [(0, len(audio))]
+
+
+def test_short_gaps_are_merged():
+    audio = np.concatenate([silence(3), tone(1), silence(0.5, seed=1), tone(1), silence(3, seed=2)])
+    assert len(detect_speech(audio, SR, min_silence=1.0)) == 1
+
+
+def test_empty_audio():
+    assert detect_speech(np.zeros(0, dtype=np.float32), SR) == []
+
+
+def test_speech_map_round_trip():
+    regions = [(SR * 5, SR * 8), (SR * 12, SR * 15)]
+    speech_map = SpeechMap(regions, SR, SR * 20)
+    audio = np.arange(SR * 20, dtype=np.float32)
+
+    compact = speech_map.compact(audio)
+    assert len(compact) == speech_map.speech_samples == SR * 6
+    assert compact[SR * 3] == SR * 12
+    assert abs(speech_map.skipped_ratio - 0.7) < 1e-9
+
+    assert speech_map.to_original(1.0) == 6.0
+    assert speech_map.to_original(4.5) == 13.5
+    # 恰好落在交界处的结束时间属于前一个区间
+    assert speech_map.to_original(3.0, is_end=True) == 8.0
+    assert speech_map.to_original(3.0) == 12.0
+    assert speech_map.remap_segment({"start": 2.5, "end": 3.5, "text": "x"}) == {"start": 7.5, "end": 12.5, "text": "x"}
@@ -0,0 +1,39 @@
+import pytest
+
+pytest.importorskip("yt_dlp")
+
+from core.ydl_pool import YoutubeDLPool  # noqa: E402
+
+
+class FakeYDL:
+    def __init__(self, options):
+        self.options = options
+        self.calls = []
+
+    def save_cookies(self):
+        self.calls.append("save_cookies")
+
+    def close(self):
+        self.calls.append("close")
+
+
+def test_evicted_instances_save_cookies_and_close():
+    pool = YoutubeDLPool(max_idle=1, factory=FakeYDL)
+    with pool.acquire("info", {}) as first, pool.acquire("info", {}) as second:
+        pass
+    # second 先归还并留作空闲实例，first 归还时已满，立即关闭
+    assert second.calls == [] and first.calls == ["save_cookies", "close"]
+    with pool.acquire("info", {}) as reused:
+        assert reused is second
+    assert pool.stats()["reused"] == 1
+
+
+def test_close_releases_idle_and_returned_instances():
+    pool = YoutubeDLPool(factory=FakeYDL)
+    with pool.acquire("a", {}) as idle:
+        pass
+    with pool.acquire("b", {}) as busy:
+        pool.close()
+        assert idle.calls == ["save_cookies", "close"]
+    assert busy.calls == ["save_cookies", "close"]
+    assert pool.stats()["idle"] == 0
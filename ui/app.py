@@ -99,9 +99,14 @@ class App(ctk.CTk):
         self.appearance_mode_menu.grid(row=6, column=0, padx=20, pady=20, sticky="s")
 
         # 2. Frames
-        self.download_view = DownloadView(self, corner_radius=Theme.CORNER_RADIUS, fg_color="transparent")
-        self.convert_view = ConvertView(self, corner_radius=Theme.CORNER_RADIUS, fg_color="transparent")
-        self.transcribe_view = TranscribeView(self, corner_radius=Theme.CORNER_RADIUS, fg_color="transparent")
+        # 页面在首次切换到时才创建，启动时只构建默认的下载页
+        # （提取文字页会启动转录进程并检测 CUDA，没用到就不必付出这部分开销）
+        self.view_classes = {
+            "home": DownloadView,
+            "convert": ConvertView,
+            "transcribe": TranscribeView,
+        }
+        self.views = {}
 
         # Select default frame
         self.select_frame_by_name("home")
@@ -113,20 +118,18 @@ class App(ctk.CTk):
         self.transcribe_button.configure(fg_color=Theme.COLOR_SECONDARY if name == "transcribe" else "transparent")
 
         # Show selected frame
-        if name == "home":
-            self.download_view.grid(row=0, column=1, sticky="nsew")
-        else:
-            self.download_view.grid_forget()
-            
-        if name == "convert":
-            self.convert_view.grid(row=0, column=1, sticky="nsew")
-        else:
-            self.convert_view.grid_forget()
-            
-        if name == "transcribe":
-            self.transcribe_view.grid(row=0, column=1, sticky="nsew")
-        else:
-            self.transcribe_view.grid_forget()
+        for view_name, view in self.views.items():
+            if view_name != name:
+                view.grid_forget()
+        self.get_view(name).grid(row=0, column=1, sticky="nsew")
+
+    def get_view(self, name):
+        """获取页面，首次访问时创建"""
+        view = self.views.get(name)
+        if view is None:
+            view = self.view_classes[name](self, corner_radius=Theme.CORNER_RADIUS, fg_color="transparent")
+            self.views[name] = view
+        return view
 
     def home_button_event(self):
         self.select_frame_by_name("home")
@@ -4,6 +4,7 @@ import threading
 from tkinter import filedialog
 import os
 from core.converter import MediaConverter
+from core.probe import report_media_info
 from utils.config import CONVERT_CONFIG
 from ui.theme import Theme
 
@@ -11,6 +12,7 @@ class ConvertView(ctk.CTkFrame):
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
         self.input_file = None
+        self.input_dir = None
         self.cancel_event = threading.Event()
         
         self.grid_columnconfigure(0, weight=1)
@@ -33,7 +35,7 @@ class ConvertView(ctk.CTkFrame):
         # 1. File Selection
         self.file_frame = ctk.CTkFrame(self, fg_color="transparent")
         self.file_frame.grid(row=1, column=0, padx=20, pady=10, sticky="ew")
-        self.file_frame.grid_columnconfigure(1, weight=1)
+        self.file_frame.grid_columnconfigure(2, weight=1)
 
         self.file_btn = ctk.CTkButton(
             self.file_frame,
@@ -50,6 +52,21 @@ class ConvertView(ctk.CTkFrame):
         )
         self.file_btn.grid(row=0, column=0, padx=(0, 10))
 
+        self.dir_btn = ctk.CTkButton(
+            self.file_frame,
+            text="选择文件夹",
+            command=self.select_dir,
+            width=120,
+            corner_radius=Theme.CORNER_RADIUS,
+            fg_color=Theme.COLOR_SECONDARY,
+            hover_color=Theme.COLOR_SECONDARY_HOVER,
+            text_color=Theme.COLOR_TEXT_PRIMARY,
+            border_width=Theme.BORDER_WIDTH,
+            border_color=Theme.COLOR_BORDER,
+            font=ctk.CTkFont(family=Theme.FONT_FAMILY)
+        )
+        self.dir_btn.grid(row=0, column=1, padx=(0, 10))
+
         self.file_label = ctk.CTkLabel(
             self.file_frame,
             text="未选择文件",
@@ -57,7 +74,7 @@ class ConvertView(ctk.CTkFrame):
             anchor="w",
             font=ctk.CTkFont(family=Theme.FONT_FAMILY)
         )
-        self.file_label.grid(row=0, column=1, sticky="ew")
+        self.file_label.grid(row=0, column=2, sticky="ew")
 
         # 2. Options
         self.options_frame = ctk.CTkFrame(self, fg_color="transparent")
@@ -194,11 +211,24 @@ class ConvertView(ctk.CTkFrame):
         )
         if filename:
             self.input_file = filename
+            self.input_dir = None
             self.file_label.configure(text=os.path.basename(filename))
             self.convert_btn.configure(state="normal")
 
+            # 预先探测媒体信息（结果会被缓存，转换时不再重复探测）
+            threading.Thread(target=report_media_info, args=(filename, self.log), daemon=True).start()
+
+    def select_dir(self):
+        directory = filedialog.askdirectory()
+        if directory:
+            count = len(MediaConverter.collect_inputs(directory))
+            self.input_dir = directory
+            self.input_file = None
+            self.file_label.configure(text=f"{directory} ({count} 个视频)")
+            self.convert_btn.configure(state="normal" if count else "disabled")
+
     def start_convert(self):
-        if not self.input_file:
+        if not self.input_file and not self.input_dir:
             return
 
         self.cancel_event.clear()
@@ -208,7 +238,8 @@ class ConvertView(ctk.CTkFrame):
         self.progress_bar.set(0)
         self.status_label.configure(text="准备转换...", text_color=("gray10", "gray90"))
 
-        threading.Thread(target=self._convert_task, daemon=True).start()
+        target = self._convert_batch_task if self.input_dir else self._convert_task
+        threading.Thread(target=target, daemon=True).start()
 
     def stop_convert(self):
         if self.cancel_event:
@@ -216,12 +247,15 @@ class ConvertView(ctk.CTkFrame):
         self.stop_btn.configure(state="disabled")
         self.status_label.configure(text="正在停止...")
 
-    def _update_progress(self, percent):
-        self.after(0, self._update_progress_ui, percent)
+    def _update_progress(self, percent, progress=None):
+        self.after(0, self._update_progress_ui, percent, progress)
 
-    def _update_progress_ui(self, percent):
+    def _update_progress_ui(self, percent, progress=None):
         self.progress_bar.set(percent / 100)
-        self.status_label.configure(text=f"转换中: {percent:.1f}%")
+        text = f"转换中: {percent:.1f}%"
+        if progress and progress.get("speed"):
+            text += f" - {progress['speed']:.1f}x"
+        self.status_label.configure(text=text)
 
     def _convert_task(self):
         output_format = self.format_menu.get()
@@ -239,12 +273,55 @@ class ConvertView(ctk.CTkFrame):
         
         self.after(0, self._convert_done, result)
 
+    def _update_batch_progress(self, path, percent, total_percent):
+        self.after(0, self._update_batch_progress_ui, total_percent)
+
+    def _update_batch_progress_ui(self, total_percent):
+        self.progress_bar.set(total_percent / 100)
+        self.status_label.configure(text=f"批量转换中: {total_percent:.1f}%")
+
+    def _file_done(self, path, result):
+        if result["success"]:
+            mode = "直接复制音频流" if result.get("mode") == "copy" else "重新编码"
+            self.log(f"转换成功 ({mode}): {result['output_path']}")
+        else:
+            self.log(f"转换失败: {os.path.basename(path)} - {result['message']}")
+
+    def _convert_batch_task(self):
+        output_format = self.format_menu.get()
+        bitrate = self.bitrate_menu.get()
+
+        self.log(f"开始批量转换: {self.input_dir} -> {output_format}")
+
+        result = MediaConverter.convert_batch(
+            self.input_dir,
+            output_format,
+            bitrate,
+            self._update_batch_progress,
+            self._file_done,
+            self.cancel_event
+        )
+
+        self.after(0, self._convert_batch_done, result)
+
+    def _convert_batch_done(self, result):
+        self.convert_btn.configure(state="normal")
+        self.stop_btn.configure(state="disabled")
+
+        self.log(result["message"])
+        if result["success"]:
+            self.status_label.configure(text="转换完成")
+            self.progress_bar.set(1)
+        else:
+            self.status_label.configure(text=result["message"], text_color="red")
+
     def _convert_done(self, result):
         self.convert_btn.configure(state="normal")
         self.stop_btn.configure(state="disabled")
         
         if result["success"]:
-            self.log(f"转换成功: {result['output_path']}")
+            mode = "直接复制音频流" if result.get("mode") == "copy" else "重新编码"
+            self.log(f"转换成功 ({mode}): {result['output_path']}")
             self.status_label.configure(text="转换完成")
             self.progress_bar.set(1)
         else:
@@ -4,7 +4,11 @@ import threading
 from tkinter import filedialog
 import os
 from core.downloader import VideoDownloader
-from utils.config import PATHS
+from core.download_queue import DownloadQueue
+from core.download_journal import DownloadJournal
+from core.download_archive import DownloadArchive
+from core.bandwidth import governor
+from utils.config import PATHS, DOWNLOAD_CONFIG
 from ui.theme import Theme
 
 class DownloadView(ctk.CTkFrame):
@@ -12,7 +16,16 @@ class DownloadView(ctk.CTkFrame):
         super().__init__(master, **kwargs)
         self.download_path = str(PATHS["downloads"])
         self.current_qualities = []
-        self.cancel_event = threading.Event()
+        self.quality_choices = {} # 选项显示文本 -> 画质
+        # 合集链接展开后的条目 (url, entries)
+        self.current_playlist = None
+        # 任务记录持久化到磁盘，程序意外退出后下次启动可续传未完成的下载
+        journal = DownloadJournal(PATHS["app_data"] / "download_journal.db")
+        journal.prune(DOWNLOAD_CONFIG["journal_keep_days"] * 24 * 3600)
+        # 下载记录：重新下载同一链接时跳过已下载过的视频
+        self.archive = DownloadArchive(PATHS["app_data"] / "download_archive.db")
+        self.download_queue = DownloadQueue(journal=journal, archive=self.archive)
+        self.active_jobs = []
         
         # Grid layout configuration
         self.grid_columnconfigure(0, weight=1)
@@ -27,6 +40,7 @@ class DownloadView(ctk.CTkFrame):
         self.grid_rowconfigure(7, weight=0)
 
         self.build_ui()
+        self.resume_downloads()
 
     def build_ui(self):
         # Title
@@ -45,7 +59,7 @@ class DownloadView(ctk.CTkFrame):
 
         self.url_entry = ctk.CTkEntry(
             self.url_frame, 
-            placeholder_text="请输入 Bilibili, YouTube 等视频链接",
+            placeholder_text="请输入 Bilibili, YouTube 等视频链接 (多个链接用空格分隔)",
             corner_radius=Theme.CORNER_RADIUS,
             fg_color=Theme.COLOR_SECONDARY,
             border_color=Theme.COLOR_BORDER,
@@ -174,6 +188,59 @@ class DownloadView(ctk.CTkFrame):
         )
         self.stop_btn.grid(row=0, column=1, padx=(10, 0))
 
+        # 仅下载音频（用于转录时无需下载视频流）
+        self.audio_only_var = ctk.BooleanVar(value=False)
+        self.audio_only_switch = ctk.CTkSwitch(
+            self.action_frame,
+            text="仅音频",
+            variable=self.audio_only_var,
+            onvalue=True,
+            offvalue=False,
+            progress_color=Theme.COLOR_PRIMARY,
+            font=ctk.CTkFont(family=Theme.FONT_FAMILY)
+        )
+        self.audio_only_switch.grid(row=0, column=2, padx=(20, 0))
+
+        # 总限速（所有下载共享，修改后正在进行的下载立即生效）
+        self.rate_limits = {
+            "不限速": None,
+            "限速 1 MB/s": 1024 ** 2,
+            "限速 2 MB/s": 2 * 1024 ** 2,
+            "限速 5 MB/s": 5 * 1024 ** 2,
+            "限速 10 MB/s": 10 * 1024 ** 2,
+        }
+        self.rate_menu = ctk.CTkOptionMenu(
+            self.action_frame,
+            values=list(self.rate_limits),
+            command=self.change_rate_limit,
+            width=130,
+            corner_radius=Theme.CORNER_RADIUS,
+            fg_color=Theme.COLOR_SECONDARY,
+            button_color=Theme.COLOR_PRIMARY,
+            button_hover_color=Theme.COLOR_PRIMARY_HOVER,
+            text_color=Theme.COLOR_TEXT_PRIMARY,
+            dropdown_fg_color=Theme.COLOR_SURFACE,
+            dropdown_text_color=Theme.COLOR_TEXT_PRIMARY,
+            font=ctk.CTkFont(family=Theme.FONT_FAMILY)
+        )
+        current = next((name for name, rate in self.rate_limits.items() if rate == governor.rate), None)
+        self.rate_menu.set(current or f"限速 {governor.rate / 1024 ** 2:.1f} MB/s")
+        self.rate_menu.grid(row=0, column=3, padx=(20, 0))
+
+        # 跳过下载记录中已有的视频；换画质、换目录或切换仅音频后想重新下载时关闭
+        self.skip_downloaded_var = ctk.BooleanVar(value=True)
+        self.skip_downloaded_switch = ctk.CTkSwitch(
+            self.action_frame,
+            text="跳过已下载",
+            variable=self.skip_downloaded_var,
+            onvalue=True,
+            offvalue=False,
+            command=self.toggle_skip_downloaded,
+            progress_color=Theme.COLOR_PRIMARY,
+            font=ctk.CTkFont(family=Theme.FONT_FAMILY)
+        )
+        self.skip_downloaded_switch.grid(row=0, column=4, padx=(20, 0))
+
         # 5. Progress Area
         self.progress_frame = ctk.CTkFrame(self, fg_color="transparent")
         self.progress_frame.grid(row=5, column=0, padx=20, pady=(0, 10), sticky="ew")
@@ -241,8 +308,12 @@ class DownloadView(ctk.CTkFrame):
             self.download_path = directory
             self.path_label.configure(text=directory)
 
+    def get_urls(self):
+        return self.url_entry.get().split()
+
     def fetch_info(self):
-        url = self.url_entry.get()
+        urls = self.get_urls()
+        url = urls[0] if urls else None
         if not url:
             self.status_label.configure(text="请输入链接", text_color="red")
             return
@@ -262,18 +333,22 @@ class DownloadView(ctk.CTkFrame):
             
         result = VideoDownloader.fetch_video_info(url, cookie_file)
         
-        self.after(0, self._fetch_info_done, result)
+        self.after(0, self._fetch_info_done, result, url)
 
-    def _fetch_info_done(self, result):
+    def _fetch_info_done(self, result, url=None):
         self.progress_bar.stop()
         self.progress_bar.grid_remove()
         self.analyze_btn.configure(state="normal")
 
         if result["success"]:
             self.current_qualities = result["qualities"]
-            options = [q["display"] for q in self.current_qualities]
-            # Default best option mapping logic
-            # Since CTkOptionMenu displays text, we need to map display text back to ID when downloading
+            entries = result.get("entries")
+            self.current_playlist = (url, entries) if entries else None
+            # CTkOptionMenu 只返回显示文本，下载时通过该映射取回画质
+            self.quality_choices = {}
+            for q in self.current_qualities:
+                self.quality_choices.setdefault(q["display"], q)
+            options = list(self.quality_choices)
             self.quality_menu.configure(values=options, state="normal")
             if options:
                 self.quality_menu.set(options[0])
@@ -286,21 +361,20 @@ class DownloadView(ctk.CTkFrame):
             self.status_label.configure(text="获取信息失败", text_color="red")
 
     def start_download(self):
-        url = self.url_entry.get()
-        selected_display = self.quality_menu.get()
-        
-        # Find quality ID
-        quality_id = "best" # Default fallback
-        for q in self.current_qualities:
-            if q["display"] == selected_display:
-                quality_id = q["id"]
-                break
-        
+        urls = self.get_urls()
+        if not urls:
+            self.status_label.configure(text="请输入链接", text_color="red")
+            return
+
+        selected = self.quality_choices.get(self.quality_menu.get(), {})
+        quality_id = selected.get("id", "best")
+        # 推荐选项按策略选择格式，合集和多个链接时每个视频各自按策略选
+        format_policy = selected.get("policy")
+
         cookie_file = self.cookie_label.cget("text")
         if "未选择" in cookie_file:
             cookie_file = None
 
-        self.cancel_event.clear()
         self.download_btn.configure(state="disabled")
         self.stop_btn.configure(state="normal")
         self.progress_bar.grid()
@@ -308,47 +382,114 @@ class DownloadView(ctk.CTkFrame):
         self.progress_bar.set(0)
         self.status_label.configure(text="准备下载...", text_color=("gray10", "gray90"))
 
-        threading.Thread(
-            target=self._download_task, 
-            args=(url, quality_id, cookie_file), 
-            daemon=True
-        ).start()
+        self.active_jobs = []
+        audio_only = self.audio_only_var.get()
+        if audio_only:
+            self.log("仅音频模式：下载体积最小的合适音频流，忽略画质选择")
+
+        # 合集：拆分为单个视频并行下载
+        if len(urls) == 1 and self.current_playlist and self.current_playlist[0] == urls[0]:
+            entries = self.current_playlist[1]
+            self.log(f"合集拆分为 {len(entries)} 个下载任务")
+            batch = self.download_queue.submit_batch(
+                [entry["url"] for entry in entries],
+                self.download_path,
+                quality_id,
+                cookie_file,
+                on_progress=lambda batch, job, percent, speed: self._update_progress(job, percent, speed),
+                on_job_done=lambda batch, job: self._job_done(job),
+                audio_only=audio_only,
+                format_policy=format_policy
+            )
+            self.active_jobs = list(batch.jobs)
+            return
+
+        for url in urls:
+            # 画质列表只对应获取信息的那个链接，其余链接使用默认画质（选择推荐选项时按策略选）
+            job_quality = quality_id if len(urls) == 1 else None
+            self.log(f"加入下载队列: {url}")
+            job = self.download_queue.submit(
+                url,
+                self.download_path,
+                job_quality,
+                cookie_file,
+                on_progress=self._update_progress,
+                on_done=self._job_done,
+                audio_only=audio_only,
+                format_policy=format_policy
+            )
+            self.active_jobs.append(job)
+
+    def toggle_skip_downloaded(self):
+        # 关闭时队列既不跳过也不记录，强制重新下载
+        self.download_queue.archive = self.archive if self.skip_downloaded_var.get() else None
+        self.log("跳过已下载的视频" if self.skip_downloaded_var.get() else "不跳过已下载的视频，全部重新下载")
+
+    def change_rate_limit(self, choice):
+        governor.configure(self.rate_limits[choice])
+        self.log(f"下载速度: {choice}")
+
+    def resume_downloads(self):
+        """继续上次退出时未完成的下载任务"""
+        jobs = self.download_queue.resume_unfinished(on_progress=self._update_progress, on_done=self._job_done)
+        if not jobs:
+            return
+        self.active_jobs = jobs
+        self.log(f"继续上次未完成的 {len(jobs)} 个下载任务")
+        self.download_btn.configure(state="disabled")
+        self.stop_btn.configure(state="normal")
+        self.progress_bar.grid()
+        self.progress_bar.configure(mode="determinate")
+        self.progress_bar.set(0)
+        self.status_label.configure(text="继续下载...", text_color=("gray10", "gray90"))
 
     def stop_download(self):
-        if self.cancel_event:
-            self.cancel_event.set()
+        for job in self.active_jobs:
+            job.cancel()
         self.stop_btn.configure(state="disabled")
         self.status_label.configure(text="正在停止...")
 
-    def _update_progress(self, percent, speed):
+    def _update_progress(self, job, percent, speed):
         self.after(0, self._update_progress_ui, percent, speed)
 
     def _update_progress_ui(self, percent, speed):
-        self.progress_bar.set(percent / 100)
-        self.status_label.configure(text=f"下载中: {percent}% - {speed}")
+        jobs = self.active_jobs
+        if len(jobs) > 1:
+            # 多任务时显示整体进度
+            finished = sum(1 for j in jobs if j.done)
+            total = sum(100.0 if j.done else j.percent for j in jobs) / len(jobs)
+            self.progress_bar.set(total / 100)
+            self.status_label.configure(text=f"下载中 ({finished}/{len(jobs)}): {total:.1f}% - {speed}")
+        else:
+            self.progress_bar.set(percent / 100)
+            self.status_label.configure(text=f"下载中: {percent}% - {speed}")
+
+    def _job_done(self, job):
+        self.after(0, self._job_done_ui, job)
+
+    def _job_done_ui(self, job):
+        result = job.result
+        if result.get("skipped"):
+            self.log(f"已下载过，跳过: {job.url}")
+        elif result["success"]:
+            self.log(f"下载完成: {job.url}")
+            if result.get("throughput"):
+                self.log(f"平均速度: {result['throughput'] / 1024 ** 2:.2f} MB/s")
+        else:
+            self.log(f"下载出错: {job.url} - {result['message']}")
 
-    def _download_task(self, url, quality_id, cookie_file):
-        self.log(f"开始下载: {url}")
-        
-        result = VideoDownloader.download_video(
-            url, 
-            self.download_path, 
-            quality_id, 
-            cookie_file, 
-            self._update_progress,
-            self.cancel_event
-        )
-        
-        self.after(0, self._download_done, result)
+        if all(j.done for j in self.active_jobs):
+            self._download_done()
 
-    def _download_done(self, result):
+    def _download_done(self):
         self.download_btn.configure(state="normal")
         self.stop_btn.configure(state="disabled")
         
-        if result["success"]:
+        failed = [j for j in self.active_jobs if not j.result["success"]]
+        if not failed:
             self.log("下载完成!")
             self.status_label.configure(text="下载完成")
             self.progress_bar.set(1)
         else:
-            self.log(f"下载出错: {result['message']}")
+            self.log(f"{len(failed)}/{len(self.active_jobs)} 个任务失败")
             self.status_label.configure(text="下载失败", text_color="red")
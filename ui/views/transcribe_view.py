@@ -3,25 +3,26 @@ import customtkinter as ctk
 import threading
 from tkinter import filedialog
 import os
-from core.transcriber import VideoTranscriber
+from core.transcribe_worker import TranscribeWorker
+from core.probe import report_media_info
 from utils.config import WHISPER_CONFIG
 from ui.theme import Theme
-import torch
-import subprocess
-import sys
-import re
 
 class TranscribeView(ctk.CTkFrame):
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
         self.input_file = None
-        self.process = None
+        # 常驻转录进程，模型加载一次后可被后续任务复用
+        self.worker = TranscribeWorker()
+        # CUDA 是否可用，由转录进程检测后更新（界面进程不导入 torch）
+        self.cuda_available = False
         
         self.grid_columnconfigure(0, weight=1)
         # 调整行权重，让日志区域 (Row 5) 占据剩余空间
         self.grid_rowconfigure(5, weight=1)
 
         self.build_ui()
+        self.worker.query_devices(lambda info: self.after(0, self._set_cuda_available, info.get("cuda", False)))
 
     def build_ui(self):
         # Title
@@ -73,6 +74,7 @@ class TranscribeView(ctk.CTkFrame):
         self.model_menu = ctk.CTkOptionMenu(
             self.options_frame,
             values=WHISPER_CONFIG["models"],
+            command=self._preload_model,
             corner_radius=Theme.CORNER_RADIUS,
             fg_color=Theme.COLOR_SECONDARY,
             button_color=Theme.COLOR_PRIMARY,
@@ -105,27 +107,53 @@ class TranscribeView(ctk.CTkFrame):
         self.format_menu.grid(row=0, column=3, padx=(0, 20))
 
         # GPU Switch
-        self.gpu_var = ctk.BooleanVar(value=torch.cuda.is_available())
+        self.gpu_var = ctk.BooleanVar(value=False)
         self.gpu_switch = ctk.CTkSwitch(
             self.options_frame,
             text="GPU加速",
             variable=self.gpu_var,
             onvalue=True,
             offvalue=False,
-            state="normal" if torch.cuda.is_available() else "disabled",
+            state="disabled",
             progress_color=Theme.COLOR_PRIMARY,
             font=ctk.CTkFont(family=Theme.FONT_FAMILY)
         )
         self.gpu_switch.grid(row=0, column=4, padx=(0, 10))
 
+        # Chunked Switch (CPU only)
+        self.chunked_var = ctk.BooleanVar(value=False)
+        self.chunked_switch = ctk.CTkSwitch(
+            self.options_frame,
+            text="分段并行",
+            variable=self.chunked_var,
+            onvalue=True,
+            offvalue=False,
+            progress_color=Theme.COLOR_PRIMARY,
+            font=ctk.CTkFont(family=Theme.FONT_FAMILY)
+        )
+        self.chunked_switch.grid(row=0, column=5, padx=(0, 10))
+
+        # VAD Switch
+        self.vad_var = ctk.BooleanVar(value=WHISPER_CONFIG["vad"])
+        self.vad_switch = ctk.CTkSwitch(
+            self.options_frame,
+            text="跳过静音",
+            variable=self.vad_var,
+            onvalue=True,
+            offvalue=False,
+            progress_color=Theme.COLOR_PRIMARY,
+            font=ctk.CTkFont(family=Theme.FONT_FAMILY)
+        )
+        self.vad_switch.grid(row=0, column=6, padx=(0, 10))
+
         # Helper text
         self.helper_label = ctk.CTkLabel(
             self.options_frame, 
-            text="注: 模型越大精度越高，但速度越慢。GPU加速需显卡支持。",
+            text="注: 模型越大精度越高，但速度越慢。GPU加速需显卡支持。分段并行适用于 CPU 识别长音频。",
             font=ctk.CTkFont(family=Theme.FONT_FAMILY, size=12),
             text_color=Theme.COLOR_TEXT_SECONDARY
         )
-        self.helper_label.grid(row=1, column=0, columnspan=5, pady=(5, 0), sticky="w")
+        self.helper_label.grid(row=1, column=0, columnspan=7, pady=(5, 0), sticky="w")
 
         # 3. Action Buttons
         self.action_frame = ctk.CTkFrame(self, fg_color="transparent")
@@ -242,6 +270,24 @@ class TranscribeView(ctk.CTkFrame):
             self.file_label.configure(text=os.path.basename(filename))
             self.transcribe_btn.configure(state="normal")
 
+            # 预先探测并显示媒体信息
+            threading.Thread(target=report_media_info, args=(filename, self.log), daemon=True).start()
+            # 选好文件后大概率马上开始转录，提前在后台加载模型
+            self._preload_model()
+
+    def _set_cuda_available(self, available):
+        self.cuda_available = available
+        if available:
+            self.gpu_var.set(True)
+            # 转录进行中时保持禁用，结束后再恢复
+            if self.stop_btn.cget("state") == "disabled":
+                self.gpu_switch.configure(state="normal")
+
+    def _preload_model(self, model_name=None):
+        if not self.input_file:
+            return
+        self.worker.preload(model_name or self.model_menu.get(), self.gpu_var.get())
+
     def start_transcribe(self):
         if not self.input_file:
             return
@@ -259,11 +305,8 @@ class TranscribeView(ctk.CTkFrame):
         threading.Thread(target=self._transcribe_task, daemon=True).start()
 
     def stop_transcribe(self):
-        if self.process:
-            try:
-                self.process.terminate()
-            except:
-                pass
+        # Whisper 推理无法中途打断，直接结束常驻进程，下次任务时自动重启
+        self.worker.terminate()
         self.stop_btn.configure(state="disabled")
         self.status_label.configure(text="正在停止...")
 
@@ -281,95 +324,30 @@ class TranscribeView(ctk.CTkFrame):
             self.progress_bar.start()
             self.percent_label.configure(text="")
 
+    def _on_segment(self, segment):
+        # 识别结果逐段显示在日志区
+        self.log(f"[{segment['start']:.1f}s] {segment['text'].strip()}")
+
     def _transcribe_task(self):
         model_name = self.model_menu.get()
         output_format = self.format_menu.get()
         use_gpu = self.gpu_switch.get() == 1
-        
-        script = """
-import sys
-from core.transcriber import VideoTranscriber
-input_path = sys.argv[1]
-model_name = sys.argv[2]
-output_format = sys.argv[3]
-use_gpu = sys.argv[4] == 'True'
-VideoTranscriber.transcribe(input_path, model_name, output_format, use_gpu)
-"""
-        cmd = [sys.executable, "-c", script, self.input_file, model_name, output_format, str(use_gpu)]
-        
-        startupinfo = None
-        if os.name == 'nt':
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        
-        try:
-            self.process = subprocess.Popen(
-                cmd, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.STDOUT, 
-                text=True, 
-                encoding='utf-8',
-                startupinfo=startupinfo,
-                errors='replace'
-            )
-        except Exception as e:
-            self.after(0, self._transcribe_done, {"success": False, "message": str(e)})
-            return
-        
-        duration = 0
-        final_result = {"success": False, "message": "任务被终止或发生错误"}
-        
-        duration_pattern = re.compile(r"DURATION: ([\d\.]+)")
-        # [00:00.000 --> 00:08.000] or [00:00:00.000 --> ...]
-        timestamp_pattern = re.compile(r"--> (?:(\d{1,2}):)?(\d{2}):(\d{2})[\.,](\d{3})")
-        result_pattern = re.compile(r"RESULT: (.+)")
+        chunked = self.chunked_var.get()
+        vad = self.vad_var.get()
 
         try:
-            for line in self.process.stdout:
-                line = line.strip()
-                if not line: continue
-                
-                # Check Duration
-                m_dur = duration_pattern.search(line)
-                if m_dur:
-                    duration = float(m_dur.group(1))
-                    self._update_progress("正在转录...", 0)
-                    continue
-                
-                # Check Result
-                m_res = result_pattern.search(line)
-                if m_res:
-                    try:
-                        final_result = eval(m_res.group(1))
-                    except:
-                        pass
-                    continue
-
-                # Check Timestamp
-                m_time = timestamp_pattern.search(line)
-                if m_time and duration > 0:
-                    groups = m_time.groups()
-                    # groups: (hours_str, mins_str, secs_str, ms_str)
-                    h_str = groups[0]
-                    m_str = groups[1]
-                    s_str = groups[2]
-                    ms_str = groups[3]
-                    
-                    h = int(h_str) if h_str else 0
-                    m = int(m_str)
-                    s = int(s_str)
-                    ms = int(ms_str)
-                    
-                    seconds = h * 3600 + m * 60 + s + ms / 1000
-                    percent = min(99, (seconds / duration) * 100)
-                    self._update_progress(f"转录中: {percent:.1f}%", percent)
-            
-            self.process.wait()
-
+            final_result = self.worker.transcribe(
+                self.input_file,
+                model_name,
+                output_format,
+                use_gpu,
+                on_progress=self._update_progress,
+                on_segment=self._on_segment,
+                chunked=chunked,
+                vad=vad
+            )
         except Exception as e:
             final_result = {"success": False, "message": str(e)}
-        finally:
-            self.process = None
 
         self.after(0, self._transcribe_done, final_result)
 
@@ -377,11 +355,15 @@ VideoTranscriber.transcribe(input_path, model_name, output_format, use_gpu)
         self.progress_bar.stop()
         self.transcribe_btn.configure(state="normal")
         self.stop_btn.configure(state="disabled")
-        if torch.cuda.is_available():
-             self.gpu_switch.configure(state="normal")
+        if self.cuda_available:
+            self.gpu_switch.configure(state="normal")
         
         if result["success"]:
             self.log(f"✅ 成功: 输出至 {result['output_path']}")
+            if result.get("cached"):
+                self.log("已有相同内容的识别结果，直接使用缓存")
+            if result.get("vad_skipped"):
+                self.log(f"静音检测跳过了 {result['vad_skipped']:.1%} 的音频")
             self.status_label.configure(text="提取完成")
             self.progress_bar.set(1)
             self.percent_label.configure(text="100%")
@@ -0,0 +1,131 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from .logger import logger
+
+
+class DiskCache:
+    """
+    基于 SQLite 的持久化键值缓存
+    值以压缩后的 JSON 存储，支持 TTL 过期和按条目数/总字节数的 LRU 淘汰
+    ttl: 过期时间（秒），None 表示不过期
+    max_entries / max_bytes: 容量上限，None 表示不限制
+    """
+
+    def __init__(self, path, ttl=None, max_entries=None, max_bytes=None):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed)")
+
+    def get(self, key, default=None):
+        """读取缓存，未命中或已过期时返回 default"""
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT value, created FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return default
+                value, created = row
+                if self.ttl is not None and now - created > self.ttl:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self.misses += 1
+                    return default
+                self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+                self.hits += 1
+            return json.loads(zlib.decompress(value))
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            logger.warning(f"读取缓存失败: {e}")
+            return default
+
+    def set(self, key, value):
+        """写入缓存（value 需可 JSON 序列化）"""
+        now = time.time()
+        try:
+            blob = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, blob, len(blob), now, now)
+                )
+                self._evict(now)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"写入缓存失败: {e}")
+
+    def delete(self, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+        self.hits = self.misses = self.evictions = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT created FROM entries WHERE key = ?", (key,)).fetchone()
+        return row is not None and (self.ttl is None or time.time() - row[0] <= self.ttl)
+
+    def _evict(self, now):
+        """清理过期条目，并按最近访问时间淘汰超出容量的条目（需持有锁）"""
+        if self.ttl is not None:
+            cur = self._conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+            self.evictions += cur.rowcount
+
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        over_count = self.max_entries is not None and count > self.max_entries
+        over_bytes = self.max_bytes is not None and total > self.max_bytes
+        if not (over_count or over_bytes):
+            return
+
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC"):
+            if not ((self.max_entries is not None and count > self.max_entries)
+                    or (self.max_bytes is not None and total > self.max_bytes)):
+                break
+            victims.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def stats(self):
+        """缓存统计：条目数、占用字节、命中/未命中次数"""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
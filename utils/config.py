@@ -25,7 +25,45 @@ DOWNLOAD_CONFIG = {
     "default_quality": "best",
     "supported_qualities": ["best", "worst"], # 实际会从yt-dlp动态获取
     "temp_dir": PATHS["temp"],
-    "partial_suffix": ".part"
+    "partial_suffix": ".part",
+    "max_workers": 3, # 同时进行的下载任务数
+    "max_per_host": 2, # 同一站点同时进行的下载任务数，0 表示不限制
+    "info_cache_ttl": 30 * 60, # 视频信息缓存有效期（秒），过久的直链可能失效
+    "info_cache_max_bytes": 64 * 1024 * 1024,
+    "info_workers": 8, # 批量解析视频信息时的并发数
+    "ydl_pool_size": 4, # 每种配置保留的空闲 YoutubeDL 实例数（用于解析视频信息）
+    "journal_keep_days": 7, # 已结束的下载任务记录保留天数
+    "archive_hash": False, # 下载记录中是否保存文件的 SHA-256（用于发现不同链接的相同内容，大文件较耗时）
+    # HLS/DASH 分片并发下载的连接数，1 表示按顺序逐个下载分片
+    "concurrent_fragments": 4,
+    # 所有下载共享的总限速（字节/秒）和按站点限速 {站点: 字节/秒}，None / 空表示不限制
+    "rate_limit": None,
+    "rate_limit_per_host": {},
+    # 仅音频模式的格式选择：优先码率不低于 48k 的最小纯音频流（opus 优先，其次 m4a），
+    # 语音识别只需 16kHz 单声道，更高音质只会浪费带宽
+    "audio_only_format": (
+        "worstaudio[abr>=?48][acodec^=opus]"
+        "/worstaudio[abr>=?48][ext=m4a]"
+        "/worstaudio[abr>=?48]"
+        "/bestaudio/best"
+    ),
+}
+
+# 格式选择策略（core/formats.py），按名称引用，如 CLI 的 --policy、下载页的推荐选项
+# kind: "video" 视频（纯视频流会自动搭配音频）/ "audio" 纯音频
+# rank: "best" 质量最高 / "smallest" 体积最小
+# 筛选条件: vcodec / acodec（编码族，如 h264、h265、vp9、av1、aac、opus）、ext（容器）、
+#           min_height / max_height、min_abr / max_abr（kbps）、min_asr（采样率）
+# prefer: 优先的编码族列表，没有符合的格式时再从其余格式中选
+FORMAT_POLICIES = {
+    "best": {"label": "最佳画质", "kind": "video", "rank": "best"},
+    "best_1080p_h264": {"label": "最佳 1080p 以内 (H.264, 兼容性好)", "kind": "video", "rank": "best",
+                        "max_height": 1080, "prefer": ["h264"]},
+    "best_720p": {"label": "最佳 720p 以内", "kind": "video", "rank": "best", "max_height": 720},
+    "smallest_video": {"label": "最小体积视频", "kind": "video", "rank": "smallest", "min_height": 360},
+    # 语音识别只需 16kHz 单声道，选码率不低于 48k 的最小音频流
+    "asr_audio": {"label": "语音识别用最小音频", "kind": "audio", "rank": "smallest",
+                  "min_abr": 48, "min_asr": 16000, "prefer": ["opus", "aac"]},
 }
 
 # 转换配置
@@ -33,7 +71,20 @@ CONVERT_CONFIG = {
     "supported_formats": ["mp3", "wav", "flac", "aac", "m4a"],
     "default_format": "mp3",
     "default_bitrate": "192k",
-    "supported_bitrates": ["128k", "192k", "256k", "320k"]
+    "supported_bitrates": ["128k", "192k", "256k", "320k"],
+    # 批量转换时识别的视频文件扩展名
+    "video_extensions": [".mp4", ".mkv", ".avi", ".flv", ".mov", ".wmv", ".webm", ".ts"],
+    # 每个 ffmpeg 进程使用的线程数，并发进程数 = CPU 核数 // threads_per_job
+    "threads_per_job": 1,
+    # 源音频编码与目标格式兼容时直接复制音频流，不重新编码
+    "stream_copy": True,
+    "copy_codecs": {
+        "m4a": ["aac", "alac"],
+        "aac": ["aac"],
+        "mp3": ["mp3"],
+        "flac": ["flac"],
+        "wav": ["pcm_s16le", "pcm_s24le", "pcm_s32le", "pcm_f32le"],
+    },
 }
 
 # Whisper 配置
@@ -41,7 +92,30 @@ WHISPER_CONFIG = {
     "models": ["tiny", "base", "small", "medium", "large"],
     "default_model": "base",
     "output_formats": ["txt", "srt", "vtt"],
-    "default_format": "txt"
+    "default_format": "txt",
+    # 分段并行识别（仅 CPU）：每段时长、相邻段重叠时长（秒）、每个进程的线程数
+    "chunk_seconds": 600,
+    "chunk_overlap": 5,
+    "chunk_threads": 2,
+    # 识别前检测并跳过静音
+    "vad": False,
+    # 静音检测保留的音频低于该比例时视为检测失误，改为完整识别
+    "vad_min_speech_ratio": 0.05,
+    # 识别结果缓存容量
+    "cache_max_bytes": 256 * 1024 * 1024,
+    # 常驻模型的内存预算（字节），超出时卸载最久未使用的模型；None 表示不限制
+    "model_memory_budget": 6 * 1024 ** 3,
+}
+
+# 流水线配置（下载 -> 提取音频 -> 转录）
+PIPELINE_CONFIG = {
+    # 各阶段的并发数
+    "download_workers": 2,
+    "convert_workers": 2,
+    # 在当前进程中转录时，使用同一模型的识别串行执行（见 core/transcriber.py），多开线程不会加速
+    "transcribe_workers": 1,
+    # 阶段之间最多排队的条目数，下游排满后上游暂停领取新任务
+    "queue_size": 2,
 }
 
 # UI 配置